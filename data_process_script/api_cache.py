@@ -0,0 +1,180 @@
+"""
+Persistent, content-addressed response cache for the API builders.
+
+- Key = sha256(method, URL, sorted params, canonical JSON body), with API keys
+  (key / API_KEY / UserID / registrationkey ...) stripped so rotating a key
+  does not invalidate anything
+- Bodies are stored zlib-compressed under API_CACHE_DIR/<ab>/<key>.z,
+  metadata (size, expiry, last access) in a small SQLite index
+- TTL per dataset: a request that only touches published vintages never
+  expires; one that touches the current / previous year gets the short
+  dataset TTL (data still being revised)
+- Size cap with LRU eviction (API_CACHE_MAX_MB)
+- Offline mode (API_OFFLINE=1): serve from cache only, never touch the network
+
+api_client.fetch() goes through this cache automatically; set API_CACHE=0 to bypass.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import date
+from urllib.parse import urlsplit
+
+# ========= Config =========
+CACHE_DIR = os.getenv("API_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".api_cache"))
+MAX_BYTES = int(float(os.getenv("API_CACHE_MAX_MB", "2048")) * 1024 * 1024)
+ENABLED = os.getenv("API_CACHE", "1") != "0"
+OFFLINE = os.getenv("API_OFFLINE", "0") == "1"
+
+SECRET_PARAMS = {"key", "api_key", "userid", "registrationkey"}
+
+HOUR = 3600
+DAY = 24 * HOUR
+# TTL for requests that touch still-revisable years, by host
+DATASET_TTL = {
+    "api.census.gov": 7 * DAY,
+    "api.bls.gov": 1 * DAY,       # monthly LAUS revisions
+    "apps.bea.gov": 1 * DAY,      # quarterly income revisions
+    "api.usa.gov": 7 * DAY,       # FBI CDE
+}
+DEFAULT_TTL = 1 * DAY
+REVISABLE_YEARS = 1               # current year and this many before it get the short TTL
+
+# payloads that are HTTP 200 but carry an API-level error: never cache those
+ERROR_MARKERS = (b'"REQUEST_NOT_PROCESSED"', b'"Error":')
+# =========================
+
+_YEAR = re.compile(r"(?<!\d)(19\d{2}|20\d{2})(?!\d)")
+
+
+def _strip_secrets(d):
+    if not isinstance(d, dict):
+        return d
+    return {k: v for k, v in d.items() if str(k).lower() not in SECRET_PARAMS}
+
+
+def cache_key(method, url, params=None, body=None):
+    params = _strip_secrets(params or {})
+    parts = {
+        "m": method.upper(),
+        "u": url,
+        "p": sorted((str(k), str(v)) for k, v in params.items()),
+        "b": _strip_secrets(body) if body is not None else None,
+    }
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def ttl_for(url, params=None, body=None):
+    """Seconds until expiry, or None for never (all requested years are published vintages)."""
+    text = " ".join([url,
+                     json.dumps(_strip_secrets(params or {}), default=str),
+                     json.dumps(_strip_secrets(body) if body is not None else {}, default=str)])
+    years = [int(y) for y in _YEAR.findall(text)]
+    # "time=from 2010 to 2023" style ranges only list endpoints, the max is what matters
+    if years and max(years) < date.today().year - REVISABLE_YEARS:
+        return None
+    return DATASET_TTL.get(urlsplit(url).hostname, DEFAULT_TTL)
+
+
+class ResponseCache:
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY, url TEXT, size INTEGER,
+            created REAL, expires REAL, last_access REAL)""")
+        self._db.commit()
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + ".z")
+
+    def get(self, key):
+        """Return cached body bytes, or None on miss / expiry."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT expires FROM entries WHERE key=?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[0] is not None and row[0] < now and not OFFLINE:
+                return None  # stale; offline mode still serves it
+            try:
+                with open(self._path(key), "rb") as f:
+                    body = zlib.decompress(f.read())
+            except (OSError, zlib.error):
+                self._db.execute("DELETE FROM entries WHERE key=?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE entries SET last_access=? WHERE key=?", (now, key))
+            self._db.commit()
+        return body
+
+    def put(self, key, url, body, ttl):
+        if any(m in body for m in ERROR_MARKERS):
+            return
+        self.put_blob(key, url, zlib.compress(body, 6), ttl)
+
+    def put_blob(self, key, url, blob, ttl):
+        """Store an already zlib-compressed body (used when teeing a streamed response)."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, path)
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO entries VALUES (?,?,?,?,?,?)",
+                             (key, url, len(blob), now, None if ttl is None else now + ttl, now))
+            self._db.commit()
+            self._evict()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute(
+                "SELECT key, size FROM entries ORDER BY last_access").fetchall():
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            self._db.execute("DELETE FROM entries WHERE key=?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+        self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            for (key,) in self._db.execute("SELECT key FROM entries").fetchall():
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self._db.execute("DELETE FROM entries")
+            self._db.commit()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide cache, or None when API_CACHE=0."""
+    global _cache
+    if not ENABLED and not OFFLINE:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+    return _cache
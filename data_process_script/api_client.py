@@ -0,0 +1,201 @@
+"""
+Shared HTTP client for the API-backed builders (Census, BLS, BEA, FBI).
+
+- One pooled requests.Session per process (keep-alive across all calls)
+- fetch_all() fans a list of calls out over a thread pool, bounded by a
+  max-in-flight limit, and returns the results in input order
+- Retry with jittered exponential backoff on 429 / 5xx / connection errors
+- Successful responses go through the on-disk cache in api_cache.py
+  (API_OFFLINE=1 serves from that cache only)
+- API_BASE_OVERRIDE=http://127.0.0.1:8765 sends every call to the local
+  replay server (util/replay_server.py) instead of the live endpoints:
+  https://api.census.gov/data/... -> http://127.0.0.1:8765/api.census.gov/data/...
+
+Usage in a builder:
+
+    from api_client import fetch_all
+
+    calls = [{"url": BASE, "params": params_for(y)} for y in YEARS]
+    for y, js in zip(YEARS, fetch_all(calls)):
+        if isinstance(js, Exception):
+            print(f"skip {y}: {js}")
+            continue
+        ...
+"""
+
+import os
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import api_cache
+
+# ========= Config =========
+MAX_IN_FLIGHT = int(os.getenv("API_MAX_IN_FLIGHT", "8"))
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0      # seconds; attempt n sleeps U(0, base * 2**n)
+BACKOFF_CAP = 30.0
+TIMEOUT = 120
+RETRY_STATUS = {429, 500, 502, 503, 504}
+BASE_OVERRIDE = os.getenv("API_BASE_OVERRIDE", "").rstrip("/")
+# =========================
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide pooled session, created on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=max(MAX_IN_FLIGHT, 10))
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _session = s
+    return _session
+
+
+def route(url):
+    """Rewrite a live API URL onto API_BASE_OVERRIDE (no-op when unset)."""
+    if not BASE_OVERRIDE or url.startswith(BASE_OVERRIDE + "/"):
+        return url
+    parts = urlsplit(url)
+    return f"{BASE_OVERRIDE}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+
+
+def _backoff(attempt, resp=None):
+    # honour Retry-After when the server sends one, otherwise full jitter
+    if resp is not None:
+        ra = resp.headers.get("Retry-After")
+        if ra and ra.isdigit():
+            return min(float(ra), BACKOFF_CAP)
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+def _cached_response(url, body):
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.url = url
+    resp._content = body
+    resp.encoding = "utf-8"
+    resp.headers["X-Cache"] = "HIT"
+    return resp
+
+
+def is_cached(url, params=None, json=None, method="GET"):
+    """True when fetch() would be served from the on-disk cache (no network, no quota)."""
+    store = api_cache.get_cache()
+    key = api_cache.cache_key(method, route(url), params, json)
+    return store is not None and store.get(key) is not None
+
+
+def fetch(url, params=None, json=None, method="GET", headers=None, timeout=TIMEOUT, cache=True,
+          stream=False, retries=None):
+    """
+    Single request with retries. Returns the Response; raises RuntimeError on final failure.
+    With stream=True the body is left on the wire (and not cached here); use fetch_chunks().
+    `retries` overrides MAX_RETRIES (rate-limited callers re-queue failures themselves).
+    """
+    retries = retries or MAX_RETRIES
+    url = route(url)  # the replay server gets its own cache entries
+    store = api_cache.get_cache() if cache else None
+    if store is not None:
+        key = api_cache.cache_key(method, url, params, json)
+        body = store.get(key)
+        if body is not None:
+            return _cached_response(url, body)
+        if api_cache.OFFLINE:
+            raise RuntimeError(f"{method} {url} not in cache (API_OFFLINE=1)")
+
+    session = get_session()
+    last_err = None
+    for attempt in range(retries):
+        resp = None
+        try:
+            resp = session.request(method, url, params=params, json=json,
+                                   headers=headers, timeout=timeout, stream=stream)
+            if resp.status_code == 200:
+                if store is not None and not stream:
+                    store.put(key, url, resp.content, api_cache.ttl_for(url, params, json))
+                return resp
+            last_err = f"{resp.status_code}: {resp.text[:200]}"
+            if resp.status_code not in RETRY_STATUS:
+                break
+        except (requests.ConnectionError, requests.Timeout) as e:
+            last_err = str(e)
+        if attempt < retries - 1:
+            time.sleep(_backoff(attempt, resp))
+    raise RuntimeError(f"{method} {url} failed {last_err}")
+
+
+def fetch_json(url, params=None, json=None, method="GET", headers=None, timeout=TIMEOUT, cache=True,
+               retries=None):
+    """fetch() + JSON decode. Census returns HTML/empty bodies for bad queries, so fail loudly."""
+    resp = fetch(url, params=params, json=json, method=method, headers=headers,
+                 timeout=timeout, cache=cache, retries=retries)
+    try:
+        return resp.json()
+    except ValueError:
+        raise RuntimeError(f"{method} {url} returned non-JSON body: {resp.text[:200]}")
+
+
+def fetch_chunks(url, params=None, json=None, method="GET", headers=None, timeout=TIMEOUT,
+                 cache=True, chunk_size=1 << 20):
+    """
+    Yield the response body in chunks straight off the socket, so decoders
+    never hold the whole payload. A cache hit yields the cached body; a miss
+    is teed into the cache (compressed incrementally) once fully read.
+    """
+    url = route(url)
+    resp = fetch(url, params=params, json=json, method=method, headers=headers,
+                 timeout=timeout, cache=cache, stream=True)
+    if resp.headers.get("X-Cache") == "HIT":
+        body = resp.content
+        for i in range(0, len(body), chunk_size):
+            yield body[i:i + chunk_size]
+        return
+
+    store = api_cache.get_cache() if cache else None
+    z = zlib.compressobj(6)
+    blob = []
+    clean = True
+    with resp:
+        for chunk in resp.iter_content(chunk_size):
+            if store is not None:
+                blob.append(z.compress(chunk))
+                clean = clean and not any(m in chunk for m in api_cache.ERROR_MARKERS)
+            yield chunk
+    if store is not None and clean:
+        blob.append(z.flush())
+        store.put_blob(api_cache.cache_key(method, url, params, json), url, b"".join(blob),
+                       api_cache.ttl_for(url, params, json))
+
+
+def fetch_all(calls, max_in_flight=None, parse=fetch_json):
+    """
+    Run many calls concurrently. Each call is a dict of keyword arguments for
+    `parse` (fetch_json by default). Results come back in the order of `calls`;
+    a call that still fails after retries yields its exception instead of a result,
+    so one bad year does not sink the whole pull.
+    """
+    calls = list(calls)
+    if not calls:
+        return []
+    workers = max(1, min(max_in_flight or MAX_IN_FLIGHT, len(calls)))
+
+    def run(kw):
+        try:
+            return parse(**kw)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run, calls))
@@ -1,5 +1,8 @@
-import requests
+import os
+
 import pandas as pd
+from api_client import fetch_json
+from paths import CTRL_STATE, root
 
 # ACS 2023 5-year DP02 (Social Characteristics)
 # check variables' codes at: https://api.census.gov/data/2020/acs/acs5/profile/variables.json
@@ -18,8 +21,7 @@ params = {
     "for": "state:*"
 }
 
-resp = requests.get(url, params=params)
-data = resp.json()
+data = fetch_json(url, params=params)
 df = pd.DataFrame(data[1:], columns=data[0])
 
 for v in variables:
@@ -35,12 +37,12 @@ df_out = df[["fips","NAME","DP02_0067PE","DP02_0068PE","share_married_15p"]].ren
         "DP02_0068PE": "share_ba_plus_25p"}
 )
 
-demo = pd.read_csv("/Users/okuran/Desktop/thesis/state_demographics_2020.csv")
+demo = pd.read_csv(root("state_demographics_2020.csv"))
 demo["fips"] = demo["fips"].astype(str).str.zfill(2)
 
 demo = demo.merge(df_out[['fips', 'share_married_15p', 'share_hs_plus_25p', 'share_ba_plus_25p']], on=['fips'], how='left')
 
-demo.to_csv("/Users/okuran/Desktop/thesis/master_data/ctrl_var_state/state_demographics_2020.csv", index=False)
+demo.to_csv(os.path.join(CTRL_STATE, "state_demographics_2020.csv"), index=False)
 
 print("✅ Saved")
 print(demo.head())
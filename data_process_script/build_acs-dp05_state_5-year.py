@@ -1,5 +1,8 @@
-import requests
+import os
+
 import pandas as pd
+from api_client import fetch_json
+from paths import CTRL_STATE, root
 
 # ACS 2023 5-year DP05 (demographic and housing characteristics)
 # check variables' codes at: https://api.census.gov/data/2020/acs/acs5/profile/variables.json
@@ -19,8 +22,7 @@ params = {
     "get": "NAME,DP05_0001E,DP05_0002PE,DP05_0008PE,DP05_0009PE,DP05_0010PE,DP05_0011PE,DP05_0038PE",
     "for": "state:*"
 }
-resp = requests.get(url, params=params)
-data = resp.json()
+data = fetch_json(url, params=params)
 
 df = pd.DataFrame(data[1:], columns=data[0])
 
@@ -37,18 +39,20 @@ df['fips'] = df['state'].astype(str).str.zfill(2)
 df['STATE'] = df['NAME']
 
 df_out = df[["year","fips","STATE","share_age_15_44","share_male","share_black"]]
-df_out.to_csv("state_demographics_2020.csv", index=False)
+df_out.to_csv(root("state_demographics_2020.csv"), index=False)
 
-pop = pd.read_csv("/Users/okuran/Desktop/thesis/master_data/ctrl_var_state/state_population_2010_2023.csv")
+# NHGIS years from merge_nhgis001.py; 2020 comes from here
+pop = pd.read_csv(os.path.join(CTRL_STATE, "state_population_nhgis_2010_2023.csv"))
 pop['fips'] = pop['fips'].astype(str).str.zfill(2)
 
 df_pop = df[["fips","NAME", "DP05_0001E"]].rename(columns={"DP05_0001E": "total_population",
                                                     "NAME": "STATE"})
 df_pop['YEAR'] = 2020
 
+pop = pop[pop['YEAR'] != 2020]
 pop = pd.concat([pop, df_pop[['YEAR', 'STATE', 'fips', 'total_population']]], ignore_index=True)
 
-pop.to_csv("/Users/okuran/Desktop/thesis/master_data/ctrl_var_state/state_population_2010_2023.csv", index=False)
+pop.to_csv(os.path.join(CTRL_STATE, "state_population_2010_2023.csv"), index=False)
 
 print("✅ Saved")
 print(df_out.head())
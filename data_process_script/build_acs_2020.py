@@ -1,5 +1,8 @@
-import requests
+import os
+
 import pandas as pd
+from api_client import fetch_json
+from paths import CTRL_STATE
 
 # check variables' codes at: https://api.census.gov/data/2024/acs/acs1/profile/variables.json
 
@@ -26,8 +29,7 @@ params = {
     "for": "state:*"
 }
 
-resp = requests.get(url, params=params)
-data = resp.json()
+data = fetch_json(url, params=params)
 df = pd.DataFrame(data[1:], columns=data[0])
 
 for v in variables:
@@ -55,7 +57,7 @@ df_out = df[["year","fips","STATE","share_age_15_44","share_male","share_black",
 
 df_out = df_out.sort_values(by=['year', 'fips']).reset_index(drop=True)
 
-df_out.to_csv("/Users/okuran/Desktop/thesis/master_data/ctrl_var_state/state_acs_2020.csv", index=False)
+df_out.to_csv(os.path.join(CTRL_STATE, "state_acs_2020.csv"), index=False)
 
 print("✅ Saved")
 print(df_out.head())
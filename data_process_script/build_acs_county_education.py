@@ -1,28 +1,34 @@
-import os, requests, pandas as pd
+import os, pandas as pd
+from api_client import fetch_all
+from delta_refresh import cli, plan_years, write_output
 
 BASE = "https://api.census.gov/data"
 DATASET = "acs/acs5/subject"
-YEARS = range(2010, 2023+1)
+OUT = "acs5_education_S1501_county_2010_2023.csv"
+args = cli(range(2010, 2023+1), description="ACS 5-year S1501 county education")
+YEARS = plan_years(OUT, args.years, geo_col="fips", incremental=args.incremental)
+if not YEARS:
+    raise SystemExit(f"{OUT} is up to date.")
 API_KEY = os.getenv("CENSUS_KEY")  # optional
 
 # S1501 percent estimates (25+):
 HS_VAR = "S1501_C02_015"  # High school graduate or higher (%)
 BA_VAR = "S1501_C02_016"  # Bachelor's degree or higher (%)
 
+params = {
+    "get": f"NAME,{HS_VAR},{BA_VAR}",
+    "for": "county:*",
+    "in": "state:*",
+}
+if API_KEY: params["key"] = API_KEY
+
+calls = [{"url": f"{BASE}/{y}/{DATASET}", "params": params} for y in YEARS]
+
 rows = []
-for y in YEARS:
-    params = {
-        "get": f"NAME,{HS_VAR},{BA_VAR}",
-        "for": "county:*",
-        "in": "state:*",
-    }
-    if API_KEY: params["key"] = API_KEY
-    url = f"{BASE}/{y}/{DATASET}"
-    r = requests.get(url, params=params, timeout=60)
-    if r.status_code != 200:
-        print(f"skip {y}: {r.status_code}")
+for y, data in zip(YEARS, fetch_all(calls)):
+    if isinstance(data, Exception):
+        print(f"skip {y}: {data}")
         continue
-    data = r.json()
     df = pd.DataFrame(data[1:], columns=data[0])
     df[HS_VAR] = pd.to_numeric(df[HS_VAR], errors="coerce")
     df[BA_VAR] = pd.to_numeric(df[BA_VAR], errors="coerce")
@@ -33,8 +39,9 @@ for y in YEARS:
 out = pd.concat(rows, ignore_index=True).rename(columns={
     HS_VAR: "educ_hs_or_higher_pct",
     BA_VAR: "educ_ba_or_higher_pct",
-}).sort_values(["fips","year"])
+})
 
-out.to_csv("acs5_education_S1501_county_2010_2023.csv", index=False)
-print("saved acs5_education_S1501_county_2010_2023.csv")
+out = write_output(out, OUT, args.incremental, sort_cols=["fips","year"], dtype={"fips": str},
+                   source="acs5_county_education", schema={"fips": "fips5"})
+print(f"saved {OUT}")
 print(out.head())
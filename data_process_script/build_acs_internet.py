@@ -1,8 +1,10 @@
-import requests
 import pandas as pd
-import time
+from api_client import fetch_all
+from delta_refresh import cli, plan_years, write_output
 
-years = range(2018, 2025)
+OUT = "state_internet_2018_2024.csv"
+args = cli(range(2018, 2025), description="ACS state internet use")
+years = plan_years(OUT, args.years, geo_col="state", incremental=args.incremental)
 base_url = "https://api.census.gov/data/{year}/acs/acs1/profile"
 url_2020 = "https://api.census.gov/data/2020/acs/acs5/profile"
 
@@ -17,8 +19,7 @@ def internet_var(year):
     else:
         return None
 
-def fetch_acs1(year):
-
+def acs1_call(year):
     iv = internet_var(year)
 
     if year != 2020:
@@ -26,13 +27,15 @@ def fetch_acs1(year):
     else:
         url = url_2020
 
-    params = {"get": f"NAME,{iv}", "for": "state:*"}
-    r = requests.get(url, params=params)
-    if r.status_code != 200:
-        print(f"❌ Failed {year}, status code: {r.status_code}")
+    return {"url": url, "params": {"get": f"NAME,{iv}", "for": "state:*"}}
+
+
+def parse_acs1(year, data):
+    if isinstance(data, Exception):
+        print(f"❌ Failed {year}: {data}")
         return None
 
-    data = r.json()
+    iv = internet_var(year)
     df = pd.DataFrame(data[1:], columns=data[0])
 
     df["internet_use_pct"] = df[iv] if iv else pd.NA
@@ -47,12 +50,15 @@ def fetch_acs1(year):
 
 
 all_years = []
-for y in years:
-    d = fetch_acs1(y)
+for y, data in zip(years, fetch_all([acs1_call(y) for y in years])):
+    d = parse_acs1(y, data)
     if d is not None:
         all_years.append(d)
-    time.sleep(0.4)
 
-acs = pd.concat(all_years, ignore_index=True)
-acs.to_csv("state_internet_2018_2024.csv", index=False)
-print("✅ saved.")
\ No newline at end of file
+if all_years:
+    acs = pd.concat(all_years, ignore_index=True)
+    write_output(acs, OUT, args.incremental, sort_cols=["year", "state"], dtype={"state": str},
+                 source="acs1_state_internet", schema={"state": "state"})
+    print("✅ saved.")
+else:
+    print("✅ up to date.")
\ No newline at end of file
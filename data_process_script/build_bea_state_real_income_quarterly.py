@@ -1,5 +1,5 @@
-import requests
 import pandas as pd
+from api_client import fetch_json
 
 # Direct Download from: https://apps.bea.gov/itable/?ReqID=70&step=1&_gl=1*1d4xpw*_ga*MjA0ODQ1OTU0Ni4xNzU5MDMzMTU5*_ga_J4698JNNFT*czE3NjI0MzczNTMkbzIkZzEkdDE3NjI0MzczNjckajQ2JGwwJGgw#eyJhcHBpZCI6NzAsInN0ZXBzIjpbMSwyOSwyNSwzMSwyNiwyNywzMF0sImRhdGEiOltbIlRhYmxlSWQiLCIzNiJdLFsiTWFqb3JfQXJlYSIsIjAiXSxbIlN0YXRlIixbIjAiXV0sWyJBcmVhIixbIlhYIl1dLFsiU3RhdGlzdGljIixbIjEiXV0sWyJVbml0X29mX21lYXN1cmUiLCJMZXZlbHMiXSxbIlllYXIiLFsiMjAyNSIsIjIwMjQiLCIyMDIzIiwiMjAyMiIsIjIwMjEiLCIyMDIwIiwiMjAxOSIsIjIwMTgiLCIyMDE3IiwiMjAxNiIsIjIwMTUiLCIyMDE0IiwiMjAxMyIsIjIwMTIiLCIyMDExIiwiMjAxMCJdXSxbIlllYXJCZWdpbiIsIi0xIl0sWyJZZWFyX0VuZCIsIi0xIl1dfQ==
 # https://apps.bea.gov/api/_pdf/bea_web_service_api_user_guide.pdf
@@ -21,8 +21,7 @@ def fetch_bea(years, linecode=3, geo="STATE", freq="Q"):
         "ResultFormat": "json"
     }
 
-    resp = requests.get(BASE_URL, params=params)
-    resp_json = resp.json()
+    resp_json = fetch_json(BASE_URL, params=params)
 
     results = resp_json.get("BEAAPI", {}).get("Results", {})
     if "Error" in results:
@@ -1,30 +1,46 @@
-import requests
+import os
+import sys
+
 import pandas as pd
+from api_client import fetch_all
+from delta_refresh import cli, plan_years, write_output
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+from geo_registry import STATE_CODES, fips_str
 
 # BLS API Document: https://www.bls.gov/help/hlpforma.htm#LAUS
 
 API_KEY = "YOUR_API_KEY"  # Required, get your own free key at https://www.bls.gov/developers/home.htm
 url = "https://api.bls.gov/publicAPI/v2/timeseries/data/"
 headers = {"Content-type": "application/json"}
+OUT = "state_monthly_unemployment_2018_2025.csv"
 
-state_fips = [f"{i:02d}" for i in range(1, 57) if i not in [3, 7, 14, 43, 52]]
+args = cli(range(2018, 2025 + 1), description="LAUS state monthly unemployment rate")
+YEARS = plan_years(OUT, args.years, geo_col="state_fips", incremental=args.incremental)
+if not YEARS:
+    raise SystemExit(f"✅ {OUT} is up to date.")
+
+state_fips = fips_str(STATE_CODES).tolist()
 
 series_ids = [f"LASST{fips}0000000000003" for fips in state_fips]
 
-def fetch_series(series_batch):
+def series_call(series_batch):
     data = {
         "seriesid": series_batch,
-        "startyear": "2018",
-        "endyear": "2025",
+        "startyear": str(min(YEARS)),
+        "endyear": str(max(YEARS)),
         "registrationkey": API_KEY
     }
-    resp = requests.post(url, json=data, headers=headers).json()
-    return resp
+    # registrationkey is stripped from the cache key, so cached batches survive key changes
+    return {"url": url, "json": data, "method": "POST", "headers": headers}
+
+# BLS API limit: max 50 series per request; batches go out concurrently
+batches = [series_ids[i:i+50] for i in range(0, len(series_ids), 50)]
 
 all_rows = []
-for i in range(0, len(series_ids), 50):  # BLS API limit: max 50 series per request
-    batch = series_ids[i:i+50]
-    resp_json = fetch_series(batch)
+for resp_json in fetch_all([series_call(b) for b in batches]):
+    if isinstance(resp_json, Exception):
+        raise resp_json
 
     for s in resp_json["Results"]["series"]:
         sid = s["seriesID"]
@@ -44,9 +60,12 @@ df = pd.DataFrame(all_rows)
 if df.empty:
     raise RuntimeError("❌ No data retrieved. Check API key or series IDs.")
 
+# startyear..endyear may span years that are already up to date; keep only the planned ones
+df = df[df["year"].isin(YEARS)]
 df["date"] = pd.to_datetime(df[["year", "month"]].assign(day=1))
-df = df.sort_values(["state_fips", "date"])
 
-df.to_csv("state_monthly_unemployment_2018_2025.csv", index=False)
-print("✅ Saved state_monthly_unemployment_2018_2025.csv")
+df = write_output(df, OUT, args.incremental, sort_cols=["state_fips", "date"],
+                  dtype={"state_fips": str}, parse_dates=["date"],
+                  source="laus_state_monthly", schema={"date": "date"})
+print(f"✅ Saved {OUT}")
 print(df.head())
@@ -1,26 +1,41 @@
-import requests
+import os
+import sys
+
 import pandas as pd
+from api_client import fetch_all
+from delta_refresh import cli, plan_years, write_output
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+from geo_registry import STATE_CODES, fips_str
 
 API_KEY = "YOUR_BLS_API"
 url = "https://api.bls.gov/publicAPI/v2/timeseries/data/"
 headers = {"Content-type": "application/json"}
+OUT = "state_unemployment_2010_2024_yearly.csv"
 
-state_fips = [f"{i:02d}" for i in range(1, 57) if i not in [3, 7, 14, 43, 52]]
+args = cli(range(2010, 2024 + 1), description="LAUS state unemployment rate, 2010-2024")
+YEARS = plan_years(OUT, args.years, geo_col="state_fips", incremental=args.incremental)
+if not YEARS:
+    raise SystemExit(f"✅ {OUT} is up to date.")
+
+state_fips = fips_str(STATE_CODES).tolist()
 series_ids = [f"LASST{fips}0000000000003" for fips in state_fips]
 
-def fetch_series(series_batch):
+def series_call(series_batch):
     data = {
         "seriesid": series_batch,
-        "startyear": "2010",
-        "endyear": "2024",
+        "startyear": str(min(YEARS)),
+        "endyear": str(max(YEARS)),
         "registrationkey": API_KEY
     }
-    return requests.post(url, json=data, headers=headers).json()
+    return {"url": url, "json": data, "method": "POST", "headers": headers}
+
+batches = [series_ids[i:i+50] for i in range(0, len(series_ids), 50)]
 
 all_rows = []
-for i in range(0, len(series_ids), 50):
-    batch = series_ids[i:i+50]
-    resp = fetch_series(batch)
+for resp in fetch_all([series_call(b) for b in batches]):
+    if isinstance(resp, Exception):
+        raise resp
     for s in resp["Results"]["series"]:
         sid = s["seriesID"]
         fips = sid[5:7]
@@ -35,9 +50,12 @@ for i in range(0, len(series_ids), 50):
                 })
 
 df = pd.DataFrame(all_rows)
+# startyear..endyear may span years that are already up to date; keep only the planned ones
+df = df[df["year"].isin(YEARS)]
 df["date"] = pd.to_datetime(df[["year", "month"]].assign(day=1))
-df = df.sort_values(["state_fips", "date"])
 
-df.to_csv("state_unemployment_2010_2024_yearly.csv", index=False)
-print("✅ Saved state_unemployment_2010_2024_yearly.csv")
+df = write_output(df, OUT, args.incremental, sort_cols=["state_fips", "date"],
+                  dtype={"state_fips": str}, parse_dates=["date"],
+                  source="laus_state_unemployment", schema={"date": "date"})
+print(f"✅ Saved {OUT}")
 print(df.head())
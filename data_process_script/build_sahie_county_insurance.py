@@ -1,14 +1,28 @@
-import requests
+import os
+import sys
+
 import pandas as pd
-import time
+from api_client import fetch_all
+from census_decode import fetch_census
+from delta_refresh import cli, plan_years, write_output
 
-print("=== SAHIE county insured/uninsured, 2010–2023 ===")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+from geo_registry import fips_str
 
 BASE = "https://api.census.gov/data/timeseries/healthins/sahie"
-YEARS = range(2010, 2023 + 1)
+OUT = "sahie_county_insured_uninsured_2010_2023.csv"
+SCHEMA = {"STATE": "fips", "COUNTY": "fips", "YEAR": "int", "time": "int",
+          "PCTIC_PT": "float", "PCTUI_PT": "float"}
+
+args = cli(range(2010, 2023 + 1), description="SAHIE county insured/uninsured")
+YEARS = plan_years(OUT, args.years, geo_col="fips", incremental=args.incremental)
 
-def fetch_year(y: int) -> pd.DataFrame:
-    params = {
+print(f"=== SAHIE county insured/uninsured, {min(args.years)}–{max(args.years)} ===")
+if not YEARS:
+    raise SystemExit(f"{OUT} is up to date.")
+
+def year_params(y: int) -> dict:
+    return {
         "YEAR": str(y),           # request by YEAR to avoid potential 'time' format issues
         "for": "county:*",
         "AGECAT": "0",
@@ -18,42 +32,30 @@ def fetch_year(y: int) -> pd.DataFrame:
         "get": "NAME,STATE,COUNTY,YEAR,PCTIC_PT,PCTUI_PT",
     }
 
-    r = requests.get(BASE, params=params, timeout=120)
-    if r.status_code != 200:
-        raise RuntimeError(f"{y} failed {r.status_code}: {r.text[:200]}")
 
-    js = r.json()
-    if not js or len(js) < 2:
+def parse_year(y: int, df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty:
         raise RuntimeError(f"{y} got empty payload")
 
-    df = pd.DataFrame(js[1:], columns=js[0])
-
-    # drop duplicated columns (defensive against rare API quirks)
-    df = df.loc[:, ~df.columns.duplicated()].copy()
+    # duplicated columns (YEAR is both a predicate and in `get`) arrive as "YEAR.1"; ignored below
 
     # parse year column (prefer 'YEAR'; fall back to 'time' if needed)
     year_col = "YEAR" if "YEAR" in df.columns else ("time" if "time" in df.columns else None)
     if year_col is None:
         raise RuntimeError(f"{y} missing YEAR/time column; cols={list(df.columns)}")
+    df["year"] = df[year_col]
 
-    # in very rare cases the YEAR selection might yield a DataFrame; fallback to the first subcolumn
-    col_obj = df[year_col]
-    if isinstance(col_obj, pd.DataFrame):
-        col_obj = col_obj.iloc[:, 0]
-
-    df["year"] = pd.to_numeric(col_obj, errors="coerce")
-
-    # convert numeric targets; if a column is missing in a given year, fill with NA to avoid breaking the pipeline
+    # numeric targets are already float; if a column is missing in a given year, fill with NA to avoid breaking the pipeline
     for c in ("PCTIC_PT", "PCTUI_PT"):
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce")
-        else:
+        if c not in df.columns:
             df[c] = pd.NA
 
     # construct county FIPS as provided (STATE + COUNTY); keep behavior unchanged
     if not {"STATE", "COUNTY"}.issubset(df.columns):
         raise RuntimeError(f"{y} missing STATE/COUNTY columns; cols={list(df.columns)}")
-    df["fips"] = df["STATE"] + df["COUNTY"]
+    df["fips"] = fips_str(df["STATE"] * 1000 + df["COUNTY"], 5)
+    df["STATE"] = fips_str(df["STATE"], 2)
+    df["COUNTY"] = fips_str(df["COUNTY"], 3)
 
     out = df[["year", "fips", "STATE", "COUNTY", "NAME", "PCTIC_PT", "PCTUI_PT"]].copy()
     # drop rows where year failed to parse
@@ -61,20 +63,27 @@ def fetch_year(y: int) -> pd.DataFrame:
     out["year"] = out["year"].astype("Int64")
     return out
 
+# all years in flight at once (bounded by api_client.MAX_IN_FLIGHT), results in YEARS order
+responses = fetch_all([{"url": BASE, "params": year_params(y), "schema": SCHEMA} for y in YEARS],
+                      parse=fetch_census)
+
 all_parts = []
-for y in YEARS:
-    print(f"[{y}] fetching...", end=" ")
+for y, df in zip(YEARS, responses):
+    print(f"[{y}]", end=" ")
     try:
-        part = fetch_year(y)
+        if isinstance(df, Exception):
+            raise df
+        part = parse_year(y, df)
         all_parts.append(part)
         print(f"OK ({len(part)} rows)")
     except Exception as e:
         print(f"❌ {e}")
-    time.sleep(0.3)
 
 if not all_parts:
     raise SystemExit("No data was successfully fetched for any year.")
 
-out = pd.concat(all_parts, ignore_index=True).sort_values(["year", "fips"])
-out.to_csv("sahie_county_insured_uninsured_2010_2023.csv", index=False)
-print("Saved: sahie_county_insured_uninsured_2010_2023.csv")
\ No newline at end of file
+out = pd.concat(all_parts, ignore_index=True)
+write_output(out, OUT, args.incremental, sort_cols=["year", "fips"],
+             dtype={"fips": str, "STATE": str, "COUNTY": str},
+             source="sahie_county", schema={"fips": "fips5", "STATE": "fips2", "COUNTY": "fips3"})
+print(f"Saved: {OUT} (years fetched: {', '.join(map(str, YEARS))})")
\ No newline at end of file
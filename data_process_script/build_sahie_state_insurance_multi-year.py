@@ -1,20 +1,27 @@
-import requests
 import pandas as pd
+from api_client import fetch_all
+from delta_refresh import cli, plan_years, write_output
 
 url = "https://api.census.gov/data/timeseries/healthins/sahie"
-frames = []
-
-for year in range(2010, 2025):
-    params = {
+OUT = "state_sahie_insurance.csv"
+args = cli(range(2010, 2025), description="SAHIE state insured/uninsured (18-64)")
+years = plan_years(OUT, args.years, geo_col="state", incremental=args.incremental)
+if not years:
+    raise SystemExit(f"{OUT} is up to date.")
+calls = [{
+    "url": url,
+    "params": {
         "get": "NAME,PCTIC_PT,PCTUI_PT",
         "for": "state:*",
         "time": str(year),
         "AGECAT": "2",
         "IPRCAT": "0"
     }
-    r = requests.get(url, params=params)
-    if r.ok and r.text.strip().startswith('['):
-        data = r.json()
+} for year in years]
+
+frames = []
+for year, data in zip(years, fetch_all(calls)):
+    if not isinstance(data, Exception):
         df = pd.DataFrame(data[1:], columns=data[0])
         df["year"] = year
         frames.append(df)
@@ -32,6 +39,7 @@ df_out = df.rename(columns={
     "PCTUI_PT": "uninsured_pct"
 })[["year", "state", "state_name", "insured_pct", "uninsured_pct"]]
 
-df_out.to_csv("state_sahie_insurance.csv", index=False)
-print("✅ Saved state_sahie_insurance.csv")
+df_out = write_output(df_out, OUT, args.incremental, sort_cols=["year", "state"], dtype={"state": str},
+                      source="sahie_state", schema={"state": "state"})
+print(f"✅ Saved {OUT}")
 print(df_out.head())
\ No newline at end of file
@@ -1,5 +1,5 @@
-import requests
 import pandas as pd
+from api_client import fetch_json
 
 # SAHIE API
 url = "https://api.census.gov/data/timeseries/healthins/sahie"
@@ -17,8 +17,7 @@ params = {
     "IPRCAT": "0"
 }
 
-resp = requests.get(url, params=params)
-data = resp.json()
+data = fetch_json(url, params=params)
 
 df = pd.DataFrame(data[1:], columns=data[0])
 
@@ -1,28 +1,49 @@
-import requests
+import os
+import sys
+
 import pandas as pd
+from api_client import fetch_all
+from census_decode import fetch_census
+from delta_refresh import cli, plan_years, time_ranges, write_output
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+from geo_registry import fips_str
 
 BASE = "https://api.census.gov/data/timeseries/poverty/saipe"
+OUT = "saipe_county_poverty_2010_2023.csv"
+SCHEMA = {
+    "SAEPOVRTALL_PT": "float", "SAEPOVRTALL_MOE": "float",
+    "SAEPOVALL_PT": "float", "SAEPOVALL_MOE": "float",
+    "state": "fips", "county": "fips", "time": "int",
+}
 
-params = {
+args = cli(range(2010, 2023 + 1), description="SAIPE county poverty")
+years = plan_years(OUT, args.years, geo_col="fips", incremental=args.incremental)
+if not years:
+    raise SystemExit(f"✅ {OUT} is up to date.")
+
+# one request per contiguous run of years ("from 2010 to 2023", or just "2025" for a new vintage)
+calls = [{"url": BASE, "params": {
     "get": "NAME,SAEPOVRTALL_PT,SAEPOVRTALL_MOE,SAEPOVALL_PT,SAEPOVALL_MOE",
     "for": "county:*",
     "in": "state:*",
-    "time": "from 2010 to 2023"
-}
-
-resp = requests.get(BASE, params=params, timeout=60)
-if resp.status_code != 200:
-    raise RuntimeError(f"❌ Request ERROR: {resp.status_code}\nURL={resp.url}\n{resp.text}")
+    "time": t,
+}, "schema": SCHEMA} for t in time_ranges(years)]
 
-data = resp.json()
-df = pd.DataFrame(data[1:], columns=data[0])
+# typed columns straight from the response stream (no object-dtype intermediate)
+frames = []
+for part in fetch_all(calls, parse=fetch_census):
+    if isinstance(part, Exception):
+        raise RuntimeError(f"❌ Request ERROR: {part}")
+    frames.append(part)
+df = pd.concat(frames, ignore_index=True)
 
-df["year"] = pd.to_numeric(df["time"], errors="coerce")
+df["year"] = df["time"]
 
-df["poverty_rate"]  = pd.to_numeric(df["SAEPOVRTALL_PT"], errors="coerce")  # 百分比
-df["poverty_count"] = pd.to_numeric(df["SAEPOVALL_PT"], errors="coerce")    # 人数
+df["poverty_rate"]  = df["SAEPOVRTALL_PT"]  # 百分比
+df["poverty_count"] = df["SAEPOVALL_PT"]    # 人数
 
-df["fips"] = df["state"] + df["county"]
+df["fips"] = fips_str(df["state"] * 1000 + df["county"], 5)
 
 out = df[[
     "fips","NAME","year",
@@ -31,8 +52,9 @@ out = df[[
 ]].rename(columns={
     "SAEPOVRTALL_MOE":"poverty_rate_moe",
     "SAEPOVALL_MOE":"poverty_count_moe"
-}).sort_values(["fips","year"])
+})
 
+out = write_output(out, OUT, args.incremental, sort_cols=["fips","year"], dtype={"fips": str},
+                   source="saipe_county_poverty", schema={"fips": "fips5"})
 print(out.head(10))
-out.to_csv("saipe_county_poverty_2010_2023.csv", index=False)
-print("✅ Saved: saipe_county_poverty_2010_2023.csv")
+print(f"✅ Saved: {OUT}")
@@ -1,21 +1,38 @@
-import requests
-import pandas as pd
-
-url_county = (
-    "https://api.census.gov/data/timeseries/poverty/saipe"
-    "?get=NAME,SAEMHI_PT,STATE,COUNTY&for=county:*&time=from+2010+to+2023"
-)
-resp = requests.get(url_county)
-print(f"SAIPE API status code: {resp.status_code}")
-if resp.status_code != 200:
-    raise RuntimeError("❌ Failed to fetch data from SAIPE API. Please check your network connection.")
-
-data = resp.json()
-print(f"Number of rows (including header): {len(data)}")
+import os
+import sys
 
-df = pd.DataFrame(data[1:], columns=data[0])
-
-df["year"] = pd.to_numeric(df["time"], errors="coerce")
+import pandas as pd
+from api_client import fetch_all
+from census_decode import fetch_census
+from delta_refresh import cli, plan_years, time_ranges, write_output
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+from geo_registry import fips_str
+
+url_county = "https://api.census.gov/data/timeseries/poverty/saipe"
+OUT = "saipe_county_mhi_2010_2023_real2023usd.csv"
+
+args = cli(range(2010, 2023 + 1), description="SAIPE county median household income, real 2023 USD")
+years = plan_years(OUT, args.years, geo_col="fips", incremental=args.incremental)
+if not years:
+    raise SystemExit(f"{OUT} is up to date.")
+
+calls = [{"url": url_county, "params": {
+    "get": "NAME,SAEMHI_PT,STATE,COUNTY",
+    "for": "county:*",
+    "time": t,
+}, "schema": {"SAEMHI_PT": "float", "STATE": "fips", "COUNTY": "fips", "time": "int"}}
+    for t in time_ranges(years)]
+
+frames = []
+for part in fetch_all(calls, parse=fetch_census):
+    if isinstance(part, Exception):
+        raise RuntimeError(f"❌ Failed to fetch data from SAIPE API. Please check your network connection.\n{part}")
+    print(f"Number of rows: {len(part)}")
+    frames.append(part)
+df = pd.concat(frames, ignore_index=True)
+
+df["year"] = df["time"]
 
 bad = df["year"].isna().sum()
 if bad > 0:
@@ -24,8 +41,9 @@ if bad > 0:
 
 df["year"] = df["year"].astype("Int64")
 
-df["SAEMHI_PT"] = pd.to_numeric(df["SAEMHI_PT"], errors="coerce")
-df["fips"] = df["STATE"] + df["COUNTY"]
+df["fips"] = fips_str(df["STATE"] * 1000 + df["COUNTY"], 5)
+df["STATE"] = fips_str(df["STATE"], 2)
+df["COUNTY"] = fips_str(df["COUNTY"], 3)
 df = df[["year", "fips", "STATE", "COUNTY", "NAME", "SAEMHI_PT"]]
 print(f"Cleaned {len(df)} records")
 
@@ -38,5 +56,7 @@ if missing_def:
     print(f"Warning: {missing_def} records missing deflator (year outside 2010–2023?)")
 out["mhi_real_2023usd"] = out["SAEMHI_PT"] * out["deflator"]
 
-out.to_csv("saipe_county_mhi_2010_2023_real2023usd.csv", index=False)
-print("Saved: saipe_county_mhi_2010_2023_real2023usd.csv")
+write_output(out, OUT, args.incremental, sort_cols=["year", "fips"],
+             dtype={"fips": str, "STATE": str, "COUNTY": str},
+             source="saipe_county_mhi_real", schema={"fips": "fips5", "STATE": "fips2", "COUNTY": "fips3"})
+print(f"Saved: {OUT}")
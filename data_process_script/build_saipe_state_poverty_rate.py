@@ -1,20 +1,27 @@
-import requests
 import pandas as pd
+from api_client import fetch_all
+from delta_refresh import cli, plan_years, time_ranges, write_output
 
 BASE = "https://api.census.gov/data/timeseries/poverty/saipe"
+OUT = "saipe_state_poverty_2010_2024.csv"
 
-params = {
+args = cli(range(2010, 2024 + 1), description="SAIPE state poverty")
+years = plan_years(OUT, args.years, geo_col="state", incremental=args.incremental)
+if not years:
+    raise SystemExit(f"✅ {OUT} is up to date.")
+
+calls = [{"url": BASE, "params": {
     "get": "NAME,SAEPOVRTALL_PT,SAEPOVRTALL_MOE,SAEPOVALL_PT,SAEPOVALL_MOE",
     "for": "state:*",
-    "time": "from 2010 to 2024"
-}
-
-resp = requests.get(BASE, params=params, timeout=60)
-if resp.status_code != 200:
-    raise RuntimeError(f"❌ Request ERROR: {resp.status_code}\nURL={resp.url}\n{resp.text}")
+    "time": t,
+}} for t in time_ranges(years)]
 
-data = resp.json()
-df = pd.DataFrame(data[1:], columns=data[0])
+frames = []
+for data in fetch_all(calls):
+    if isinstance(data, Exception):
+        raise RuntimeError(f"❌ Request ERROR: {data}")
+    frames.append(pd.DataFrame(data[1:], columns=data[0]))
+df = pd.concat(frames, ignore_index=True)
 
 df["year"] = pd.to_numeric(df["time"], errors="coerce")
 df["poverty_rate"]  = pd.to_numeric(df["SAEPOVRTALL_PT"], errors="coerce")  # 百分比
@@ -28,8 +35,9 @@ out = df[[
     "NAME": "state_name",
     "SAEPOVRTALL_MOE": "poverty_rate_moe",
     "SAEPOVALL_MOE": "poverty_count_moe"
-}).sort_values(["state","year"])
+})
 
+out = write_output(out, OUT, args.incremental, sort_cols=["state","year"], dtype={"state": str},
+                   source="saipe_state_poverty", schema={"state": "state"})
 print(out.head(10))
-out.to_csv("saipe_state_poverty_2010_2024.csv", index=False)
-print("✅ Saved: saipe_state_poverty_2010_2024.csv")
+print(f"✅ Saved: {OUT}")
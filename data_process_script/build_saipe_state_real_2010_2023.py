@@ -1,11 +1,12 @@
-import requests, pandas as pd
+import pandas as pd
+from api_client import fetch_json
 
 url_state = (
     "https://api.census.gov/data/timeseries/poverty/saipe"
     "?get=NAME,SAEMHI_PT,STATE&for=state:*&time=from+2010+to+2023"
 )
 
-data_state = requests.get(url_state).json()
+data_state = fetch_json(url_state)
 state_df = pd.DataFrame(data_state[1:], columns=data_state[0])
 state_df["year"] = state_df["time"].str.extract(r"(\\d{4})").astype(int)
 state_df["STATE"] = state_df["state"]
@@ -1,41 +1,66 @@
-import requests
+import os
+import sys
+
 import pandas as pd
-import time
+from rate_limit import TokenBucket, run_rate_limited
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+from geo_registry import STATE_CODES, fips_str
 
 api_key = ""  # acquire from https://api.data.gov/signup/
 BASE_URL = "https://api.usa.gov/crime/fbi/sapi/api"
 
-state_fips = [
-    "01","02","04","05","06","08","09","10","11","12",
-    "13","15","16","17","18","19","20","21","22","23",
-    "24","25","26","27","28","29","30","31","32","33",
-    "34","35","36","37","38","39","40","41","42","44",
-    "45","46","47","48","49","50","51","53","54","55","56"
+# api.data.gov default quota: 1,000 requests/hour per key
+QUOTA_PER_HOUR = 1000
+WORKERS = 4
+
+# offense series pulled in the same job (CDE slugs)
+OFFENSES = [
+    "violent-crime", "property-crime",
+    "homicide", "rape", "robbery", "aggravated-assault",
+    "burglary", "larceny", "motor-vehicle-theft", "arson",
 ]
 
-records = []
+state_fips = fips_str(STATE_CODES).tolist()
+
+pairs = [(st, off) for off in OFFENSES for st in state_fips]
+jobs = [{
+    "url": f"{BASE_URL}/data/nibrs/{off}/offense/states/{st}/rate",
+    "params": {"from": 2018, "to": 2024, "API_KEY": api_key},
+} for st, off in pairs]
 
-for st in state_fips:
-    url = f"{BASE_URL}/data/nibrs/violent-crime/offense/states/{st}/rate"
-    params = {"from": 2018, "to": 2024, "API_KEY": api_key}
-    
-    resp = requests.get(url, params=params)
-    if resp.status_code != 200:
-        print(f"❌ Failed for {st}, status {resp.status_code}")
+bucket = TokenBucket.per_hour(QUOTA_PER_HOUR, capacity=10)
+results = run_rate_limited(jobs, bucket, workers=WORKERS,
+                           label=lambda i: "{}/{}".format(*pairs[i]))
+
+records = []
+failed = []
+for (st, off), res in zip(pairs, results):
+    if isinstance(res, Exception):
+        failed.append(f"{st}/{off}")
         continue
-    
-    data = resp.json().get("results", [])
-    for d in data:
+    for d in res.get("results", []):
         records.append({
             "state": st,
             "year": d["data_year"],
-            "violent_crime_rate": d["rate"]  # per 100k population
+            "offense": off,
+            "rate": d["rate"]  # per 100k population
         })
-    
-    time.sleep(0.5)  
+
+if failed:
+    print(f"❌ Still failing after retries ({len(failed)}): {', '.join(failed)}")
 
 df = pd.DataFrame(records)
+if df.empty:
+    raise RuntimeError("❌ No data retrieved. Check API key.")
+
+df.to_csv("state_crime_rates_2018_2024.csv", index=False)
+print("✅ Saved state_crime_rates_2018_2024.csv")
 
-df.to_csv("state_violent_crime_rate_2018_2024.csv", index=False)
+# original single-series output, kept for downstream scripts
+violent = (df[df["offense"] == "violent-crime"]
+           .drop(columns="offense")
+           .rename(columns={"rate": "violent_crime_rate"}))
+violent.to_csv("state_violent_crime_rate_2018_2024.csv", index=False)
 print("✅ Saved state_violent_crime_rate_2018_2024.csv")
-print(df.head())
+print(violent.head())
@@ -0,0 +1,196 @@
+"""
+Typed streaming decoder for Census API list-of-lists JSON.
+
+The usual pattern
+
+    js = r.json()
+    df = pd.DataFrame(js[1:], columns=js[0])
+    df[c] = pd.to_numeric(df[c], errors="coerce")
+
+materialises every cell as a Python string in an object-dtype frame before
+converting it. The Census API writes one row per line
+
+    [["NAME","SAEPOVRTALL_PT","state","county","time"],
+    ["Autauga County, AL","13.3","01","001","2018"],
+    ...]
+
+so each line is rewritten into a CSV record as it comes off the socket and
+fed to pandas' C parser with per-column dtypes from a schema. Any other layout
+(compact json.dumps output, pretty-printed cached bodies) is detected on the
+header and first row and decoded with json.loads instead, into the same records.
+
+- "float": float64, Census annotation sentinels (-666666666 etc.) -> NaN
+- "int":   nullable Int32 (years, category codes)
+- "fips":  compact Int32 code (state "01" -> 1, county "001" -> 1);
+           geo_registry.fips_str() pads back to fixed width for CSV output
+- "str":   left as text (NAME and anything not in the schema)
+
+Usage:
+
+    from census_decode import fetch_census
+    from geo_registry import fips_str                    # util/
+
+    df = fetch_census(BASE, params, {"SAEPOVRTALL_PT": "float", "state": "fips",
+                                     "county": "fips", "time": "int"})
+    df["fips"] = fips_str(df["state"] * 1000 + df["county"], 5)
+"""
+
+import json
+import re
+
+import numpy as np
+import pandas as pd
+
+from api_client import fetch_chunks
+
+# Census annotation values that stand for "not available / not applicable"
+# https://www.census.gov/data/developers/data-sets/acs-1year/notes-on-acs-estimate-and-annotation-values.html
+SENTINELS = np.array([-999999999, -888888888, -666666666, -555555555,
+                      -333333333, -222222222], dtype="float64")
+
+DTYPES = {"float": "float64", "int": "Int32", "fips": "Int32", "str": "string"}
+
+
+def _csv_field(v):
+    if v is None:
+        return b"null"
+    if isinstance(v, str):
+        return b'"' + v.replace('"', '""').encode("utf-8") + b'"'
+    return repr(v).encode("ascii")
+
+
+# leading "[" / "[[" and trailing "]," / "]]" of every row line
+_EDGES = re.compile(rb"^[ \t\r]*\[{1,2}|\]{1,2}[ \t\r]*,?[ \t\r]*$", re.M)
+
+
+class _CensusRows:
+    """File-like adapter: JSON row lines in, CSV records out (read() as the C parser expects)."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._pending = b""
+        self._out = bytearray()
+        self._done = False
+        self.header = None
+        self._fill(1)
+        if self.header is None:
+            raise ValueError("empty Census payload")
+
+    def _block(self, block):
+        if not block.strip():
+            return b""
+        if b"\\" not in block:
+            # fast path: the API's own layout ("],\n[" between rows) needs only bytes.replace
+            rows = block.strip().replace(b"],\n[", b"\n").lstrip(b"[").rstrip(b"],")
+            if b"\n[" not in rows and b"]\n" not in rows and b"\r" not in rows:
+                return rows + b"\n"
+            return _EDGES.sub(b"", block)
+        # escaped quotes / unicode are rare: take the exact (slow) path for those rows only
+        out = []
+        for line in block.split(b"\n"):
+            row = _EDGES.sub(b"", line)
+            if b"\\" in row:
+                row = b",".join(_csv_field(v) for v in json.loads(b"[" + row + b"]"))
+            out.append(row)
+        return b"\n".join(out)
+
+    def _fill(self, want):
+        while len(self._out) < want and not self._done:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._done = True
+                block, self._pending = self._pending + b"\n", b""
+            else:
+                buf = self._pending + chunk
+                cut = buf.rfind(b"\n") + 1
+                block, self._pending = buf[:cut], buf[cut:]
+            if self.header is None:
+                block = block.lstrip()
+                lines = block.split(b"\n", 2)
+                if len(lines) < 3 and not self._done:
+                    self._pending = block + self._pending
+                    continue
+                if not block.strip():
+                    return
+                head = self._row(lines[0])
+                first = self._row(lines[1]) if len(lines) > 1 and lines[1].strip() else head
+                if head is None or first is None or len(first) != len(head):
+                    self._whole(block)
+                    return
+                self.header = head
+                block = block[len(lines[0]) + 1:]
+            self._out += self._block(block)
+
+    @staticmethod
+    def _row(line):
+        """One row line of the API layout -> list, None if the line is not exactly one row."""
+        try:
+            row = json.loads(b"[" + _EDGES.sub(b"", line).strip() + b"]")
+        except ValueError:
+            return None
+        return row if row and not any(isinstance(v, (list, dict)) for v in row) else None
+
+    def _whole(self, block):
+        """Fallback for other layouts: parse the whole body at once."""
+        payload = json.loads(block + self._pending + b"".join(self._chunks))
+        self._pending, self._done = b"", True
+        if not payload:
+            return
+        if not isinstance(payload, list) or not all(isinstance(r, list) for r in payload):
+            raise ValueError(f"unexpected Census payload start: {block[:80]!r}")
+        self.header = payload[0]
+        for row in payload[1:]:
+            self._out += b",".join(_csv_field(v) for v in row) + b"\n"
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = 1 << 62
+        self._fill(size)
+        out = bytes(self._out[:size])
+        del self._out[:size]
+        return out
+
+
+def decode(chunks, schema, default="str"):
+    """
+    Decode a Census JSON body (any iterable of byte chunks, or a bytes object)
+    into a typed DataFrame. Columns missing from `schema` use `default`.
+    """
+    if isinstance(chunks, (bytes, bytearray)):
+        chunks = [bytes(chunks)]
+    rows = _CensusRows(chunks)
+    names = rows.header
+    kinds = {c: schema.get(c, default) for c in names}
+
+    # duplicated names (rare API quirk) would break the parser; keep the first
+    seen = {}
+    cols = []
+    for c in names:
+        seen[c] = seen.get(c, -1) + 1
+        cols.append(c if seen[c] == 0 else f"{c}.{seen[c]}")
+
+    # ints and FIPS are read as float first so that sentinels and nulls do not abort the parse
+    parse_dtype = {}
+    for c, name in zip(cols, names):
+        k = kinds[name]
+        parse_dtype[c] = "string" if k == "str" else "float64"
+
+    df = pd.read_csv(rows, header=None, names=cols, dtype=parse_dtype, engine="c",
+                     skipinitialspace=True, na_values=["null"], keep_default_na=False)
+
+    for c, name in zip(cols, names):
+        k = kinds[name]
+        if k == "str":
+            continue
+        v = df[c].to_numpy(dtype="float64", copy=False)
+        bad = np.isin(v, SENTINELS)
+        if bad.any():
+            v = v.copy()
+            v[bad] = np.nan
+        df[c] = pd.array(v, dtype="float64") if k == "float" else pd.array(v, dtype="Float64").astype(DTYPES[k])
+    return df
+
+
+def fetch_census(url, params, schema, default="str"):
+    """Stream a Census API response (through the shared client and cache) into a typed frame."""
+    return decode(fetch_chunks(url, params=params), schema, default=default)
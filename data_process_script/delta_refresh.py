@@ -0,0 +1,130 @@
+"""
+Incremental (delta) refresh helpers for the annual control-variable builders.
+
+The year range is a planner input instead of a hard-coded range():
+
+    python build_saipe_county_poverty_rate.py                       # full rebuild, default years
+    python build_saipe_county_poverty_rate.py --years 2010-2025 --incremental
+
+With --incremental the builder reads its existing output, plans only the
+(year, geography) partitions that are missing or stale, fetches those, and
+merges them back in place with an atomic write. The APIs are queried per
+year for all geographies, so a year with missing geographies is refetched
+as a whole.
+"""
+
+import argparse
+import os
+import tempfile
+from datetime import date
+
+import pandas as pd
+
+import master_store
+from api_cache import REVISABLE_YEARS
+
+# a year whose geography count falls below this share of the typical year is a partial pull
+COMPLETE_SHARE = 0.98
+
+
+def parse_years(spec):
+    """'2010-2023' / '2018,2020,2022-2024' -> sorted list of ints."""
+    years = set()
+    for part in str(spec).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            a, b = part.split("-", 1)
+            years.update(range(int(a), int(b) + 1))
+        else:
+            years.add(int(part))
+    return sorted(years)
+
+
+def cli(default_years, description=None):
+    ap = argparse.ArgumentParser(description=description)
+    ap.add_argument("--years", default=None,
+                    help="years to cover, e.g. 2010-2025 or 2018,2020-2024 (default %s-%s)"
+                         % (min(default_years), max(default_years)))
+    ap.add_argument("--incremental", action="store_true",
+                    help="fetch only missing/stale partitions and merge them into the existing output")
+    args = ap.parse_args()
+    args.years = parse_years(args.years) if args.years else sorted(default_years)
+    return args
+
+
+def plan_years(out_path, years, geo_col, year_col="year", incremental=True):
+    """
+    Years that need fetching. Full rebuild -> all of `years`. Incremental ->
+    years absent from the existing output, years with fewer geographies than
+    a typical year, and still-revisable recent years.
+    """
+    years = sorted(years)
+    if not incremental or not os.path.exists(out_path):
+        return years
+    existing = pd.read_csv(out_path, usecols=[year_col, geo_col], dtype={geo_col: str})
+    counts = existing.groupby(year_col)[geo_col].nunique()
+    typical = counts.median() if len(counts) else 0
+    cutoff = date.today().year - REVISABLE_YEARS
+    todo = []
+    for y in years:
+        if y not in counts.index or counts[y] < COMPLETE_SHARE * typical or y >= cutoff:
+            todo.append(y)
+    return todo
+
+
+def time_ranges(years):
+    """Collapse years into Census 'time' predicates, one per contiguous run."""
+    years = sorted(set(years))
+    out = []
+    start = prev = None
+    for y in years + [None]:
+        if start is None:
+            start = prev = y
+            continue
+        if y is not None and y == prev + 1:
+            prev = y
+            continue
+        out.append(str(start) if start == prev else f"from {start} to {prev}")
+        start = prev = y
+    return out
+
+
+def atomic_write_csv(df, path):
+    """Write to a temp file in the same directory, then rename over the target."""
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".tmp_", suffix=".csv", dir=folder)
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            df.to_csv(f, index=False)
+        os.chmod(tmp, 0o644)  # mkstemp creates 0600
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def write_output(new, out_path, incremental, sort_cols, year_col="year", dtype=None, parse_dates=None,
+                 source=None, schema=None):
+    """
+    Merge `new` into the existing output (incremental) and write atomically.
+    Only the years present in `new` are replaced, so a year that failed to
+    fetch keeps its previous rows. `dtype` keeps code columns (FIPS) as strings.
+    With `source`, the result is also published to the master_data Parquet
+    store (master_store.py), partitioned by year, with `schema` column kinds.
+    """
+    if incremental and os.path.exists(out_path):
+        old = pd.read_csv(out_path, dtype=dtype, parse_dates=parse_dates)
+        old = old[~old[year_col].isin(new[year_col].unique())]
+        new = pd.concat([old, new], ignore_index=True)
+    new = new.sort_values(sort_cols).reset_index(drop=True)
+    atomic_write_csv(new, out_path)
+    if source:
+        if master_store.available():
+            e = master_store.write(source, new, schema=schema, partition=year_col)
+            print(f"🗄️ master_store/{source}: {e['rows']} rows, {len(e['partitions'])} partitions")
+        else:
+            print(f"⚠️ pyarrow not installed, {source} not written to master_store")
+    return new
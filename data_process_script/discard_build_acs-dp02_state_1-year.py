@@ -1,6 +1,5 @@
-import requests
 import pandas as pd
-import time
+from api_client import fetch_all
 
 # ACS DP02 (Social Characteristics)
 # check variables' codes at: https://api.census.gov/data/2023/acs/acs1/profile/variables.json
@@ -20,22 +19,29 @@ internet_var_2 = "DP02_0153PE"  # code changed in 2021
 
 base_url = "https://api.census.gov/data/{year}/acs/acs1/profile"
 
-def fetch_acs1(year):
+def internet_var_for(year):
     if 2013 <= year <= 2019:
         internet_var = internet_var_1
     elif year >= 2020:
         internet_var = internet_var_2
     else:
         internet_var = None
+    return internet_var
 
+
+def acs1_call(year):
+    internet_var = internet_var_for(year)
     vars_use = variables_base + ([internet_var] if internet_var else [])
     url = base_url.format(year=year)
-    params = {"get": "NAME," + ",".join(vars_use), "for": "state:*"}
-    r = requests.get(url, params=params)
-    if r.status_code != 200:
+    return {"url": url, "params": {"get": "NAME," + ",".join(vars_use), "for": "state:*"}}
+
+
+def parse_acs1(year, data):
+    if isinstance(data, Exception):
         print(f"❌ Failed {year}")
         return None
-    data = r.json()
+    internet_var = internet_var_for(year)
+    vars_use = variables_base + ([internet_var] if internet_var else [])
     df = pd.DataFrame(data[1:], columns=data[0])
     for v in vars_use:
         df[v] = pd.to_numeric(df[v], errors="coerce")
@@ -56,11 +62,10 @@ def fetch_acs1(year):
     return df_out
 
 all_years = []
-for y in years:
-    d = fetch_acs1(y)
+for y, data in zip(years, fetch_all([acs1_call(y) for y in years])):
+    d = parse_acs1(y, data)
     if d is not None:
         all_years.append(d)
-    time.sleep(0.5)
 
 acs = pd.concat(all_years, ignore_index=True)
 acs.to_csv("state_social_char_2010_2024.csv", index=False)
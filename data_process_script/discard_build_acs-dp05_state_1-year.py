@@ -1,6 +1,5 @@
-import requests
 import pandas as pd
-import time
+from api_client import fetch_all
 
 # ACS DP05 (demographic and housing characteristics)
 # check variables' codes at: https://api.census.gov/data/2023/acs/acs1/profile/variables.json
@@ -25,14 +24,11 @@ variables = [
 ]
 base_url = "https://api.census.gov/data/{year}/acs/acs1/profile"
 
-def fetch_acs1(year):
-    url = base_url.format(year=year)
-    params = {"get": "NAME," + ",".join(variables), "for": "state:*"}
-    resp = requests.get(url, params=params)
-    if resp.status_code != 200:
-        print(f"❌ Failed for {year}: {resp.status_code}")
-        return None
-    data = resp.json()
+def acs1_call(year):
+    return {"url": base_url.format(year=year),
+            "params": {"get": "NAME," + ",".join(variables), "for": "state:*"}}
+
+def parse_acs1(year, data):
     df = pd.DataFrame(data[1:], columns=data[0])
     for c in variables:
         df[c] = pd.to_numeric(df[c], errors="coerce")
@@ -45,11 +41,11 @@ def fetch_acs1(year):
     return df_out
 
 all_years = []
-for y in years:
-    d = fetch_acs1(y)
-    if d is not None:
-        all_years.append(d)
-    time.sleep(1)
+for y, data in zip(years, fetch_all([acs1_call(y) for y in years])):
+    if isinstance(data, Exception):
+        print(f"❌ Failed for {y}: {data}")
+        continue
+    all_years.append(parse_acs1(y, data))
 
 acs_panel = pd.concat(all_years, ignore_index=True)
 acs_panel.to_csv("state_demographics_2010_2024.csv", index=False)
@@ -0,0 +1,97 @@
+"""
+Content-addressed cache of parsed source files as columnar frames.
+
+Slow readers (openpyxl over the LAUS workbooks, wide NHGIS extracts) run once
+per file *content*: the parsed frame is stored under FRAME_CACHE_DIR keyed by
+the SHA-256 of the source file plus a reader tag, so
+
+- re-running a merge after editing its cleaning code reuses the parsed frames
+- replacing a source file (new vintage, re-download) misses automatically
+- bump the tag when the reader itself changes what it returns
+
+Frames are written as Parquet when pyarrow / fastparquet is installed and as
+pickle otherwise.
+
+Usage:
+
+    from frame_cache import cached_frame
+
+    raw = cached_frame("laucnty23.xlsx", read_sheet, tag="laucnty-v1")
+"""
+
+import hashlib
+import os
+import tempfile
+
+import pandas as pd
+
+# ========= Config =========
+CACHE_DIR = os.getenv("FRAME_CACHE_DIR", ".frame_cache")
+# =========================
+
+
+def _has_parquet():
+    for mod in ("pyarrow", "fastparquet"):
+        try:
+            __import__(mod)
+            return True
+        except ImportError:
+            pass
+    return False
+
+
+FORMAT = "parquet" if _has_parquet() else "pickle"
+
+
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_path(digest, tag):
+    ext = ".parquet" if FORMAT == "parquet" else ".pkl"
+    return os.path.join(CACHE_DIR, f"{tag}-{digest[:32]}{ext}")
+
+
+def load(digest, tag):
+    """Cached frame for (digest, tag), or None on a miss / unreadable entry."""
+    p = cache_path(digest, tag)
+    if not os.path.exists(p):
+        return None
+    try:
+        return pd.read_parquet(p) if FORMAT == "parquet" else pd.read_pickle(p)
+    except Exception:
+        os.remove(p)
+        return None
+
+
+def save(df, digest, tag):
+    """Write atomically so parallel workers never see a half-written entry."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    p = cache_path(digest, tag)
+    fd, tmp = tempfile.mkstemp(prefix=".tmp_", dir=CACHE_DIR)
+    os.close(fd)
+    try:
+        if FORMAT == "parquet":
+            df.to_parquet(tmp, index=False)
+        else:
+            df.to_pickle(tmp)
+        os.replace(tmp, p)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return p
+
+
+def cached_frame(path, reader, tag, digest=None):
+    """reader(path) through the cache."""
+    digest = digest or file_digest(path)
+    df = load(digest, tag)
+    if df is None:
+        df = reader(path)
+        save(df, digest, tag)
+    return df
@@ -0,0 +1,253 @@
+"""
+Partitioned Parquet store for master_data, replacing the CSV hand-offs between stages.
+
+Layout (MASTER_STORE, default $THESIS_ROOT/master_data/store):
+
+    _manifest.json                        one entry per source: partition column,
+                                          schema (column -> dtype), rows per partition
+    <source>/year=2018/part-0.parquet     hive-style partitions
+    <source>/year=2019/part-0.parquet
+    ...
+
+Columns get explicit dtypes on write, so no reader re-normalises them:
+
+- "state": integer state FIPS as the shared categorical (geo_registry.STATE_DTYPE);
+  any spelling ("06", "CA", "California") is accepted, unknown values fail the write
+- "fips2" / "fips3" / "fips5": fixed-width zero-padded codes ("1" -> "01"),
+  validated once here; stored dictionary-encoded
+- "year": int16, "month" / "quarter": int8
+- "int": nullable Int32, "float": float64, "str": string, "date": datetime64
+
+Unlisted columns named state_fips (state) / county_fips / year / month get those
+kinds automatically; anything else keeps its pandas dtype.
+
+    from master_store import write, read
+
+    write("saipe_state_poverty", df, schema={"state": "state"})
+    df = read("saipe_state_poverty", columns=["state", "year", "poverty_rate"],
+              filters=[("year", ">=", 2018)])
+
+Column selection and filters are pushed down to pyarrow: partitions outside
+the filter are never opened, and row groups are skipped on their statistics.
+
+    python master_store.py ls
+    python master_store.py import ../master_data/ctrl_var_state/state_insurance_2010_2023.csv sahie_state --schema state=state
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+from geo_registry import as_state
+from paths import MASTER_DATA
+
+# ========= Config =========
+ROOT = os.getenv("MASTER_STORE", os.path.join(MASTER_DATA, "store"))
+MANIFEST = "_manifest.json"
+
+KINDS = {
+    "year": "int16", "month": "int8", "quarter": "int8",
+    "int": "Int32", "float": "float64", "str": "string", "date": "datetime64[ns]",
+}
+DEFAULT_KINDS = {"state_fips": "state", "county_fips": "fips5", "year": "year", "month": "month"}
+# =========================
+
+_lock = threading.Lock()
+
+
+def available():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _fips(s, width, col):
+    digits = s.astype("string").str.replace(r"\.0$", "", regex=True).str.replace(r"\D", "", regex=True)
+    digits = digits.mask(digits == "")
+    out = digits.str.zfill(width)
+    bad = out.notna() & (out.str.len() != width)
+    if bad.any():
+        raise ValueError(f"{col}: {int(bad.sum())} values wider than {width} digits, e.g. {out[bad].iloc[0]!r}")
+    return out
+
+
+def kinds_for(df, schema=None):
+    kinds = {c: k for c, k in DEFAULT_KINDS.items() if c in df.columns}
+    kinds.update(schema or {})
+    return kinds
+
+
+def normalize(df, schema=None):
+    """Apply the explicit column kinds (schema overrides the name-based defaults)."""
+    df = df.copy()
+    for col, kind in kinds_for(df, schema).items():
+        if col not in df.columns:
+            raise KeyError(f"schema column {col!r} not in frame")
+        if kind == "state":
+            df[col] = as_state(df[col], strict=True, territories=True)
+        elif kind.startswith("fips"):
+            df[col] = _fips(df[col], int(kind[4:]), col)
+        elif kind == "date":
+            df[col] = pd.to_datetime(df[col])
+        elif kind in ("year", "month", "quarter"):
+            v = pd.to_numeric(df[col], errors="raise")
+            if v.isna().any():
+                raise ValueError(f"{col}: {kind} column has missing values")
+            df[col] = v.astype(KINDS[kind])
+        elif kind in ("int", "float"):
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(KINDS[kind])
+        else:
+            df[col] = df[col].astype(KINDS[kind])
+    return df
+
+
+# ---------- manifest ----------
+
+def manifest(root=ROOT):
+    try:
+        with open(os.path.join(root, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _save_manifest(m, root):
+    fd, tmp = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=root)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(m, f, indent=1)
+    os.replace(tmp, os.path.join(root, MANIFEST))
+
+
+def sources(root=ROOT):
+    return sorted(manifest(root))
+
+
+# ---------- write / read ----------
+
+def _write_part(df, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".tmp_", suffix=".parquet", dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        df.to_parquet(tmp, engine="pyarrow", index=False, compression="zstd", row_group_size=64_000)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return os.path.getsize(path)
+
+
+def write(source, df, schema=None, partition="year", mode="replace", root=ROOT):
+    """
+    Write `df` as `source`, one Parquet file per `partition` value (None: a single file).
+    mode="replace" drops partitions absent from `df`; mode="upsert" keeps them and
+    requires the schema to match what is already stored.
+    """
+    if not available():
+        raise ImportError("master_store needs pyarrow (pip install pyarrow)")
+    if mode not in ("replace", "upsert"):
+        raise ValueError(f"unknown mode {mode!r}")
+    kinds = kinds_for(df, schema)
+    df = normalize(df, schema)
+    dtypes = {c: str(t) for c, t in df.dtypes.items()}
+    base = os.path.join(root, source)
+
+    with _lock:
+        os.makedirs(root, exist_ok=True)
+        m = manifest(root)
+        entry = m.get(source)
+        if mode == "upsert" and entry:
+            if entry["schema"] != dtypes or entry["partition"] != partition:
+                raise ValueError(f"{source}: schema differs from the stored one; write with mode='replace'")
+            parts = dict(entry["partitions"])
+        else:
+            parts = {}
+            if os.path.isdir(base):
+                shutil.rmtree(base)
+
+        if partition is None:
+            parts = {"": {"rows": len(df), "bytes": _write_part(df, os.path.join(base, "part-0.parquet"))}}
+        else:
+            for value, g in df.groupby(partition, sort=True, observed=True):
+                d = os.path.join(base, f"{partition}={value}")
+                parts[str(value)] = {"rows": len(g),
+                                     "bytes": _write_part(g.drop(columns=partition),
+                                                          os.path.join(d, "part-0.parquet"))}
+
+        m[source] = {
+            "partition": partition,
+            "schema": dtypes,
+            "kinds": kinds,
+            "partitions": parts,
+            "rows": sum(p["rows"] for p in parts.values()),
+            "updated": datetime.now().isoformat(timespec="seconds"),
+        }
+        _save_manifest(m, root)
+    return m[source]
+
+
+def read(source, columns=None, filters=None, root=ROOT):
+    """
+    Load `source` with column selection and DNF filters ([("year", ">=", 2018), ...])
+    pushed down to the Parquet reader. Dtypes come back as recorded in the manifest.
+    """
+    entry = manifest(root).get(source)
+    if entry is None:
+        raise KeyError(f"{source!r} not in {os.path.join(root, MANIFEST)}")
+    part = entry["partition"]
+    path = os.path.join(root, source)
+    if part is not None:
+        df = pd.read_parquet(path, engine="pyarrow", columns=columns, filters=filters,
+                             partitioning="hive")
+    else:
+        df = pd.read_parquet(os.path.join(path, "part-0.parquet"), engine="pyarrow",
+                             columns=columns, filters=filters)
+    for col, kind in entry.get("kinds", {}).items():
+        if kind == "state" and col in df.columns:
+            # parquet keeps only the observed categories; restore the shared dtype
+            df[col] = as_state(df[col], territories=True)
+    if part is not None and part in df.columns:
+        df[part] = df[part].astype(str).astype(entry["schema"][part])
+        if columns is None:
+            df = df[list(entry["schema"])]
+    return df.reset_index(drop=True)
+
+
+# ---------- CLI ----------
+
+def main():
+    ap = argparse.ArgumentParser(description="master_data Parquet store")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("ls", help="list sources with row counts")
+    imp = sub.add_parser("import", help="load an existing CSV into the store")
+    imp.add_argument("csv")
+    imp.add_argument("source")
+    imp.add_argument("--partition", default="year", help="partition column ('' for none)")
+    imp.add_argument("--schema", nargs="*", default=[], help="col=kind, e.g. state=fips2 fips=fips5")
+    args = ap.parse_args()
+
+    if args.cmd == "ls":
+        for name, e in sorted(manifest().items()):
+            print(f"{name:<36} {e['rows']:>10,} rows  {len(e['partitions']):>3} parts  "
+                  f"{len(e['schema'])} cols  {e['updated']}")
+        return
+
+    schema = dict(kv.split("=", 1) for kv in args.schema)
+    df = pd.read_csv(args.csv, dtype={c: str for c, k in schema.items() if k.startswith("fips") or k == "state"})
+    e = write(args.source, df, schema=schema, partition=args.partition or None)
+    print(f"✅ {args.source}: {e['rows']:,} rows in {len(e['partitions'])} partitions")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,53 @@
 import pandas as pd
 import glob, re, os
+from concurrent.futures import ProcessPoolExecutor
 
-files = glob.glob("laucnty*.xlsx")
+from frame_cache import cached_frame, file_digest, load
 
-def read_laucnty(fp):
-    tmp = pd.read_excel(fp, header=None, dtype=str, engine="openpyxl")
-    header_row = tmp.apply(lambda row: row.astype(str).str.contains(r"^LAUS Code$", na=False)).any(axis=1).idxmax()
-    df = pd.read_excel(fp, header=header_row, dtype=str, engine="openpyxl")
+# ========= Config =========
+FILES = sorted(glob.glob("laucnty*.xlsx"))
+OUT = "merged_laucnty_unemployment.csv"
+WORKERS = os.cpu_count() or 1
+READER_TAG = "laucnty-v1"  # bump when read_sheet() output changes
+# =========================
 
+
+def _cell(v):
+    # same text pandas' read_excel(dtype=str) would give
+    if v is None or v == "":
+        return None
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v)
+
+
+def read_sheet(fp):
+    """
+    One streaming openpyxl pass over the first sheet: rows above the
+    "LAUS Code" header are skipped, everything below is kept as text.
+    """
+    import openpyxl
+
+    wb = openpyxl.load_workbook(fp, read_only=True, data_only=True)
+    try:
+        header, rows = None, []
+        for row in wb.worksheets[0].iter_rows(values_only=True):
+            if header is None:
+                if any(isinstance(v, str) and v.strip() == "LAUS Code" for v in row):
+                    header = [str(v).strip() if v is not None else f"Unnamed: {i}"
+                              for i, v in enumerate(row)]
+                continue
+            vals = [_cell(v) for v in row[:len(header)]]
+            if any(v is not None for v in vals):
+                rows.append(vals + [None] * (len(header) - len(vals)))
+    finally:
+        wb.close()
+    if header is None:
+        raise ValueError(f"{fp}: no 'LAUS Code' header row")
+    return pd.DataFrame(rows, columns=header, dtype=object)
+
+
+def read_laucnty(fp, df):
     rename = {
         "LAUS Code": "laus_code",
         "State FIPS Code": "state_fips",
@@ -20,7 +60,7 @@ def read_laucnty(fp):
         "Unemployment Rate (%)": "unemp_rate_pct",
     }
     df = df.rename(columns=rename)
-    
+
     df["year"] = df["year"].str.extract(r"(\d{4})", expand=False)
     if df["year"].isna().all():
         m = re.search(r"laucnty(\d{2})", os.path.basename(fp))
@@ -48,7 +88,31 @@ def read_laucnty(fp):
     out = out.dropna(subset=["county_fips"]).drop_duplicates(subset=["year", "county_fips"])
     return out
 
-frames = [read_laucnty(fp) for fp in files]
-final = pd.concat(frames, ignore_index=True).sort_values(["year", "county_fips"])
-final.to_csv("merged_laucnty_unemployment.csv", index=False)
-print("Saved: merged_laucnty_unemployment.csv")
+
+def parse_cached(job):
+    fp, digest = job
+    return cached_frame(fp, read_sheet, READER_TAG, digest=digest)
+
+
+def main():
+    if not FILES:
+        raise SystemExit("No laucnty*.xlsx files found.")
+
+    # parsed workbooks are cached by content hash; only new/changed files go through openpyxl
+    digests = {fp: file_digest(fp) for fp in FILES}
+    raw = {fp: load(digests[fp], READER_TAG) for fp in FILES}
+    misses = [fp for fp in FILES if raw[fp] is None]
+    print(f"{len(FILES) - len(misses)} cached, {len(misses)} to parse")
+    if misses:
+        with ProcessPoolExecutor(max_workers=max(1, min(WORKERS, len(misses)))) as pool:
+            for fp, df in zip(misses, pool.map(parse_cached, [(fp, digests[fp]) for fp in misses])):
+                raw[fp] = df
+
+    frames = [read_laucnty(fp, raw[fp]) for fp in FILES]
+    final = pd.concat(frames, ignore_index=True).sort_values(["year", "county_fips"])
+    final.to_csv(OUT, index=False)
+    print(f"Saved: {OUT}")
+
+
+if __name__ == "__main__":
+    main()
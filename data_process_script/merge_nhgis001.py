@@ -1,50 +1,39 @@
+import os
 import pandas as pd
 import re
 from glob import glob
 from pathlib import Path
 
-base = Path("/Users/okuran/Desktop/thesis/raw_data/nhgis0001_csv")
+from nhgis import codebook_index, header, read_extract, read_years, table_titles
+from paths import CTRL_STATE, RAW_DATA
+
+base = Path(RAW_DATA) / "nhgis0001_csv"
 csv_files = sorted(glob(str(base / "*_state.csv")))
 codebooks = sorted(glob(str(base / "*_codebook.txt")))
 
-def parse_codebook(path):
-    """从codebook提取 NHGIS code → 描述"""
-    mapping = {}
-    code = None
-    with open(path, encoding="utf-8", errors="ignore") as f:
-        for line in f:
-            m = re.search(r"NHGIS code:\s+([A-Z0-9]+)", line)
-            if m:
-                code = m.group(1)
-            t = re.search(r"Table\s+\d+:\s+(.*)", line)
-            if t and code:
-                mapping[code] = t.group(1).strip()
-                code = None
-    return mapping
-
-all_dfs = []
-
-for csv_path, cb_path in zip(csv_files, codebooks):
-    year_match = re.search(r"(\d{4})", csv_path)
-    year = int(year_match.group(1)) if year_match else None
-    prefix_map = parse_codebook(cb_path)
-    df = pd.read_csv(csv_path, low_memory=False)
-
-    keep = [c for c in df.columns if c.upper() in ["YEAR", "STATE", "STATEA"]]
+def load_year(csv_path, cb_path):
+    titles = table_titles(codebook_index(cb_path))
+    cols = header(csv_path)
+
+    keep = [c for c in cols if c.upper() in ["YEAR", "STATE", "STATEA"]]
     rename = {}
 
-    for col in df.columns:
+    for col in cols:
         m = re.match(r"^([A-Z0-9]{3,5})E\d{3}$", col)  # 匹配3-5位前缀+E+3位数字
         if m:
             prefix = m.group(1)
-            if prefix in prefix_map:
-                name = re.sub(r"[^a-z0-9]+", "_", prefix_map[prefix].lower()).strip("_")
+            if prefix in titles:
+                name = re.sub(r"[^a-z0-9]+", "_", titles[prefix].lower()).strip("_")
                 rename[col] = name
                 keep.append(col)
 
-    df = df[keep].rename(columns=rename)
-    all_dfs.append(df)
+    # only the resolved columns are parsed
+    df = read_extract(csv_path, keep)
+    return df[keep].rename(columns=rename)
+
+all_dfs = read_years(zip(csv_files, codebooks), load_year)
 
 panel = pd.concat(all_dfs, ignore_index=True)
-panel.to_csv("/Users/okuran/Desktop/thesis/master_data/ctrl_var_state/state_population_2010_2023.csv", index=False)
+# build_acs-dp05_state_5-year.py adds 2020 and writes state_population_2010_2023.csv
+panel.to_csv(os.path.join(CTRL_STATE, "state_population_nhgis_2010_2023.csv"), index=False)
 print("✅ Saved")
@@ -1,40 +1,42 @@
+import os
 import pandas as pd
-import re
 from glob import glob
 from pathlib import Path
 
-base = Path("/Users/okuran/Desktop/thesis/raw_data/nhgis0002_csv")
+from nhgis import codebook_index, prefix_for, read_extract, read_years
+from paths import CTRL_STATE, RAW_DATA
+
+base = Path(RAW_DATA) / "nhgis0002_csv"
 csvs = sorted(glob(str(base / "*_state.csv")))
 codebooks = sorted(glob(str(base / "*_codebook.txt")))
 
 
-# 取某表的 NHGIS 前缀（如 B01001 -> 'IG4' 或 'LII'）
-def get_prefix(cb_path, source_code):
-    p_src = re.compile(r"Source code:\s*([A-Z0-9]+)")
-    p_nhg = re.compile(r"NHGIS code:\s*([A-Z0-9]+)")
-    last_src = None
-    with open(cb_path, encoding="utf-8", errors="ignore") as f:
-        for line in f:
-            m1 = p_src.search(line);  m2 = p_nhg.search(line)
-            if m1: last_src = m1.group(1)
-            if m2 and last_src == source_code:
-                return m2.group(1)
-    raise ValueError(f"Prefix for {source_code} not found in {cb_path}")
-
 def col(pref, suf):  # 组列名
     return f"{pref}E{suf:03d}"
 
-all_df = []
-for csv_path, cb_path in zip(csvs, codebooks):
-    year = int(re.search(r"(\d{4})", csv_path).group(1))
-    df = pd.read_csv(csv_path, low_memory=False)
+# 用到的列: 表 -> 列号
+USED = {
+    "B01001": [1, 2, *range(6, 15), *range(30, 39)],  # Sex by Age
+    "B02001": [1, 3],                                  # Race
+    "B12001": [1, 4, 13],                              # Marital Status 15+
+    "B15003": [1, *range(17, 26)],                     # Education 25+
+    "B17002": [1, 2, 3, 4],                            # Poverty ratio
+}
+
+def load_year(csv_path, cb_path):
+    idx = codebook_index(cb_path)  # 一次解析, 跨运行缓存
 
     # 前缀
-    p_age = get_prefix(cb_path, "B01001")   # Sex by Age
-    p_race = get_prefix(cb_path, "B02001")  # Race
-    p_marr = get_prefix(cb_path, "B12001")  # Marital Status 15+
-    p_edu = get_prefix(cb_path, "B15003")   # Education 25+
-    p_pov = get_prefix(cb_path, "B17002")   # Poverty ratio
+    p_age = prefix_for(idx, "B01001")   # Sex by Age
+    p_race = prefix_for(idx, "B02001")  # Race
+    p_marr = prefix_for(idx, "B12001")  # Marital Status 15+
+    p_edu = prefix_for(idx, "B15003")   # Education 25+
+    p_pov = prefix_for(idx, "B17002")   # Poverty ratio
+
+    # 只读需要的列
+    pref = {"B01001": p_age, "B02001": p_race, "B12001": p_marr, "B15003": p_edu, "B17002": p_pov}
+    need = ["YEAR", "STATE", "STATEA"] + [col(pref[t], k) for t, ks in USED.items() for k in ks]
+    df = read_extract(csv_path, need)
 
     # 安全：缺列填 0
     def g(c): return df[c] if c in df.columns else 0
@@ -70,8 +72,10 @@ for csv_path, cb_path in zip(csvs, codebooks):
         "share_ba_plus_25p": ba_plus / edu_tot,
         "poverty_rate": pov_num / pov_tot,
     })
-    all_df.append(out)
+    return out
+
+all_df = read_years(zip(csvs, codebooks), load_year)
 
 panel = pd.concat(all_df, ignore_index=True)
-panel.to_csv("/Users/okuran/Desktop/thesis/master_data/ctrl_var_state/state_acs_2010_2023.csv", index=False)
+panel.to_csv(os.path.join(CTRL_STATE, "state_acs_2010_2023.csv"), index=False)
 print("✅ Saved")
@@ -0,0 +1,119 @@
+"""
+NHGIS extract helpers: an indexed codebook parser and column-pruned reads.
+
+An NHGIS codebook lists each table as a block
+
+    Table 1:     Sex by Age
+    Universe:    Total population
+    Source code: B01001
+    NHGIS code:  IG4
+        IG4E001:     Total
+        IG4E002:     Male
+        ...
+
+codebook_index() parses the whole file in one pass into a frame with one row
+per variable (source, nhgis, title, universe, column, label). The index is
+cached by codebook content (frame_cache.py), so later runs skip parsing.
+Extracts are then read with `usecols` limited to the resolved columns, and
+read_years() reads the yearly extracts concurrently.
+
+Usage:
+
+    from nhgis import codebook_index, prefix_for, read_extract, read_years
+
+    def load(csv_path, cb_path):
+        idx = codebook_index(cb_path)
+        p = prefix_for(idx, "B01001")
+        return read_extract(csv_path, ["YEAR", "STATE", f"{p}E001"])
+
+    frames = read_years(zip(csvs, codebooks), load)
+"""
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from frame_cache import cached_frame
+
+# ========= Config =========
+INDEX_TAG = "nhgis-codebook-v1"  # bump when parse_codebook() output changes
+WORKERS = min(8, os.cpu_count() or 1)
+# =========================
+
+_TABLE = re.compile(r"^\s*Table\s+\d+:\s*(.*?)\s*$")
+_FIELDS = re.compile(r"^\s*(Universe|Source code|NHGIS code):\s*(.*?)\s*$")
+_VAR = re.compile(r"^\s+([A-Z0-9]+[EM]\d{3}):\s*(.*?)\s*$")
+
+INDEX_COLUMNS = ["source", "nhgis", "title", "universe", "column", "label"]
+
+
+def parse_codebook(path):
+    """One pass over a codebook -> one row per variable (tables with no variable lines get one row)."""
+    rows = []
+    table = None
+
+    def close():
+        if table is not None and not table["vars"]:
+            rows.append([table["source"], table["nhgis"], table["title"], table["universe"], None, None])
+
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            m = _TABLE.match(line)
+            if m:
+                close()
+                table = {"title": m.group(1), "source": None, "nhgis": None, "universe": None, "vars": 0}
+                continue
+            if table is None:
+                continue
+            m = _FIELDS.match(line)
+            if m:
+                key = {"Universe": "universe", "Source code": "source", "NHGIS code": "nhgis"}[m.group(1)]
+                table[key] = m.group(2)
+                continue
+            m = _VAR.match(line)
+            if m and table["nhgis"] and m.group(1).startswith(table["nhgis"]):
+                table["vars"] += 1
+                rows.append([table["source"], table["nhgis"], table["title"], table["universe"],
+                             m.group(1), m.group(2)])
+    close()
+    return pd.DataFrame(rows, columns=INDEX_COLUMNS, dtype=object)
+
+
+def codebook_index(path):
+    """parse_codebook() through the content-addressed cache."""
+    return cached_frame(path, parse_codebook, INDEX_TAG)
+
+
+def prefix_for(index, source_code):
+    """Source table (e.g. B01001) -> NHGIS prefix (e.g. IG4)."""
+    hit = index.loc[index["source"] == source_code, "nhgis"].dropna()
+    if hit.empty:
+        raise ValueError(f"Prefix for {source_code} not found in codebook")
+    return hit.iloc[0]
+
+
+def table_titles(index):
+    """NHGIS prefix -> table title."""
+    t = index.dropna(subset=["nhgis"]).drop_duplicates("nhgis")
+    return dict(zip(t["nhgis"], t["title"]))
+
+
+def header(csv_path):
+    return list(pd.read_csv(csv_path, nrows=0).columns)
+
+
+def read_extract(csv_path, columns):
+    """Read only `columns` (those absent from the file are skipped) from an extract."""
+    wanted = set(columns)
+    return pd.read_csv(csv_path, usecols=lambda c: c in wanted, low_memory=False)
+
+
+def read_years(jobs, load, workers=WORKERS):
+    """Run load(*job) for every (csv_path, codebook_path) job concurrently; results in job order."""
+    jobs = list(jobs)
+    if not jobs:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(jobs)))) as pool:
+        return list(pool.map(lambda job: load(*job), jobs))
@@ -0,0 +1,28 @@
+"""
+Project directories, resolved from THESIS_ROOT instead of hard-coded /Users/... paths.
+
+THESIS_ROOT defaults to this checkout (the folder holding raw_data/, master_data/,
+processed_data/), so scripts run unchanged from any clone; point it elsewhere to
+build against a different data tree.
+
+    from paths import CTRL_STATE, RAW_DATA, root
+
+    pop = pd.read_csv(os.path.join(CTRL_STATE, "state_population_2010_2023.csv"))
+    raw = root("raw_data", "nhgis0001_csv")
+"""
+
+import os
+
+# ========= Config =========
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT = os.path.abspath(os.getenv("THESIS_ROOT", REPO))
+# =========================
+
+RAW_DATA = os.path.join(ROOT, "raw_data")
+PROCESSED_DATA = os.path.join(ROOT, "processed_data")
+MASTER_DATA = os.path.join(ROOT, "master_data")
+CTRL_STATE = os.path.join(MASTER_DATA, "ctrl_var_state")
+
+
+def root(*parts):
+    return os.path.join(ROOT, *parts)
@@ -0,0 +1,482 @@
+"""
+Incremental build of master_data: every builder declares its inputs and outputs,
+and one command brings the panel up to date doing only the stale work.
+
+A target is rebuilt when
+- it has never been built, or an output is missing / was edited by hand
+- its script, or a sibling module it imports (api_client, nhgis, ...), changed
+- an input changed: a raw file, or the output of an upstream target that just re-ran
+
+Content hashes (SHA-256) are recorded in $THESIS_ROOT/.pipeline/state.json; files
+are only re-hashed when their size or mtime moved. Targets whose dependencies are
+done run concurrently (-j), each in its own process, logging to .pipeline/logs/.
+
+Paths in TARGETS are relative to THESIS_ROOT (see paths.py), scripts to the repo.
+API builders have no local inputs: they re-run when their code changes, or with
+--force. Every output has exactly one producer. An input that no target produces
+must already be on disk (curated files under master_data); otherwise the targets
+reading it fail before anything runs. Builders that also publish to the Parquet
+store (master_store.py) name their source in `store`; its partitions are optional
+outputs, written only when pyarrow is installed. The R panels read them through
+`optional` inputs, which are hashed when present and never required, so a store
+refresh still re-runs the panel.
+
+Usage:
+    python pipeline.py                  # everything stale, 4 at a time
+    python pipeline.py panel_gt -j 8    # panel_gt and whatever it needs
+    python pipeline.py -n               # dry run: what would run and why
+    python pipeline.py acs_internet --force
+    python pipeline.py --list
+"""
+
+import argparse
+import fnmatch
+import glob
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+from frame_cache import file_digest
+from paths import REPO, ROOT
+
+# ========= Config =========
+STATE_DIR = os.path.join(ROOT, ".pipeline")
+JOBS = 4
+RSCRIPT = os.getenv("RSCRIPT", "Rscript")
+
+CTRL = "master_data/ctrl_var_state"
+STORE = "master_data/store"
+
+
+@dataclass
+class Target:
+    name: str
+    script: str                                  # relative to the repo
+    inputs: list = field(default_factory=list)   # relative to THESIS_ROOT, globs allowed
+    outputs: list = field(default_factory=list)
+    optional: list = field(default_factory=list)  # read if present, e.g. store_files(source)
+    store: str = None                            # master_store source it publishes, if any
+    cwd: str = CTRL                              # builders writing bare filenames land here
+    args: list = field(default_factory=list)
+
+
+def store_files(source):
+    """Partition files of one master_store source (relative to THESIS_ROOT)."""
+    return f"{STORE}/{source}/*/*.parquet"
+
+
+DP = "data_process_script/"
+TARGETS = [
+    # ---- raw extracts ----
+    Target("nhgis_population", DP + "merge_nhgis001.py",
+           ["raw_data/nhgis0001_csv/*_state.csv", "raw_data/nhgis0001_csv/*_codebook.txt"],
+           [f"{CTRL}/state_population_nhgis_2010_2023.csv"]),
+    Target("nhgis_acs", DP + "merge_nhgis002.py",
+           ["raw_data/nhgis0002_csv/*_state.csv", "raw_data/nhgis0002_csv/*_codebook.txt"],
+           [f"{CTRL}/state_acs_2010_2023.csv"]),
+    Target("laucnty", DP + "merge_laucnty_unemployment.py",
+           ["processed_data/laucnty*.xlsx"],
+           ["processed_data/merged_laucnty_unemployment.csv"], cwd="processed_data"),
+    Target("covid_cases", DP + "merge_cdc_COVID.py",
+           ["raw_data/Weekly_United_States_COVID-19_Cases_and_Deaths_by_State_-_ARCHIVED_20251114.csv",
+            f"{CTRL}/state_population_2010_2023.csv"],
+           [f"{CTRL}/state_covid_cases_2020_2023.csv"]),
+    Target("treatment_panel", DP + "treatment_panel.r",
+           ["master_data/abortion_policies.csv"],
+           ["master_data/state_treatment_panel.csv"], cwd="."),
+
+    # ---- API builders ----
+    Target("acs_dp05_2020", DP + "build_acs-dp05_state_5-year.py",
+           [f"{CTRL}/state_population_nhgis_2010_2023.csv"],
+           ["state_demographics_2020.csv", f"{CTRL}/state_population_2010_2023.csv"]),
+    Target("acs_dp02_2020", DP + "build_acs-dp02_state_5-year.py",
+           ["state_demographics_2020.csv"],
+           [f"{CTRL}/state_demographics_2020.csv"]),
+    Target("acs_2020", DP + "build_acs_2020.py", [], [f"{CTRL}/state_acs_2020.csv"]),
+    Target("acs_2024", DP + "build_acs_2024.py", [], [f"{CTRL}/state_acs_2024.csv"]),
+    Target("acs_internet", DP + "build_acs_internet.py", [],
+           [f"{CTRL}/state_internet_2018_2024.csv"], store="acs1_state_internet"),
+    Target("acs_county_education", DP + "build_acs_county_education.py", [],
+           [f"{CTRL}/acs5_education_S1501_county_2010_2023.csv"], store="acs5_county_education"),
+    Target("bea_income", DP + "build_bea_state_real_income_quarterly.py", [],
+           [f"{CTRL}/state_percapita_income_2010_2025.csv"]),
+    Target("bls_monthly", DP + "build_bls_state_unemp_monthly.py", [],
+           [f"{CTRL}/state_monthly_unemployment_2018_2025.csv"], store="laus_state_monthly"),
+    Target("bls_yearly", DP + "build_bls_state_unemp_multi-year.py", [],
+           [f"{CTRL}/state_unemployment_2010_2024_yearly.csv"], store="laus_state_unemployment"),
+    Target("sahie_state", DP + "build_sahie_state_insurance_multi-year.py", [],
+           [f"{CTRL}/state_sahie_insurance.csv"], store="sahie_state"),
+    Target("sahie_county", DP + "build_sahie_county_insurance.py", [],
+           [f"{CTRL}/sahie_county_insured_uninsured_2010_2023.csv"], store="sahie_county"),
+    Target("saipe_state_poverty", DP + "build_saipe_state_poverty_rate.py", [],
+           [f"{CTRL}/saipe_state_poverty_2010_2024.csv"], store="saipe_state_poverty"),
+    Target("saipe_county_poverty", DP + "build_saipe_county_poverty_rate.py", [],
+           [f"{CTRL}/saipe_county_poverty_2010_2023.csv"], store="saipe_county_poverty"),
+    Target("saipe_state_real", DP + "build_saipe_state_real_2010_2023.py",
+           [f"{CTRL}/cpi_deflators_2010_2023_base2023.csv"],
+           [f"{CTRL}/saipe_state_mhi_2010_2023_real2023usd.csv"]),
+    Target("saipe_county_real", DP + "build_saipe_county_real_2010_2023.py",
+           [f"{CTRL}/cpi_deflators_2010_2023_base2023.csv"],
+           [f"{CTRL}/saipe_county_mhi_2010_2023_real2023usd.csv"], store="saipe_county_mhi_real"),
+    Target("ucr_crime", DP + "build_ucr_state_crime_rate_yearly.py", [],
+           [f"{CTRL}/state_crime_rates_2018_2024.csv", f"{CTRL}/state_violent_crime_rate_2018_2024.csv"]),
+    Target("noaa_temperature", DP + "build_noaa_state_temperature_monthly.r", [],
+           [f"{CTRL}/state_temperature_monthly_2018_2025.csv"]),
+
+    # ---- Google Trends ----
+    Target("gt_rescale", "google_trend/anchor_rescaling.py",
+           ["google_trend/raw_data_gt_group/*/*.csv"],
+           [f"master_data/STDs_state_gt/processed_{kw}_CA_anchor_scaled.csv"
+            for kw in ("Syphilis", "Gonorrhea", "Chlamydia")], cwd="."),
+
+    # ---- panels (read the renamed/curated files under master_data) ----
+    Target("panel_gt", "regression_script/build_panel_gt.r",
+           [*(f"master_data/STDs_state_gt/processed_{kw}_CA_anchor_scaled.csv"
+              for kw in ("Syphilis", "Gonorrhea", "Chlamydia")),
+            "master_data/state_treatment_panel.csv",
+            f"{CTRL}/state_demographics_2010_2023.csv",
+            f"{CTRL}/state_insurance_2010_2023.csv",
+            f"{CTRL}/state_acs_2020.csv",
+            f"{CTRL}/state_acs_2024.csv",
+            f"{CTRL}/state_percapita-income_2010_2025.csv",
+            f"{CTRL}/state_temperature_monthly_2018_2025.csv",
+            f"{CTRL}/state_unemployment_2010_2024.csv",
+            f"{CTRL}/state_internet_2018_2024.csv",
+            f"{CTRL}/state_covid_cases_2020_2023.csv"],
+           ["master_data/state_panel_2018_2024.csv"], cwd=".",
+           optional=[store_files(src) for src in ("sahie_state", "laus_state_unemployment", "acs1_state_internet")]),
+    Target("panel_cdc", "regression_script/build_panel_cdc.r",
+           ["master_data/STDs_state/*_state_2010_2023.csv",
+            "master_data/abortion_policies.csv",
+            f"{CTRL}/state_demographics_2010_2023.csv",
+            f"{CTRL}/state_acs_2020.csv",
+            f"{CTRL}/state_insurance_2010_2023.csv",
+            f"{CTRL}/state_poverty_2010_2023.csv",
+            f"{CTRL}/state_percapita-income_2010_2025.csv",
+            f"{CTRL}/state_unemployment_2010_2024.csv",
+            f"{CTRL}/state_covid_cases_2020_2023.csv"],
+           ["master_data/state_panel_2010_2023.csv"], cwd="."),
+]
+# =========================
+
+_IMPORT = re.compile(r"^\s*(?:from\s+(\w+)\s+import|import\s+(\w+))", re.M)
+
+
+# ---------- graph ----------
+
+def build_graph(targets):
+    """name -> set of upstream target names (producers of its inputs)."""
+    by_name = {t.name: t for t in targets}
+    if len(by_name) != len(targets):
+        raise ValueError("duplicate target names")
+    writers = producers(targets)
+    deps = {t.name: set() for t in targets}
+    for t in targets:
+        for i in t.inputs + t.optional:
+            for o, w in writers.items():
+                if w != t.name and fnmatch.fnmatchcase(o, i):
+                    deps[t.name].add(w)
+
+    order, seen, stack = [], set(), set()
+
+    def visit(n):
+        if n in seen:
+            return
+        if n in stack:
+            raise ValueError(f"dependency cycle through {n}")
+        stack.add(n)
+        for d in sorted(deps[n]):
+            visit(d)
+        stack.discard(n)
+        seen.add(n)
+        order.append(n)
+
+    for t in targets:
+        visit(t.name)
+    return deps, order
+
+
+def producers(targets):
+    """output path (or store partition glob) -> the one target that writes it."""
+    writers = {}
+    for t in targets:
+        for o in t.outputs + ([store_files(t.store)] if t.store else []):
+            if o in writers:
+                raise ValueError(f"{o} is written by both {writers[o]} and {t.name}")
+            writers[o] = t.name
+    return writers
+
+
+def unresolved(targets):
+    """name -> required inputs that no target produces and that are not on disk."""
+    outputs = list(producers(targets))
+    out = {}
+    for t in targets:
+        _, missing = expand(t.inputs)
+        orphan = [p for p in missing if not any(fnmatch.fnmatchcase(o, p) for o in outputs)]
+        if orphan:
+            out[t.name] = orphan
+    return out
+
+
+def upstream(names, deps):
+    out, todo = set(), list(names)
+    while todo:
+        n = todo.pop()
+        if n not in out:
+            out.add(n)
+            todo.extend(deps[n])
+    return out
+
+
+# ---------- hashing ----------
+
+class Hashes:
+    """File digests, reused while (size, mtime) is unchanged."""
+
+    def __init__(self, known):
+        self.known = known
+        self.lock = threading.Lock()
+
+    def digest(self, rel):
+        path = os.path.join(ROOT, rel)
+        st = os.stat(path)
+        with self.lock:
+            k = self.known.get(rel)
+        if k and k[0] == st.st_size and k[1] == st.st_mtime_ns:
+            return k[2]
+        d = file_digest(path)
+        with self.lock:
+            self.known[rel] = [st.st_size, st.st_mtime_ns, d]
+        return d
+
+
+def expand(patterns):
+    """Input patterns -> sorted relative paths; a pattern matching nothing is reported missing."""
+    files, missing = [], []
+    for p in patterns:
+        hits = sorted(glob.glob(os.path.join(ROOT, p))) if glob.has_magic(p) else [os.path.join(ROOT, p)]
+        hits = [h for h in hits if os.path.isfile(h)]
+        if not hits:
+            missing.append(p)
+        files.extend(os.path.relpath(h, ROOT) for h in hits)
+    return files, missing
+
+
+def code_hash(script):
+    """Script bytes plus every sibling module it imports (transitively)."""
+    h = hashlib.sha256()
+    todo, seen = [os.path.join(REPO, script)], set()
+    while todo:
+        path = todo.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        with open(path, "rb") as f:
+            src = f.read()
+        h.update(os.path.basename(path).encode() + b"\0" + src)
+        if path.endswith(".py"):
+            here = os.path.dirname(path)
+            for a, b in _IMPORT.findall(src.decode("utf-8", "ignore")):
+                for d in (here, os.path.join(REPO, "util")):
+                    mod = os.path.join(d, (a or b) + ".py")
+                    if os.path.isfile(mod):
+                        todo.append(mod)
+                        break
+    return h.hexdigest()
+
+
+# ---------- state ----------
+
+def load_state():
+    try:
+        with open(os.path.join(STATE_DIR, "state.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"targets": {}, "files": {}}
+
+
+def save_state(state):
+    os.makedirs(STATE_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=STATE_DIR)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp, os.path.join(STATE_DIR, "state.json"))
+
+
+# ---------- runner ----------
+
+class Runner:
+    def __init__(self, targets, force=(), dry_run=False):
+        self.targets = {t.name: t for t in targets}
+        self.deps, self.order = build_graph(targets)
+        self.state = load_state()
+        self.hashes = Hashes(self.state.setdefault("files", {}))
+        self.force = set(force)
+        self.dry_run = dry_run
+        self.lock = threading.Lock()
+
+    def fingerprint(self, t):
+        files, missing = expand(t.inputs)
+        files += expand(t.optional)[0]
+        return {
+            "code": code_hash(t.script),
+            "args": list(t.args),
+            "inputs": {f: self.hashes.digest(f) for f in files},
+        }, missing
+
+    def stale(self, t):
+        """(reason or None, fingerprint, missing inputs)."""
+        fp, missing = self.fingerprint(t)
+        if missing:
+            return "missing input", fp, missing
+        rec = self.state["targets"].get(t.name)
+        if t.name in self.force:
+            return "forced", fp, []
+        if rec is None:
+            return "never built", fp, []
+        for o in t.outputs:
+            if not os.path.exists(os.path.join(ROOT, o)):
+                return f"output missing: {o}", fp, []
+            if rec["outputs"].get(o) != self.hashes.digest(o):
+                return f"output modified: {o}", fp, []
+        if rec["code"] != fp["code"]:
+            return "code changed", fp, []
+        if rec["args"] != fp["args"]:
+            return "args changed", fp, []
+        for f in sorted(set(fp["inputs"]) | set(rec["inputs"])):
+            if fp["inputs"].get(f) != rec["inputs"].get(f):
+                return f"input changed: {f}", fp, []
+        return None, fp, []
+
+    def command(self, t):
+        script = os.path.join(REPO, t.script)
+        if t.script.lower().endswith(".r"):
+            return [RSCRIPT, script, *t.args]
+        return [sys.executable, script, *t.args]
+
+    def run_one(self, name):
+        t = self.targets[name]
+        reason, fp, missing = self.stale(t)
+        if missing:
+            return "failed", f"missing input: {', '.join(missing)}"
+        if reason is None:
+            return "up to date", ""
+        if self.dry_run:
+            return "would run", reason
+
+        cwd = os.path.join(ROOT, t.cwd)
+        os.makedirs(cwd, exist_ok=True)
+        os.makedirs(os.path.join(STATE_DIR, "logs"), exist_ok=True)
+        log = os.path.join(STATE_DIR, "logs", f"{name}.log")
+        env = dict(os.environ, THESIS_ROOT=ROOT, PYTHONUNBUFFERED="1")
+        t0 = time.perf_counter()
+        with open(log, "w", encoding="utf-8") as f:
+            rc = subprocess.run(self.command(t), cwd=cwd, env=env, stdout=f,
+                                stderr=subprocess.STDOUT).returncode
+        secs = time.perf_counter() - t0
+        if rc != 0:
+            return "failed", f"exit {rc} after {secs:.1f}s, see {os.path.relpath(log, ROOT)}"
+        absent = [o for o in t.outputs if not os.path.exists(os.path.join(ROOT, o))]
+        if absent:
+            return "failed", f"did not write {', '.join(absent)}"
+
+        fp["outputs"] = {o: self.hashes.digest(o) for o in t.outputs}
+        fp["built"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        with self.lock:
+            self.state["targets"][name] = fp
+            save_state(self.state)
+        return "built", f"{reason}, {secs:.1f}s"
+
+    def run(self, names, jobs=JOBS):
+        wanted = upstream(names, self.deps) if names else set(self.order)
+        todo = [n for n in self.order if n in wanted]
+        status = {}
+        print(f"🔧 {len(todo)} targets, {jobs} jobs, root {ROOT}")
+        for n, orphan in unresolved(self.targets.values()).items():
+            if n not in todo:
+                continue
+            status[n] = "failed"
+            todo.remove(n)
+            self.report(n, "failed", f"no target produces and not on disk: {', '.join(orphan)}")
+
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            running = {}
+            while todo or running:
+                for n in list(todo):
+                    ds = self.deps[n] & wanted
+                    if any(status.get(d) in ("failed", "blocked") for d in ds):
+                        status[n] = "blocked"
+                        todo.remove(n)
+                        self.report(n, "blocked", "upstream failed")
+                    elif all(d in status for d in ds):
+                        if self.dry_run and any(status[d] == "would run" for d in ds):
+                            status[n] = "would run"
+                            todo.remove(n)
+                            self.report(n, "would run", "upstream stale")
+                            continue
+                        running[pool.submit(self.run_one, n)] = n
+                        todo.remove(n)
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    n = running.pop(fut)
+                    try:
+                        st, note = fut.result()
+                    except Exception as e:
+                        st, note = "failed", repr(e)
+                    status[n] = st
+                    self.report(n, st, note)
+
+        with self.lock:
+            if not self.dry_run:
+                save_state(self.state)
+        counts = {}
+        for st in status.values():
+            counts[st] = counts.get(st, 0) + 1
+        print("📊 " + ", ".join(f"{v} {k}" for k, v in sorted(counts.items())))
+        return status
+
+    @staticmethod
+    def report(name, status, note):
+        icon = {"built": "✅", "up to date": "⏭️ ", "would run": "🔄", "failed": "❌", "blocked": "⛔"}[status]
+        print(f"{icon} {name:<24} {status}" + (f" ({note})" if note else ""), flush=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Incremental master_data build")
+    ap.add_argument("targets", nargs="*", help="targets to bring up to date (default: all)")
+    ap.add_argument("-j", "--jobs", type=int, default=JOBS)
+    ap.add_argument("-n", "--dry-run", action="store_true", help="show what would run and why")
+    ap.add_argument("--force", action="store_true", help="rebuild the named targets (default: all) even if up to date")
+    ap.add_argument("--list", action="store_true", help="list targets and their dependencies")
+    args = ap.parse_args()
+
+    force = (args.targets or [t.name for t in TARGETS]) if args.force else ()
+    runner = Runner(TARGETS, force=force, dry_run=args.dry_run)
+    unknown = [n for n in args.targets if n not in runner.targets]
+    if unknown:
+        ap.error(f"unknown targets: {', '.join(unknown)}")
+
+    if args.list:
+        for n in runner.order:
+            d = ", ".join(sorted(runner.deps[n]))
+            print(f"{n:<24} {runner.targets[n].script}" + (f"  <- {d}" if d else ""))
+        return
+
+    status = runner.run(args.targets, jobs=args.jobs)
+    if any(s in ("failed", "blocked") for s in status.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
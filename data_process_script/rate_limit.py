@@ -0,0 +1,87 @@
+"""
+Token-bucket rate limiting and a rate-limited job runner for quota-bound APIs
+(api.data.gov / FBI Crime Data Explorer: 1,000 requests per hour per key).
+
+- TokenBucket: thread-safe; `rate` tokens per second, bursts up to `capacity`
+- run_rate_limited(): concurrent workers share one bucket; jobs that still fail
+  go to a retry queue and are re-run in later rounds after a cool-down instead
+  of being silently dropped. Cache hits (api_cache) do not spend tokens.
+
+Usage:
+
+    bucket = TokenBucket.per_hour(1000, capacity=10)
+    results = run_rate_limited(jobs, bucket)   # jobs: list of fetch_json kwargs
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api_client import fetch_json, is_cached
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._t = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_hour(cls, n, capacity=1):
+        return cls(n / 3600.0, capacity)
+
+    def acquire(self):
+        """Block until one token is available, then take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._t) * self.rate)
+                self._t = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def run_rate_limited(jobs, bucket, parse=fetch_json, workers=4, rounds=3, cooldown=60,
+                     label=None):
+    """
+    Run `jobs` (dicts of keyword arguments for `parse`) on `workers` threads,
+    each request taking a token from `bucket` first. Failed jobs are retried in
+    up to `rounds` passes, `cooldown` seconds apart. Results come back in job
+    order; a job that failed every round yields its last exception.
+    """
+    jobs = list(jobs)
+    results = [None] * len(jobs)
+    label = label or (lambda i: str(i))
+
+    def run(i):
+        kw = jobs[i]
+        if not is_cached(kw["url"], kw.get("params"), kw.get("json"), kw.get("method", "GET")):
+            bucket.acquire()
+        try:
+            # one attempt per round: the retry queue, not the client, handles failures here
+            return parse(retries=1, **kw)
+        except Exception as e:
+            return e
+
+    pending = list(range(len(jobs)))
+    for rnd in range(1, rounds + 1):
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as pool:
+            out = list(pool.map(run, pending))
+        failed = []
+        for i, r in zip(pending, out):
+            results[i] = r
+            if isinstance(r, Exception):
+                failed.append(i)
+        if not failed:
+            break
+        print(f"⚠️ round {rnd}: {len(failed)} failed ({', '.join(label(i) for i in failed[:10])}"
+              f"{' ...' if len(failed) > 10 else ''})")
+        if rnd < rounds:
+            time.sleep(cooldown)
+        pending = failed
+    return results
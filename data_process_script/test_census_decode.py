@@ -0,0 +1,58 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from census_decode import decode
+
+SCHEMA = {"SAEPOVRTALL_PT": "float", "state": "fips", "county": "fips", "time": "int"}
+ROWS = [
+    ["NAME", "SAEPOVRTALL_PT", "state", "county", "time"],
+    ["Autauga County, AL", "13.3", "01", "001", "2018"],
+    ['Say "hi", County', "-666666666", "01", "003", "2018"],
+    ["Baldwin County, AL", None, "01", "005", "2019"],
+]
+
+
+def _api_layout(rows):
+    return ("[" + ",\n".join(json.dumps(r) for r in rows) + "]").encode()
+
+
+def _chunked(body, size=7):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+def _check(df):
+    assert list(df.columns) == ROWS[0]
+    assert list(df["NAME"]) == [r[0] for r in ROWS[1:]]
+    assert df["SAEPOVRTALL_PT"].iloc[0] == 13.3
+    assert df["SAEPOVRTALL_PT"].iloc[1:].isna().all()
+    assert list(df["county"]) == [1, 3, 5]
+    assert list(df["time"]) == [2018, 2018, 2019]
+
+
+def test_api_layout():
+    _check(decode(_chunked(_api_layout(ROWS)), SCHEMA))
+
+
+def test_compact_json_dumps():
+    body = json.dumps(ROWS).encode()
+    _check(decode(body, SCHEMA))
+    _check(decode(_chunked(body), SCHEMA))
+
+
+def test_pretty_printed():
+    _check(decode(_chunked(json.dumps(ROWS, indent=2).encode()), SCHEMA))
+
+
+def test_header_only():
+    for body in (json.dumps(ROWS[:1]).encode(), _api_layout(ROWS[:1])):
+        df = decode(body, SCHEMA)
+        assert list(df.columns) == ROWS[0] and len(df) == 0
+
+
+def test_same_frame_for_every_layout():
+    a = decode(_api_layout(ROWS), SCHEMA)
+    b = decode(json.dumps(ROWS, separators=(",", ":")).encode(), SCHEMA)
+    pd.testing.assert_frame_equal(a, b)
+    assert np.isnan(a["SAEPOVRTALL_PT"].iloc[2])
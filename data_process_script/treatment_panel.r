@@ -1,7 +1,9 @@
 library(data.table)
 library(lubridate)
 
-treat <- fread("/Users/okuran/Desktop/thesis/master_data/abortion_policies.csv")
+data_dir <- file.path(Sys.getenv("THESIS_ROOT", getwd()), "master_data")
+
+treat <- fread(file.path(data_dir, "abortion_policies.csv"))
 setnames(treat, tolower(names(treat)))
 
 treat[, treat_date := as.IDate(sprintf("%d-%02d-01", treated_year, treated_month))]
@@ -19,6 +21,6 @@ treatment_panel[, treated := fifelse(is.na(treated), 0, treated)]
 treatment_panel[, fips := sprintf("%02d", as.integer(state_fips))]
 treatment_panel <- treatment_panel[, .(fips, state, month, treat_date, treated, ever_treated)]
 
-fwrite(treatment_panel, "/Users/okuran/Desktop/thesis/master_data/state_treatment_treatment_panel.csv")
+fwrite(treatment_panel, file.path(data_dir, "state_treatment_panel.csv"))
 
 
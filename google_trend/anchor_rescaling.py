@@ -1,81 +1,173 @@
+"""
+Anchor-based rescaling of Google Trends group downloads, every keyword in one run.
+
+Each keyword directory under GROUP_DIR holds the manual comparison downloads
+(one CSV per group: the anchor state + 4 others, see generate_gt_urls.py):
+
+    raw_data_gt_group/10-5-2025_Syphilis/gt_Group1_....csv
+    raw_data_gt_group/10-5-2025_Syphilis/gt_Group2_....csv
+    raw_data_gt_group/10-5-2025_Gonorrhea/...
+
+Group g is put on Group1's scale by dividing by the anchor's mean in g over its
+mean in Group1. Files are parsed in parallel by gt_ingest.parse_export (same "<1"
+handling as every other GT input), and the scaling is one grouped mean + a mapped
+division. When a keyword has several refresh directories (<m-d-Y>_<Keyword>), the
+newest wins.
+
+Designs that are not "anchor + 4 others in every group" (ladders, extra bridge
+groups from `generate_gt_urls.py --plan`) go through the least-squares solver in
+overlap_rescaling.py, which also reports each state's scale and its standard
+error; --method auto picks it whenever the anchor is missing from a group or a
+state was downloaded more than once.
+
+Output: OUT_DIR/processed_<Keyword>_<ANCHOR>_anchor_scaled.csv (CA by default)
+        (Month, State, FIPS, value, value_scaled), one file per keyword;
+        least-squares runs add OUT_DIR/scales_<Keyword>.csv (State, scale, se_log, groups).
+
+Usage:
+    python anchor_rescaling.py                         # all keywords
+    python anchor_rescaling.py Syphilis Gonorrhea      # a subset
+    python anchor_rescaling.py --root DIR --out DIR --anchor California
+    python anchor_rescaling.py --method lsq
+"""
+
+import argparse
 import os
-import pandas as pd
-import matplotlib.pyplot as plt
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from glob import glob
 
+import numpy as np
+import pandas as pd
 
-ROOT_DIR = "/Users/okuran/Desktop/thesis/google_trend/raw_data_gt_group/10-5-2025_Syphilis" 
-OUTPUT_PATH = "processed_Syphilis_CA_anchor_scaled.csv"
-ANCHOR_STATE = "California"
-
-state_fips = {
-    "Alabama": "01", "Alaska": "02", "Arizona": "04", "Arkansas": "05", "California": "06", "Colorado": "08",
-    "Connecticut": "09", "Delaware": "10", "District of Columbia": "11", "Florida": "12", "Georgia": "13", "Hawaii": "15", "Idaho": "16",
-    "Illinois": "17", "Indiana": "18", "Iowa": "19", "Kansas": "20", "Kentucky": "21", "Louisiana": "22",
-    "Maine": "23", "Maryland": "24", "Massachusetts": "25", "Michigan": "26", "Minnesota": "27",
-    "Mississippi": "28", "Missouri": "29", "Montana": "30", "Nebraska": "31", "Nevada": "32",
-    "New Hampshire": "33", "New Jersey": "34", "New Mexico": "35", "New York": "36", "North Carolina": "37",
-    "North Dakota": "38", "Ohio": "39", "Oklahoma": "40", "Oregon": "41", "Pennsylvania": "42",
-    "Rhode Island": "44", "South Carolina": "45", "South Dakota": "46", "Tennessee": "47", "Texas": "48",
-    "Utah": "49", "Vermont": "50", "Virginia": "51", "Washington": "53", "West Virginia": "54",
-    "Wisconsin": "55", "Wyoming": "56"
-}
-
-# === Step 1: Read all group files ===
-csv_files = sorted(glob(os.path.join(ROOT_DIR, "*.csv")))
-print(f"Found {len(csv_files)} CSV files.")
-
-dfs = []
-for file in csv_files:
-    df = pd.read_csv(file, skiprows=1)
-    df.columns = [c.strip() for c in df.columns]
-
-    # Melt the wide file into long format
-    long_df = df.melt(id_vars=["Month"], var_name="State", value_name="value")
-
-    # Clean state names (extract text inside parentheses)
-    long_df["State"] = long_df["State"].str.extract(r"\((.*?)\)").iloc[:, 0].str.strip()
-
-    # Add FIPS
-    long_df["FIPS"] = long_df["State"].map(state_fips)
-
-    # Extract Group name from filename
-    group_name = os.path.basename(file).split("_")[1]
-    long_df["Group"] = group_name
-
-    dfs.append(long_df)
-
-# === Step 2: Combine all groups ===
-data = pd.concat(dfs, ignore_index=True)
-data["Month"] = pd.to_datetime(data["Month"], format="%Y-%m")
-
-# === Step 3: Calculate California mean per group ===
-california_means = (
-    data[data["State"] == ANCHOR_STATE]
-    .groupby("Group")["value"]
-    .mean()
-    .to_dict()
-)
-
-if "Group1" not in california_means:
-    raise ValueError("Group1 must contain California data as the anchor reference.")
-
-anchor_mean = california_means["Group1"]
-
-# === Step 4: Compute scaling ratios relative to Group1 ===
-scaling_factor = {g: v / anchor_mean for g, v in california_means.items()}
-print("\nScaling ratios (California as anchor):")
-for g, r in scaling_factor.items():
-    print(f"{g}: {r:.3f}")
-
-# === Step 5: Apply scaling ratios to all values ===
-data["value_scaled"] = data.apply(lambda row: row["value"] / scaling_factor[row["Group"]], axis=1)
-# Keep only Group1 for California
-data = data[~((data["State"] == ANCHOR_STATE) & (data["Group"] != "Group1"))]
-
-# === Step 6: Save output ===
-data = data[["Month", "State", "FIPS", "value", "value_scaled"]]
-data.to_csv(OUTPUT_PATH, index=False)
-
-print(f"\n✅ Scaled dataset saved to: {OUTPUT_PATH}")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+from geo_registry import abbr_of, name_of, state_code
+from gt_ingest import parse_export
+from overlap_rescaling import rescale as lsq_rescale
 
+# ========= Config =========
+THESIS_ROOT = os.getenv("THESIS_ROOT", os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+GROUP_DIR = os.path.join(THESIS_ROOT, "google_trend", "raw_data_gt_group")
+OUT_DIR = os.path.join(THESIS_ROOT, "master_data", "STDs_state_gt")
+ANCHOR_STATE = "California"
+REF_GROUP = "Group1"
+WORKERS = min(8, os.cpu_count() or 1)
+# =========================
+
+_DIR = re.compile(r"^(\d{1,2}-\d{1,2}-\d{4})_(.+)$")
+
+
+def keyword_dirs(root):
+    """Keyword -> newest download directory."""
+    best = {}
+    for d in sorted(glob(os.path.join(root, "*"))):
+        if not os.path.isdir(d):
+            continue
+        m = _DIR.match(os.path.basename(d))
+        if m:
+            stamp, kw = datetime.strptime(m.group(1), "%m-%d-%Y"), m.group(2)
+        else:
+            stamp, kw = datetime.min, os.path.basename(d)
+        if kw not in best or stamp > best[kw][0]:
+            best[kw] = (stamp, d)
+    return {kw: d for kw, (_, d) in sorted(best.items())}
+
+
+def read_group_file(path):
+    """One wide GT download -> long frame (Month, State, FIPS, Group, value)."""
+    gt = parse_export(path)      # month-major, "<1" already set to LT1_VALUE
+    n_s = int((gt["date"] == gt["date"].iloc[0]).sum()) if len(gt) else 1
+    # state-major, like df.melt(id_vars="Month"): every month of one state, then the next
+    gt = gt.iloc[np.arange(len(gt)).reshape(-1, n_s).T.ravel()]
+    names = name_of(gt["state"])
+    return pd.DataFrame({
+        "Month": gt["date"].to_numpy(),
+        "State": np.where(names.isna(), gt["geo"].astype(object), names.astype(object)),
+        "FIPS": gt["state"].astype("Int16").array,
+        "Group": os.path.basename(path).split("_")[1],
+        "value": gt["value"].to_numpy("float64"),
+    })
+
+
+def anchor_rescale(data, anchor=ANCHOR_STATE, ref_group=REF_GROUP):
+    """Divide each group by (anchor mean in group) / (anchor mean in ref_group); keep the anchor once."""
+    is_anchor = data["State"].to_numpy() == anchor
+    means = data.loc[is_anchor].groupby("Group")["value"].mean()
+    if ref_group not in means.index:
+        raise ValueError(f"{ref_group} must contain {anchor} data as the anchor reference.")
+    factor = means / means[ref_group]
+
+    out = data.assign(value_scaled=data["value"].to_numpy() / data["Group"].map(factor).to_numpy())
+    out = out.loc[~is_anchor | (data["Group"].to_numpy() == ref_group)]
+    return out[["Month", "State", "FIPS", "value", "value_scaled"]].reset_index(drop=True), factor
+
+
+def single_anchor(data, anchor=ANCHOR_STATE):
+    """True for the classic design: anchor in every group, every other state downloaded once."""
+    per_group = data.drop_duplicates(["Group", "State"])
+    has_anchor = per_group.loc[per_group["State"] == anchor, "Group"].nunique() == per_group["Group"].nunique()
+    others = per_group.loc[per_group["State"] != anchor, "State"]
+    return has_anchor and not others.duplicated().any()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Anchor-based rescaling for every GT keyword")
+    ap.add_argument("keywords", nargs="*", help="keywords to process (default: every directory)")
+    ap.add_argument("--root", default=GROUP_DIR)
+    ap.add_argument("--out", default=OUT_DIR)
+    ap.add_argument("--anchor", default=ANCHOR_STATE)
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    ap.add_argument("--method", choices=["auto", "anchor", "lsq"], default="auto")
+    args = ap.parse_args()
+
+    dirs = keyword_dirs(args.root)
+    if args.keywords:
+        missing = [k for k in args.keywords if k not in dirs]
+        if missing:
+            raise SystemExit(f"❌ no download directory for: {', '.join(missing)}")
+        dirs = {k: dirs[k] for k in args.keywords}
+    if not dirs:
+        raise SystemExit(f"❌ no keyword directories under {args.root}")
+
+    anchor_abbr = abbr_of([args.anchor])[0]
+    os.makedirs(args.out, exist_ok=True)
+    t0 = time.perf_counter()
+
+    # every group file of every keyword goes through one pool
+    files = {kw: sorted(glob(os.path.join(d, "*.csv"))) for kw, d in dirs.items()}
+    flat = [f for fs in files.values() for f in fs]
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        frames = iter(list(pool.map(read_group_file, flat)))
+
+    for kw, fs in files.items():
+        if not fs:
+            print(f"⚠️ {kw}: no CSV files in {dirs[kw]}")
+            continue
+        data = pd.concat([next(frames) for _ in fs], ignore_index=True)
+        out = os.path.join(args.out, f"processed_{kw}_{anchor_abbr}_anchor_scaled.csv")
+        method = args.method
+        if method == "auto":
+            method = "anchor" if single_anchor(data, args.anchor) else "lsq"
+
+        if method == "anchor":
+            scaled, factor = anchor_rescale(data, anchor=args.anchor)
+            scaled.to_csv(out, index=False)
+            ratios = ", ".join(f"{g}: {r:.3f}" for g, r in
+                               sorted(factor.items(), key=lambda kv: int(re.sub(r"\D", "", kv[0]) or 0)))
+            print(f"✅ {kw}: {len(fs)} groups, {len(scaled):,} rows -> {out}\n   ratios ({args.anchor} as anchor): {ratios}")
+        else:
+            scaled, scales = lsq_rescale(data, ref_group=REF_GROUP)
+            scaled[["Month", "State", "FIPS", "value", "value_scaled"]].to_csv(out, index=False)
+            scales.insert(1, "FIPS", state_code(scales["State"]).to_numpy())
+            scales.to_csv(os.path.join(args.out, f"scales_{kw}.csv"), index=False)
+            worst = scales.nlargest(3, "se_log")
+            print(f"✅ {kw}: {len(fs)} groups, {len(scaled):,} rows -> {out} (least squares)\n   "
+                  f"largest scale SE: " + ", ".join(f"{s} {e:.1%}" for s, e in zip(worst["State"], worst["se_log"])))
+    print(f"⏱️ {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,33 @@
 """
 Durable Google Trends Harvester (2016-2025)
 - Crawl per (state, keyword) to avoid rate limits
-- Exponential backoff on errors (incl. 429)
-- Save each job to disk immediately (weekly + monthly)
-- Checkpoint file to support resume
+- Small worker pool sharing one adaptive, 429-aware global rate limiter
+- Save each job to disk immediately (weekly)
+- SQLite job journal: one row written per finished job, crash-safe resume
+- Monthly series for every pair in one pass at the end (gt_resample.py,
+  day-weighted for weeks that straddle two months) -> gt_out/gt_monthly.parquet
 """
 
-import os, time, json, math, re
+import os, sys, time, json, math, re, random, sqlite3, threading
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import pytrends.request
 from pytrends.request import TrendReq
 
+from gt_ingest import ingest
+from gt_resample import resample
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+from geo_registry import STATES
+
 # ========= Config =========
 TIMEFRAME = "2016-01-01 2025-12-31"
 OUTDIR = "gt_out"
-CHECKPOINT = os.path.join(OUTDIR, "checkpoint.csv")
+CHECKPOINT = os.path.join(OUTDIR, "checkpoint.sqlite")
+LEGACY_CHECKPOINT = os.path.join(OUTDIR, "checkpoint.csv")  # imported once if present
 LOGFILE = os.path.join(OUTDIR, "runner.log")
+MONTHLY_FILE = os.path.join(OUTDIR, "gt_monthly.parquet")
 
 # Keywords
 KEYWORDS = [
@@ -26,57 +38,96 @@ KEYWORDS = [
 ]
 
 # 50 states + DC
-US_STATES = [
-    "AL","AK","AZ","AR","CA","CO","CT","DE","FL","GA",
-    "HI","ID","IL","IN","IA","KS","KY","LA","ME","MD",
-    "MA","MI","MN","MS","MO","MT","NE","NV","NH","NJ",
-    "NM","NY","NC","ND","OH","OK","OR","PA","RI","SC",
-    "SD","TN","TX","UT","VT","VA","WA","WV","WI","WY","DC"
-]
-
-# Rate-limit policy
-BASE_SLEEP = 8         # seconds between successful requests
+US_STATES = STATES["abbr"].tolist()
+
+# Rate-limit policy (global across workers)
+WORKERS = 3
+BASE_SLEEP = 8         # starting gap (s) between any two requests
+MIN_SLEEP = 4          # the gap never shrinks below this
+MAX_SLEEP = 120
+BACKOFF_FACTOR = 2     # gap *= 2 on 429 ...
+RECOVER_FACTOR = 0.95  # ... and *= 0.95 after each success
+COOLDOWN_ON_429 = 60   # everyone pauses this long when anyone hits 429
 MAX_RETRIES = 5
-BACKOFF_FACTOR = 2     # 8s -> 16s -> 32s ...
-COOLDOWN_ON_429 = 60   # cool down when hitting 429
+
+# e.g. http://127.0.0.1:8765 to run against util/replay_server.py instead of Google
+API_BASE_OVERRIDE = os.getenv("API_BASE_OVERRIDE", "").rstrip("/")
 
 # =========================
 
+_log_lock = threading.Lock()
+
 def log(msg):
     os.makedirs(OUTDIR, exist_ok=True)
     ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(LOGFILE, "a", encoding="utf-8") as f:
-        f.write(f"[{ts}] {msg}\n")
-    print(f"[{ts}] {msg}")
+    with _log_lock:
+        with open(LOGFILE, "a", encoding="utf-8") as f:
+            f.write(f"[{ts}] {msg}\n")
+        print(f"[{ts}] {msg}")
 
 def slugify(s):
     s = s.lower().strip()
     s = re.sub(r"[^a-z0-9]+","_", s)
     return s.strip("_")
 
-def weekly_to_monthly(df_weekly):
-    df = df_weekly.copy()
-    if "isPartial" in df.columns:
-        df = df.drop(columns=["isPartial"], errors="ignore")
-    df.index = pd.to_datetime(df.index)
-    monthly = df.resample("MS").mean(numeric_only=True)
-    return monthly
-
-def load_checkpoint():
-    if os.path.exists(CHECKPOINT):
-        df = pd.read_csv(CHECKPOINT)
-    else:
-        rows = []
-        for st in US_STATES:
-            for kw in KEYWORDS:
-                rows.append({"state": st, "keyword": kw, "done": 0, "path_weekly": "", "path_monthly": ""})
-        df = pd.DataFrame(rows)
+class AdaptiveRateLimiter:
+    """
+    One gate for all workers: requests start at least `gap` seconds apart.
+    A 429 doubles the gap and pauses everyone for COOLDOWN_ON_429; each
+    success shrinks the gap a little, so throughput tracks the real quota.
+    """
+
+    def __init__(self):
+        self.gap = BASE_SLEEP
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            # small jitter so workers do not fire in lockstep
+            self._next = start + self.gap * random.uniform(0.9, 1.1)
+        time.sleep(max(0.0, start - time.monotonic()))
+
+    def success(self):
+        with self._lock:
+            self.gap = max(MIN_SLEEP, self.gap * RECOVER_FACTOR)
+
+    def throttled(self):
+        with self._lock:
+            self.gap = min(MAX_SLEEP, self.gap * BACKOFF_FACTOR)
+            self._next = max(self._next, time.monotonic() + COOLDOWN_ON_429)
+            return self.gap
+
+
+class Journal:
+    """Finished jobs live in SQLite; marking one done is a single-row insert."""
+
+    def __init__(self, path=CHECKPOINT):
         os.makedirs(OUTDIR, exist_ok=True)
-        df.to_csv(CHECKPOINT, index=False)
-    return df
-
-def save_checkpoint(df):
-    df.to_csv(CHECKPOINT, index=False)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS done (
+            state TEXT, keyword TEXT, path_weekly TEXT, path_monthly TEXT, finished_at TEXT,
+            PRIMARY KEY (state, keyword))""")
+        if os.path.exists(LEGACY_CHECKPOINT):
+            old = pd.read_csv(LEGACY_CHECKPOINT).fillna("")
+            for r in old[old["done"] == 1].itertuples():
+                self.mark_done(r.state, r.keyword, r.path_weekly, r.path_monthly)
+            os.replace(LEGACY_CHECKPOINT, LEGACY_CHECKPOINT + ".imported")
+
+    def done_pairs(self):
+        with self._lock:
+            return set(self._db.execute("SELECT state, keyword FROM done").fetchall())
+
+    def mark_done(self, state, keyword, f_weekly, f_month):
+        ts = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO done VALUES (?,?,?,?,?)",
+                             (state, keyword, f_weekly, f_month, ts))
 
 def fetch_one(pytrends, keyword, state):
     """Return weekly DataFrame with single column [keyword]."""
@@ -89,81 +140,94 @@ def fetch_one(pytrends, keyword, state):
         df = df.drop(columns=["isPartial"])
     return df
 
-def run():
-    pytrends = TrendReq(hl="en-US", tz=360)
-    ckpt = load_checkpoint()
+def job_path(kw, st):
+    kw_slug = slugify(kw)
+    outdir_pair = os.path.join(OUTDIR, f"{kw_slug}", st)
+    os.makedirs(outdir_pair, exist_ok=True)
+    return os.path.join(outdir_pair, f"{kw_slug}__{st}__weekly.csv")
+
+
+def run_job(pytrends, limiter, journal, kw, st):
+    f_weekly = job_path(kw, st)
+
+    # Skip if it exists (e.g. file written before a crash, journal row missing)
+    if os.path.exists(f_weekly):
+        journal.mark_done(st, kw, f_weekly, MONTHLY_FILE)
+        return True
+
+    last_err = None
+    for attempt in range(1, MAX_RETRIES + 1):
+        limiter.wait()
+        log(f"Fetching [{kw}] for state [{st}] (attempt {attempt}) ...")
+        try:
+            weekly = fetch_one(pytrends, kw, st)
+        except Exception as e:
+            last_err = e
+            msg = str(e)
+            log(f"Error (attempt {attempt}/{MAX_RETRIES}) {st}-{kw}: {msg}")
+            if "429" in msg or "TooManyRequests" in msg:
+                gap = limiter.throttled()
+                log(f"Hit 429; global cooldown {COOLDOWN_ON_429}s, gap now {gap:.1f}s")
+            continue
 
-    total = len(ckpt)
-    done_before = ckpt["done"].sum()
-    log(f"Jobs total: {total}, already done: {done_before}")
+        if weekly.empty:
+            log(f"Empty response for {st} - {kw}. Saving empty and continue.")
+            pd.DataFrame().to_csv(f_weekly, index=False)
+        else:
+            weekly.to_csv(f_weekly)  # date index + column=kw
+        journal.mark_done(st, kw, f_weekly, MONTHLY_FILE)
+        limiter.success()
+        return True
 
-    for idx, row in ckpt.iterrows():
-        if int(row["done"]) == 1:
-            continue
-        kw = row["keyword"]
-        st = row["state"]
-        kw_slug = slugify(kw)
-
-        # Output paths
-        outdir_pair = os.path.join(OUTDIR, f"{kw_slug}", st)
-        os.makedirs(outdir_pair, exist_ok=True)
-        f_weekly = os.path.join(outdir_pair, f"{kw_slug}__{st}__weekly.csv")
-        f_month = os.path.join(outdir_pair, f"{kw_slug}__{st}__monthly.csv")
-
-        # Skip if both exist
-        if os.path.exists(f_weekly) and os.path.exists(f_month):
-            ckpt.at[idx, "done"] = 1
-            ckpt.at[idx, "path_weekly"] = f_weekly
-            ckpt.at[idx, "path_monthly"] = f_month
-            save_checkpoint(ckpt)
-            continue
+    log(f"FAILED after {MAX_RETRIES} attempts: {st}-{kw} | {last_err}")
+    # not journaled; it will retry next run
+    return False
 
-        log(f"Fetching [{kw}] for state [{st}] ...")
-
-        # Retry with exponential backoff
-        last_err = None
-        for attempt in range(1, MAX_RETRIES + 1):
-            try:
-                weekly = fetch_one(pytrends, kw, st)
-                if weekly.empty:
-                    log(f"Empty response for {st} - {kw}. Saving empty and continue.")
-                    pd.DataFrame().to_csv(f_weekly, index=False)
-                    pd.DataFrame().to_csv(f_month, index=False)
-                else:
-                    weekly.to_csv(f_weekly)  # date index + column=kw
-                    monthly = weekly_to_monthly(weekly)
-                    monthly.to_csv(f_month)
-                # Mark checkpoint
-                ckpt.at[idx, "done"] = 1
-                ckpt.at[idx, "path_weekly"] = f_weekly
-                ckpt.at[idx, "path_monthly"] = f_month
-                save_checkpoint(ckpt)
-
-                # polite sleep
-                time.sleep(BASE_SLEEP)
-                break
-
-            except Exception as e:
-                last_err = e
-                msg = str(e)
-                log(f"Error (attempt {attempt}/{MAX_RETRIES}) {st}-{kw}: {msg}")
-
-                # 429 handling hint
-                if "429" in msg or "TooManyRequests" in msg:
-                    log(f"Hit 429; cooling down {COOLDOWN_ON_429}s")
-                    time.sleep(COOLDOWN_ON_429)
-
-                # exponential backoff
-                backoff = BASE_SLEEP * (BACKOFF_FACTOR ** (attempt - 1))
-                backoff = max(backoff, BASE_SLEEP)
-                log(f"Backoff sleeping {int(backoff)}s")
-                time.sleep(backoff)
 
-        else:
-            log(f"FAILED after {MAX_RETRIES} attempts: {st}-{kw} | {last_err}")
-            # do not mark done; it will retry next run
+def build_monthly():
+    """Every harvested weekly series -> one monthly table (day-weighted, see gt_resample.py)."""
+    weekly = ingest(os.path.join(OUTDIR, "*", "*", "*__weekly.csv"))
+    monthly = resample(weekly, "month")
+    monthly.to_parquet(MONTHLY_FILE, index=False)
+    log(f"Monthly: {weekly.groupby(['keyword', 'geo'], observed=True).ngroups} series, "
+        f"{len(monthly):,} rows -> {MONTHLY_FILE}")
 
-    log("All jobs processed (or attempted).")
+
+def route_pytrends(base):
+    """Point pytrends (module base URL + the class-level endpoint URLs) at `base`."""
+    old = pytrends.request.BASE_TRENDS_URL
+    new = f"{base}/trends.google.com/trends"
+    pytrends.request.BASE_TRENDS_URL = new
+    for name, value in list(vars(TrendReq).items()):
+        if isinstance(value, str) and value.startswith(old):
+            setattr(TrendReq, name, new + value[len(old):])
+
+
+def run():
+    if API_BASE_OVERRIDE:
+        route_pytrends(API_BASE_OVERRIDE)
+        log(f"Routing Google Trends calls to {API_BASE_OVERRIDE}")
+    journal = Journal()
+    limiter = AdaptiveRateLimiter()
+
+    done = journal.done_pairs()
+    jobs = [(st, kw) for st in US_STATES for kw in KEYWORDS if (st, kw) not in done]
+    log(f"Jobs total: {len(US_STATES) * len(KEYWORDS)}, already done: {len(done)}, workers: {WORKERS}")
+
+    # pytrends keeps cookies/session state, so one client per worker thread
+    local = threading.local()
+
+    def work(job):
+        if not hasattr(local, "pytrends"):
+            local.pytrends = TrendReq(hl="en-US", tz=360)
+        st, kw = job
+        return run_job(local.pytrends, limiter, journal, kw, st)
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        ok = sum(pool.map(work, jobs))
+
+    log(f"All jobs processed (or attempted): {ok}/{len(jobs)} succeeded this run.")
+    build_monthly()
 
 if __name__ == "__main__":
     run()
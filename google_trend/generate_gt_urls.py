@@ -1,5 +1,30 @@
 # -*- coding: utf-8 -*-
-import textwrap
+"""
+Google Trends comparison URLs for the manual multi-state downloads.
+
+Default: the classic design, California + 4 other states per group (13 groups).
+
+--plan: groups chosen for precision. States are ordered by an expected search
+volume (a previous run's output), chained in a ladder of similar-sized states
+(each group shares one state with the previous one), then bridge groups are
+added greedily wherever the predicted scale SE of a state is still above
+--target-se. Predictions use the same least-squares model as
+overlap_rescaling.py, so the downloads can be rescaled with
+`anchor_rescaling.py --method lsq` (auto-selected for non-classic designs).
+
+Usage:
+    python generate_gt_urls.py
+    python generate_gt_urls.py --plan --prior ../master_data/STDs_state_gt/scales_Syphilis.csv --target-se 0.03
+"""
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+from geo_registry import STATES
+from overlap_rescaling import expected_se
 
 # === Parameters ===
 diseases = {
@@ -12,47 +37,137 @@ date_param = "2018-01-01%202025-08-31"
 base_url = "https://trends.google.com/trends/explore"
 output_file = "gt_batches_url" \
 ".txt"
+plan_file = "gt_plan.csv"
+
+ANCHOR = "California"
+GROUP_SIZE = 5          # GT compares at most 5 items
+MONTHS = 92             # 2018-01 .. 2025-08
+NOISE_CV = 0.15         # month-to-month sampling noise assumed when planning
 
 # === State full names and corresponding codes ===
-state_code_map = {
-    "Alabama": "US-AL", "Alaska": "US-AK", "Arizona": "US-AZ", "Arkansas": "US-AR",
-    "California": "US-CA", "Colorado": "US-CO", "Connecticut": "US-CT", "Delaware": "US-DE",
-    "District of Columbia": "US-DC", "Florida": "US-FL", "Georgia": "US-GA", "Hawaii": "US-HI",
-    "Idaho": "US-ID", "Illinois": "US-IL", "Indiana": "US-IN", "Iowa": "US-IA", "Kansas": "US-KS",
-    "Kentucky": "US-KY", "Louisiana": "US-LA", "Maine": "US-ME", "Maryland": "US-MD",
-    "Massachusetts": "US-MA", "Michigan": "US-MI", "Minnesota": "US-MN", "Mississippi": "US-MS",
-    "Missouri": "US-MO", "Montana": "US-MT", "Nebraska": "US-NE", "Nevada": "US-NV",
-    "New Hampshire": "US-NH", "New Jersey": "US-NJ", "New Mexico": "US-NM", "New York": "US-NY",
-    "North Carolina": "US-NC", "North Dakota": "US-ND", "Ohio": "US-OH", "Oklahoma": "US-OK",
-    "Oregon": "US-OR", "Pennsylvania": "US-PA", "Rhode Island": "US-RI", "South Carolina": "US-SC",
-    "South Dakota": "US-SD", "Tennessee": "US-TN", "Texas": "US-TX", "Utah": "US-UT",
-    "Vermont": "US-VT", "Virginia": "US-VA", "Washington": "US-WA", "West Virginia": "US-WV",
-    "Wisconsin": "US-WI", "Wyoming": "US-WY"
-}
+state_code_map = dict(zip(STATES["name"], STATES["gt"]))
+
+
+def classic_groups():
+    """California + 4 others per group, others sorted by full name (incl. DC)."""
+    other_states = [name for name in sorted(state_code_map) if name != ANCHOR]
+    step = GROUP_SIZE - 1
+    return [[ANCHOR] + other_states[i:i + step] for i in range(0, len(other_states), step)]
+
+
+def ladder_groups(order, size=GROUP_SIZE):
+    """Consecutive states by volume; group k+1 starts with the last state of group k."""
+    groups, i = [], 0
+    while i < len(order) - 1 or not groups:
+        groups.append(order[i:i + size])
+        i += size - 1
+    if len(groups[-1]) < size and len(groups) > 1:
+        # pad the tail group with its larger neighbours so every download has 5 items
+        tail = groups[-1]
+        extra = [s for s in reversed(order[:order.index(tail[0])]) if s not in tail][:size - len(tail)]
+        groups[-1] = extra[::-1] + tail
+    return groups
+
+
+def bridge_candidates(worst, order, groups, size=GROUP_SIZE):
+    """Groups that re-link `worst`: windows of similar volume and shortcuts towards the top."""
+    r = order.index(worst)
+    step = size - 1
+    cands = []
+    for off in range(size):
+        lo = r - off
+        if lo >= 0 and lo + size <= len(order):
+            cands.append(order[lo:lo + size])
+    for k in (1, 2, 3):
+        ranks = [r - j * k * step for j in range(size)]
+        if ranks[-1] >= 0:
+            cands.append([order[i] for i in reversed(ranks)])
+    existing = {frozenset(g) for g in groups}
+    return [c for c in cands if frozenset(c) not in existing]
+
+
+def plan_groups(volume, months=MONTHS, target_se=0.03, max_groups=20, noise_cv=NOISE_CV):
+    order = sorted(volume, key=lambda s: -volume[s])
+    groups = ladder_groups(order)
+    se = expected_se(groups, volume, months, noise_cv=noise_cv)
+    while se.max() > target_se and len(groups) < max_groups:
+        best = None
+        for cand in bridge_candidates(se.idxmax(), order, groups):
+            s2 = expected_se(groups + [cand], volume, months, noise_cv=noise_cv)
+            if best is None or s2.max() < best[0].max():
+                best = (s2, cand)
+        if best is None or best[0].max() >= se.max():
+            break
+        se, cand = best
+        groups.append(cand)
+    return groups, se
+
+
+def load_prior(path):
+    """Expected relative volume per state from a scales_* or processed_* output."""
+    df = pd.read_csv(path)
+    if "scale" in df:
+        vol = df.set_index("State")["scale"]
+    elif "value_scaled" in df:
+        vol = df.groupby("State")["value_scaled"].mean()
+    else:
+        vol = df.set_index("State")["volume"]
+    missing = sorted(set(state_code_map) - set(vol.index))
+    if missing:
+        raise SystemExit(f"❌ prior {path} has no volume for: {', '.join(missing)}")
+    return vol.clip(lower=vol[vol > 0].min() if (vol > 0).any() else 1).to_dict()
+
+
+def write_urls(groups, path=output_file):
+    lines = []
+    for disease, code in diseases.items():
+        for i, group in enumerate(groups, 1):
+            geo_codes = [state_code_map[s] for s in group]
+            geo_part = ",".join(geo_codes)
+            q_part = ",".join([code] * len(group))
+            url = f"{base_url}?date={','.join([date_param]*len(group))}&geo={geo_part}&q={q_part}"
+            lines.append(f"[{disease} - Group {i:02d}]\n{url}\n")
+
+    with open(path, "w") as f:
+        f.write("\n".join(lines))
+
 
-# Sort by full name (alphabetical)
-sorted_states = sorted(state_code_map.items(), key=lambda x: x[0])
+def main():
+    ap = argparse.ArgumentParser(description="Google Trends comparison URLs")
+    ap.add_argument("--plan", action="store_true", help="precision-driven groups instead of CA + 4")
+    ap.add_argument("--prior", help="scales_<kw>.csv / processed_<kw>_*.csv from an earlier download")
+    ap.add_argument("--target-se", type=float, default=0.03, help="max relative SE of a state's scale")
+    ap.add_argument("--max-groups", type=int, default=20)
+    ap.add_argument("--months", type=int, default=MONTHS)
+    ap.add_argument("--noise-cv", type=float, default=NOISE_CV)
+    args = ap.parse_args()
 
-# Separate California (anchor)
-other_states = [(name, code) for name, code in sorted_states if name != "California"]
+    if not args.plan:
+        write_urls(classic_groups())
+        print(f"✅ URLs (sorted by full state names incl. DC) written to {output_file}")
+        return
 
-# Group into chunks of 4 (CA + 4 others = 5 per group)
-groups = [other_states[i:i+4] for i in range(0, len(other_states), 4)]
+    if args.prior:
+        volume = load_prior(args.prior)
+    else:
+        print("⚠️ no --prior: assuming equal volumes, the ladder only fixes connectivity")
+        volume = {s: 1.0 for s in state_code_map}
 
-lines = []
+    groups, se = plan_groups(volume, args.months, args.target_se, args.max_groups, args.noise_cv)
+    base = expected_se(classic_groups(), volume, args.months, noise_cv=args.noise_cv)
+    print(f"📐 classic CA+4: {len(classic_groups())} downloads/keyword, "
+          f"scale SE max {base.max():.1%}, median {base.median():.1%}")
+    print(f"📐 planned:      {len(groups)} downloads/keyword, "
+          f"scale SE max {se.max():.1%}, median {se.median():.1%}")
+    if se.max() > args.target_se:
+        print(f"⚠️ target {args.target_se:.1%} not reached within {args.max_groups} groups "
+              f"(worst: {se.idxmax()})")
 
-for disease, code in diseases.items():
-    for i, group in enumerate(groups, 1):
-        # Add California + 4 others
-        all_states = [("California", state_code_map["California"])] + group
-        geo_codes = [c for _, c in all_states]
-        geo_part = ",".join(geo_codes)
-        q_part = ",".join([code] * len(all_states))
-        url = f"{base_url}?date={','.join([date_param]*len(all_states))}&geo={geo_part}&q={q_part}"
-        lines.append(f"[{disease} - Group {i:02d}]\n{url}\n")
+    write_urls(groups)
+    pd.DataFrame([(f"Group{i}", s, state_code_map[s]) for i, g in enumerate(groups, 1) for s in g],
+                 columns=["group", "state", "geo"]).to_csv(plan_file, index=False)
+    print(f"✅ URLs written to {output_file}, group composition to {plan_file}")
 
-# === Write to txt ===
-with open(output_file, "w") as f:
-    f.write("\n".join(lines))
 
-print(f"✅ URLs (sorted by full state names incl. DC) written to {output_file}")
+if __name__ == "__main__":
+    main()
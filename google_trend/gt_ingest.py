@@ -0,0 +1,217 @@
+"""
+One ingester for every Google Trends CSV in the project.
+
+Recognised layouts:
+
+- web export (Explore -> download):
+      Category: All categories            <- optional category line
+                                          <- blank line
+      Month,Chlamydia: (Alaska),...       <- Month / Week / Day / Time
+      2018-01,42,...                      <- integers, "<1" for tiny non-zero values
+- pytrends dump (discard_GTScaper.py):
+      date,syphilis[,isPartial]           <- geo taken from the file name (__CA__)
+
+Files are parsed in a process pool; each parsed file is cached by content hash
+(data_process_script/frame_cache.py), so re-ingesting a folder after adding a
+few exports only parses the new ones. The result is one typed long table:
+
+    keyword (category) | geo ("US", "US-CA", or the region name) | state (Int16 FIPS)
+    date (datetime64)  | freq ("day" / "week" / "month")           | value (float32)
+    below_one (bool: the cell was "<1", value = LT1_VALUE)        | category | source (file name)
+
+Usage:
+    from gt_ingest import ingest
+
+    gt = ingest(["raw_data_gt_single/val_*.csv"])
+    python gt_ingest.py "raw_data_gt_single/*.csv" "gt_out/**/*__weekly.csv" -o gt_long.parquet
+"""
+
+import argparse
+import csv
+import hashlib
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from glob import glob
+
+import numpy as np
+import pandas as pd
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(_HERE, "..", "util"))
+sys.path.insert(0, os.path.join(_HERE, "..", "data_process_script"))
+from frame_cache import file_digest, load, save
+from geo_registry import STATES, state_code
+
+# ========= Config =========
+LT1_VALUE = 0.5          # stand-in for GT's "<1"
+WORKERS = os.cpu_count() or 1
+PARSER_TAG = "gt-export-v1"  # bump when parse_export() output changes
+# =========================
+
+TIME_COLS = {"month": "month", "week": "week", "day": "day", "time": None, "date": None}
+COLUMNS = ["keyword", "geo", "state", "date", "freq", "value", "below_one", "category", "source"]
+
+_SERIES = re.compile(r"^(.*?):\s*\((.*)\)\s*$")
+_FILE_GEO = re.compile(r"(?<![A-Za-z])([A-Z]{2})(?![A-Za-z])")
+_ABBRS = set(STATES["abbr"])
+_GT_GEO = dict(zip(STATES["fips"].astype("float64"), STATES["gt"]))
+
+
+def _infer_freq(dates):
+    if len(dates) and len(dates[0]) == 7:
+        return "month"
+    if len(dates) < 2:
+        return "day"
+    step = (pd.Timestamp(dates[1]) - pd.Timestamp(dates[0])).days
+    return "week" if step == 7 else "month" if step >= 28 else "day"
+
+
+def _geo_from_name(path):
+    """Last two-letter state code in the file name (val_Syphilis_CA.csv, syphilis__CA__weekly.csv)."""
+    hits = [m for m in _FILE_GEO.findall(os.path.basename(path)) if m in _ABBRS]
+    return hits[-1] if hits else None
+
+
+def parse_export(path):
+    """One GT CSV -> long frame with COLUMNS."""
+    with open(path, encoding="utf-8-sig") as f:
+        lines = f.read().splitlines()
+
+    if not any(line.strip().strip('"') for line in lines):
+        return pd.DataFrame(columns=COLUMNS)   # the harvester's placeholder for empty responses
+
+    category = None
+    for i, line in enumerate(lines):
+        if line.startswith("Category:"):
+            category = line.split(":", 1)[1].strip()
+        first = line.split(",", 1)[0].strip().lower()
+        if first in TIME_COLS and "," in line:
+            break
+    else:
+        raise ValueError(f"{path}: no Month/Week/Day/date header line")
+
+    header = next(csv.reader([lines[i]]))
+    rows = [r for r in csv.reader(lines[i + 1:]) if r and r[0].strip()]
+    if not rows:
+        return pd.DataFrame(columns=COLUMNS)
+
+    keep = [j for j, c in enumerate(header) if j > 0 and c.strip() != "isPartial"]
+    dates = [r[0].strip() for r in rows]
+    freq = TIME_COLS[header[0].strip().lower()] or _infer_freq(dates)
+
+    keywords, regions = [], []
+    file_geo = None
+    for j in keep:
+        m = _SERIES.match(header[j].strip())
+        if m:
+            keywords.append(m.group(1).strip())
+            regions.append(m.group(2).strip())
+        else:
+            file_geo = file_geo or _geo_from_name(path) or "US"
+            keywords.append(header[j].strip())
+            regions.append(file_geo)
+
+    raw = np.array([[r[j].strip() if j < len(r) else "" for j in keep] for r in rows], dtype=object)
+    below = raw == "<1"
+    raw[below] = LT1_VALUE
+    raw[raw == ""] = np.nan
+    vals = raw.astype("float32")
+
+    n_t, n_s = vals.shape
+    fips = state_code(regions).to_numpy(dtype="float64", na_value=np.nan)
+    geo = np.array([_GT_GEO.get(f) or ("US" if r in ("US", "United States") else r)
+                    for f, r in zip(fips, regions)], dtype=object)
+    return pd.DataFrame({
+        "keyword": np.tile(np.array(keywords, dtype=object), n_t),
+        "geo": np.tile(geo, n_t),
+        "state": pd.array(np.tile(fips, n_t), dtype="Int16"),
+        "date": np.repeat(pd.to_datetime(dates).to_numpy(), n_s),
+        "freq": freq,
+        "value": vals.ravel(),
+        "below_one": below.ravel(),
+        "category": category,
+        "source": os.path.basename(path),
+    })
+
+
+def _key(path):
+    """Cache key: file content + file name (the name can carry the geo)."""
+    return hashlib.sha256(f"{file_digest(path)}|{os.path.basename(path)}".encode()).hexdigest()
+
+
+def _parse_cached(job):
+    path, key = job
+    df = parse_export(path)
+    save(df, key, PARSER_TAG)
+    return df
+
+
+def _parse_plain(job):
+    return parse_export(job[0])
+
+
+def expand(patterns):
+    files = []
+    for p in patterns:
+        hits = sorted(glob(p, recursive=True)) if any(ch in p for ch in "*?[") else [p]
+        files += [h for h in hits if h.lower().endswith(".csv") and os.path.isfile(h)]
+    return list(dict.fromkeys(files))
+
+
+def ingest(patterns, workers=WORKERS, cache=True):
+    """Globs / paths -> one typed long table (COLUMNS), sorted by keyword, geo, date."""
+    files = expand([patterns] if isinstance(patterns, str) else patterns)
+    if not files:
+        return _typed(pd.DataFrame(columns=COLUMNS))
+
+    keys = {f: _key(f) if cache else None for f in files}
+    frames = {f: load(keys[f], PARSER_TAG) if cache else None for f in files}
+    misses = [(f, keys[f]) for f in files if frames[f] is None]
+    fn = _parse_cached if cache else _parse_plain
+    if len(misses) <= 1 or workers <= 1:
+        parsed = [fn(job) for job in misses]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(misses))) as pool:
+            parsed = list(pool.map(fn, misses,
+                                   chunksize=max(1, len(misses) // (4 * workers))))
+    frames.update(zip([f for f, _ in misses], parsed))
+
+    parts = [frames[f] for f in files if len(frames[f])]
+    out = _typed(pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=COLUMNS))
+    return out.sort_values(["keyword", "geo", "date"], kind="stable").reset_index(drop=True)
+
+
+def _typed(df):
+    df = df[COLUMNS].copy()
+    for c in ("keyword", "geo", "freq", "category", "source"):
+        df[c] = df[c].astype("category")
+    df["state"] = df["state"].astype("Int16")
+    df["date"] = pd.to_datetime(df["date"])
+    df["value"] = df["value"].astype("float32")
+    df["below_one"] = df["below_one"].astype(bool)
+    return df
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Ingest Google Trends CSV exports into one long table")
+    ap.add_argument("patterns", nargs="+", help="files or globs (quote them; ** is recursive)")
+    ap.add_argument("-o", "--out", required=True, help=".parquet or .csv")
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    ap.add_argument("--no-cache", action="store_true")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    df = ingest(args.patterns, workers=args.workers, cache=not args.no_cache)
+    if args.out.endswith(".parquet"):
+        df.to_parquet(args.out, index=False)
+    else:
+        df.to_csv(args.out, index=False)
+    print(f"✅ {df['source'].nunique()} files, {df['keyword'].nunique()} keywords, {df['geo'].nunique()} geos, "
+          f"{len(df):,} rows -> {args.out} ({time.perf_counter() - t0:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Calendar-correct resampling of Google Trends series, all series at once.
+
+Each GT value covers a span of days starting at its date: a day, a week (pytrends
+and web exports label a week by its first day) or a calendar month. A coarser
+period's value is the day-weighted mean of the observations overlapping it, so a
+week running 29 Jan - 4 Feb counts 3/7 towards January and 4/7 towards February
+(resample("MS").mean() puts the whole week in January).
+
+Every series of a source frequency is stacked into one (series x date) array, and
+the overlap days form a sparse (date x period) matrix W; the resampled panel is
+then two matrix products:
+
+    value    = (X * observed) @ W / (observed @ W)
+    coverage = (observed @ W) / days in period
+
+Input is the long table from gt_ingest.py; output is one long table:
+
+    keyword | geo | state | period (first day) | freq (month/quarter/year)
+    value   | coverage (share of the period's days observed) | n_obs | from_freq
+
+Periods below MIN_COVERAGE (e.g. a month with only its first week downloaded) are dropped.
+
+Usage:
+    from gt_ingest import ingest
+    from gt_resample import resample
+
+    monthly = resample(ingest("gt_out/**/*__weekly.csv"), "month")
+    python gt_resample.py "gt_out/**/*__weekly.csv" --to month quarter year -o gt_resampled.parquet
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from gt_ingest import WORKERS, ingest
+
+# ========= Config =========
+MIN_COVERAGE = 0.5      # keep a period only if at least this share of its days is observed
+# =========================
+
+UNIT = {"month": 1, "quarter": 3, "year": 12}   # target period length in months
+ORDER = {"day": 0, "week": 1, "month": 2, "quarter": 3, "year": 4}
+
+
+def stack(gt):
+    """
+    Long frame of ONE source frequency -> (keys, dates, values):
+    keys: frame (keyword, geo, state), one row per series;
+    dates: sorted datetime64[D] observation starts; values: float64 array (series x date),
+    NaN where a series has no observation. Duplicate (series, date) rows are averaged.
+    """
+    g = gt.groupby(["keyword", "geo"], observed=True, sort=True)
+    sid = g.ngroup().to_numpy()
+    keys = g["state"].first().reset_index()
+    did, dates = pd.factorize(gt["date"].to_numpy().astype("datetime64[D]"), sort=True)
+    shape = (len(keys), len(dates))
+    v = gt["value"].to_numpy(dtype="float64")
+    ok = ~np.isnan(v)
+    tot = np.zeros(shape)
+    cnt = np.zeros(shape)
+    np.add.at(tot, (sid[ok], did[ok]), v[ok])
+    np.add.at(cnt, (sid[ok], did[ok]), 1)
+    with np.errstate(invalid="ignore"):
+        values = tot / cnt
+    return keys, np.asarray(dates, dtype="datetime64[D]"), values
+
+
+def _span_ends(dates, freq):
+    if freq == "day":
+        return dates + np.timedelta64(1, "D")
+    if freq == "week":
+        return dates + np.timedelta64(7, "D")
+    return (dates.astype("datetime64[M]") + 1).astype("datetime64[D]")
+
+
+def overlap(dates, freq, to):
+    """Sparse (date x period) matrix of overlap days, plus the periods (first days) and their lengths."""
+    start = dates
+    end = _span_ends(dates, freq)
+    step = UNIT[to]
+    m = start.astype("datetime64[M]").astype("int64")
+    p0 = m - m % step                              # months since 1970, aligned to the period
+    bound = (p0 + step).astype("datetime64[M]").astype("datetime64[D]")
+    d0 = (np.minimum(end, bound) - start).astype("int64")
+    d1 = (end - bound).astype("int64")             # > 0 only when the span crosses into the next period
+    cross = d1 > 0
+
+    rows = np.r_[np.arange(len(dates)), np.flatnonzero(cross)]
+    pm = np.r_[p0, p0[cross] + step]
+    days = np.r_[d0, d1[cross]].astype("float64")
+    pid, periods = pd.factorize(pm, sort=True)
+    W = sp.csr_matrix((days, (rows, pid)), shape=(len(dates), len(periods)))
+
+    first = periods.astype("datetime64[M]").astype("datetime64[D]")
+    length = ((periods + step).astype("datetime64[M]").astype("datetime64[D]") - first).astype("int64")
+    return W, first, length
+
+
+def _resample_one(gt, freq, to, min_coverage):
+    keys, dates, values = stack(gt)
+    W, periods, length = overlap(dates, freq, to)
+    seen = ~np.isnan(values)
+    num = (W.T @ np.where(seen, values, 0.0).T).T
+    den = (W.T @ seen.T.astype("float64")).T
+    n_obs = (W.T.astype(bool).astype("float64") @ seen.T.astype("float64")).T
+    with np.errstate(invalid="ignore", divide="ignore"):
+        value = num / den
+    coverage = den / length
+
+    s, p = np.nonzero((den > 0) & (coverage >= min_coverage))
+    return pd.DataFrame({
+        "keyword": keys["keyword"].to_numpy()[s],
+        "geo": keys["geo"].to_numpy()[s],
+        "state": pd.array(keys["state"].to_numpy()[s], dtype="Int16"),
+        "period": periods[p],
+        "freq": to,
+        "value": value[s, p],
+        "coverage": coverage[s, p],
+        "n_obs": n_obs[s, p].astype("int16"),
+        "from_freq": freq,
+    })
+
+
+def _empty():
+    return pd.DataFrame({
+        "keyword": pd.Series(dtype=object), "geo": pd.Series(dtype=object),
+        "state": pd.Series(dtype="Int16"), "period": np.array([], dtype="datetime64[D]"),
+        "freq": pd.Series(dtype=object), "value": pd.Series(dtype="float64"),
+        "coverage": pd.Series(dtype="float64"), "n_obs": pd.Series(dtype="int16"),
+        "from_freq": pd.Series(dtype=object),
+    })
+
+
+def resample(gt, to="month", min_coverage=MIN_COVERAGE):
+    """
+    Long GT frame (gt_ingest.ingest) -> day-weighted means per `to` period
+    ("month", "quarter", "year", or a list of them). Series already at or above
+    the target frequency are skipped (a monthly series passes through to "month").
+    """
+    targets = [to] if isinstance(to, str) else list(to)
+    bad = [t for t in targets if t not in UNIT]
+    if bad:
+        raise ValueError(f"unknown target frequency: {bad} (use {list(UNIT)})")
+
+    out = []
+    for freq, part in gt.groupby("freq", observed=True, sort=False):
+        for t in targets:
+            if ORDER[freq] <= ORDER[t]:
+                out.append(_resample_one(part, freq, t, min_coverage))
+    if not out:
+        out = [_empty()]   # same columns and dtypes, so callers' .dt / categorical code still works
+    df = pd.concat(out, ignore_index=True)
+    for c in ("keyword", "geo", "freq", "from_freq"):
+        df[c] = df[c].astype("category")
+    df["period"] = pd.to_datetime(df["period"])
+    return df.sort_values(["freq", "keyword", "geo", "period"], kind="stable").reset_index(drop=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Day-weighted resampling of GT series to month / quarter / year")
+    ap.add_argument("patterns", nargs="+", help="GT CSV files or globs (see gt_ingest.py)")
+    ap.add_argument("--to", nargs="+", default=["month"], choices=list(UNIT))
+    ap.add_argument("--min-coverage", type=float, default=MIN_COVERAGE)
+    ap.add_argument("-o", "--out", required=True, help=".parquet or .csv")
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    gt = ingest(args.patterns, workers=args.workers)
+    df = resample(gt, args.to, args.min_coverage)
+    if args.out.endswith(".parquet"):
+        df.to_parquet(args.out, index=False)
+    else:
+        df.to_csv(args.out, index=False)
+    n = df.groupby(["keyword", "geo"], observed=True).ngroups
+    print(f"✅ {n} series -> {', '.join(args.to)}: {len(df):,} rows -> {args.out} "
+          f"({time.perf_counter() - t0:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
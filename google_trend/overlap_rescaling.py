@@ -0,0 +1,167 @@
+"""
+Least-squares rescaling of Google Trends comparison groups over their overlap graph.
+
+A GT download for group g reports y[g,s,t] = 100 * x[s,t] / M_g: every state's
+series divided by a group-specific peak. Taking the mean over months,
+
+    log mean(y[g,s]) = a_s - c_g          (a_s: state level, c_g: group offset)
+
+for every (group, state) cell. Stacking all cells of all groups gives a sparse
+system in which each state is linked to every group it appeared in. It is
+solved by weighted least squares with c_ref = 0, so results are on the
+reference group's scale as in the single-anchor method. The weights come from
+GT's integer rounding: a mean of n values rounded to the nearest integer has
+variance ~ 1/(12 n), i.e. var(log mean) ~ 1 / (12 n mean^2). Small states next
+to a large one therefore count little, and any bridge group that puts them
+beside similar-sized states pulls their scale towards the precise estimate.
+
+Any design works as long as the groups are connected: the classic CA + 4
+groups (the solution then reduces to the CA-anchor ratios), ladders of
+similar-sized states, or extra bridge groups from the planner in
+generate_gt_urls.py.
+
+    from overlap_rescaling import solve_scales, rescale
+
+    scales, offsets = solve_scales(cells(data))          # per-state scale + SE
+    scaled, scales = rescale(data, ref_group="Group1")   # combined monthly series
+"""
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.linalg import splu
+
+# ========= Config =========
+ROUND_VAR = 1 / 12      # variance of GT's integer rounding
+MIN_MEAN = 0.5          # floor for means near 0 ("<1" cells)
+NOISE_CV = 0.0          # extra relative month-to-month noise; the fit inflates SEs by the residuals anyway
+# =========================
+
+
+def cells(data):
+    """Long GT frame (Group, State, value) -> one row per (group, state): mean, n."""
+    g = data.dropna(subset=["value"]).groupby(["Group", "State"], sort=False)["value"]
+    return g.agg(mean="mean", n="size").reset_index()
+
+
+def _weights(mean, n, noise_cv=NOISE_CV):
+    """Inverse variance of log(mean): rounding error (1/12 per value) plus relative noise."""
+    m = np.maximum(np.asarray(mean, dtype="float64"), MIN_MEAN)
+    return np.asarray(n, dtype="float64") / (ROUND_VAR / m ** 2 + noise_cv ** 2)
+
+
+def _system(groups, states, g_idx, s_idx, ref):
+    """Sparse design: column s -> a_s (+1), column S + j -> c_g (-1), c_ref dropped."""
+    n_s = len(states)
+    g_col = np.full(len(groups), -1)
+    others = [i for i, g in enumerate(groups) if g != ref]
+    g_col[others] = n_s + np.arange(len(others))
+    rows = np.arange(len(g_idx))
+    keep = g_col[g_idx] >= 0
+    data = np.r_[np.ones(len(rows)), -np.ones(keep.sum())]
+    r = np.r_[rows, rows[keep]]
+    c = np.r_[s_idx, g_col[g_idx][keep]]
+    X = sp.csr_matrix((data, (r, c)), shape=(len(rows), n_s + len(others)))
+    return X, g_col
+
+
+def _check_connected(groups, states, g_idx, s_idx, ref):
+    n_g = len(groups)
+    adj = sp.coo_matrix((np.ones(len(g_idx)), (g_idx, n_g + s_idx)),
+                        shape=(n_g + len(states),) * 2)
+    _, label = connected_components(adj, directed=False)
+    ref_label = label[list(groups).index(ref)]
+    lost = [s for i, s in enumerate(states) if label[n_g + i] != ref_label]
+    if lost:
+        raise ValueError(f"states not linked to {ref} through any overlap: {lost}")
+
+
+def _normal(c, ref_group, w):
+    """Index the cells, check connectivity, build X and the factorised normal matrix."""
+    groups = pd.Index(pd.unique(c["Group"]))
+    states = pd.Index(pd.unique(c["State"]))
+    if ref_group not in groups:
+        raise ValueError(f"reference group {ref_group!r} has no usable cells")
+    g_idx = groups.get_indexer(c["Group"])
+    s_idx = states.get_indexer(c["State"])
+    _check_connected(groups, states, g_idx, s_idx, ref_group)
+    X, g_col = _system(groups, states, g_idx, s_idx, ref_group)
+    XtW = X.T.multiply(w).tocsr()
+    lu = splu((XtW @ X).tocsc())
+    # rows of N^-1 for the state levels (few columns, small dense solve)
+    inv = lu.solve(np.eye(X.shape[1])[:, :len(states)])
+    return groups, states, s_idx, g_col, X, XtW, lu, np.clip(np.diag(inv[:len(states)]), 0, None)
+
+
+def solve_scales(cell, ref_group="Group1"):
+    """
+    cell: frame (Group, State, mean, n). Returns
+      scales:  State, scale (mean level on the ref group's scale), se_log (≈ relative SE),
+               groups (how many downloads the state is in)
+      offsets: Series Group -> c_g (multiply a group's values by exp(c_g) to reach ref scale)
+    Cells with a zero mean carry no scale information and are dropped.
+    """
+    c = cell[cell["mean"] > 0].reset_index(drop=True)
+    w = _weights(c["mean"], c["n"])
+    groups, states, s_idx, g_col, X, XtW, lu, var = _normal(c, ref_group, w)
+    y = np.log(c["mean"].to_numpy(dtype="float64"))
+    theta = lu.solve(XtW @ y)
+
+    # model-based covariance, inflated when residuals exceed the rounding model
+    resid = y - X @ theta
+    dof = X.shape[0] - X.shape[1]
+    infl = max(1.0, float(w @ resid ** 2) / dof) if dof > 0 else 1.0
+
+    n_s = len(states)
+    scales = pd.DataFrame({
+        "State": states,
+        "scale": np.exp(theta[:n_s]),
+        "se_log": np.sqrt(var * infl),
+        "groups": np.bincount(s_idx, minlength=n_s),
+    })
+    off = np.where(g_col >= 0, theta[np.maximum(g_col, 0)], 0.0)
+    return scales, pd.Series(off, index=groups, name="offset")
+
+
+def rescale(data, ref_group="Group1"):
+    """
+    Long GT frame (Month, State, Group, value, ...) -> one series per state on the
+    ref group's scale, averaging a state's groups with the same precision weights.
+    `value` is kept from the state's most precise group.
+    """
+    cell = cells(data)
+    scales, offsets = solve_scales(cell, ref_group)
+
+    w = pd.Series(_weights(cell["mean"], cell["n"]),
+                  index=pd.MultiIndex.from_frame(cell[["Group", "State"]]))
+    d = data[data["Group"].isin(offsets.index)]
+    d = d.assign(_w=w.reindex(pd.MultiIndex.from_frame(d[["Group", "State"]])).fillna(0).to_numpy(),
+                 _x=d["value"].to_numpy() * np.exp(d["Group"].map(offsets).to_numpy(dtype="float64")))
+    d["_w"] = d["_w"].where(d["_x"].notna(), 0.0)
+    d["_wx"] = d["_w"] * d["_x"].fillna(0)
+
+    keys = ["State", "Month"]
+    g = d.groupby(keys, sort=True)
+    scaled = (g["_wx"].sum() / g["_w"].sum()).rename("value_scaled")
+    best = d.sort_values("_w", ascending=False, kind="stable").drop_duplicates(keys).set_index(keys)
+    out = best.drop(columns=["Group", "_w", "_x", "_wx"]).join(scaled)
+    return out.sort_index().reset_index(), scales
+
+
+# ---------- design evaluation (used by the planner) ----------
+
+def expected_se(groups, volume, months, peak_ratio=0.6, noise_cv=NOISE_CV):
+    """
+    Predicted se_log per state for a design before downloading it (first group = reference).
+    groups: list of state lists; volume: State -> expected relative search volume;
+    peak_ratio: typical mean / peak of a series (sets the expected mean index).
+    """
+    rows = []
+    for i, g in enumerate(groups):
+        top = max(volume[s] for s in g)
+        rows += [(i, s, 100 * peak_ratio * volume[s] / top, months) for s in g]
+    c = pd.DataFrame(rows, columns=["Group", "State", "mean", "n"])
+    c = c[c["mean"] > 0].reset_index(drop=True)
+    *_, var = _normal(c, 0, _weights(c["mean"], c["n"], noise_cv))
+    return pd.Series(np.sqrt(var), index=pd.unique(c["State"]))
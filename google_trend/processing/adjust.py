@@ -0,0 +1,417 @@
+"""
+Seasonal adjustment and detrending for the whole GT panel in one call.
+
+Every (keyword, state) series becomes one row of a matrix, and every step works
+on all rows at once; the only Python loops run over the 12 calendar months or
+over blocks of series that share the same observed span:
+
+    log      y = log(value + LOG_OFFSET)                     (GT has zeros)
+    seasonal "stl": STL (Cleveland et al. 1990) without robustness weights,
+                    i.e. loess smoothers applied as fixed (T x T) matrices
+             "x11": X-11-style filters: 2x12 MA trend, 3x3 / 3x5 seasonal MAs,
+                    13-term Henderson trend, run on the series extended by
+                    X11_EXTEND months each side (3-season average pattern on a
+                    linear level, the way X-12 extends with forecasts) so every
+                    kept month gets symmetric filters
+    detrend  "linear": OLS on (1, t)
+             "hp":     Hodrick-Prescott, lambda = HP_LAMBDA (129,600 for monthly data)
+             "hamilton": y[t+h] on y[t], ..., y[t-p+1] (h = 24, p = 12 for monthly data)
+
+Output per (series, period): y, seasonal, sa (= y - seasonal), trend, cycle (= sa - trend).
+Diagnostics per series: observed span, interpolated gaps, seasonal and trend
+strength (Hyndman's F_S, F_T) and the detrending parameters (slope / R^2).
+
+Interior gaps are filled by linear interpolation before filtering; leading and
+trailing missing months are left out. Results are cached per series (content
+hash of its values) under one frame_cache entry per parameter set, so after a
+refresh only the series whose data changed are recomputed.
+
+Usage:
+    from adjust import adjust
+
+    out, diag = adjust(monthly, seasonal="stl", detrend="hp")       # gt_resample.py output
+    python adjust.py ../gt_monthly.parquet --seasonal stl --detrend hamilton -o gt_adjusted.parquet
+    python adjust.py ../../master_data/STDs_state_gt/processed_Syphilis_CA_anchor_scaled.csv \\
+        --keys State --time Month --value value_scaled -o syphilis_adjusted.csv
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.sparse.linalg import splu
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data_process_script"))
+from frame_cache import load, save
+
+# ========= Config =========
+PERIOD = 12
+LOG_OFFSET = 1.0
+HP_LAMBDA = 129_600
+HAMILTON_H = 24
+HAMILTON_P = 12
+STL_SEASONAL = 7        # seasonal loess window (odd, >= 7)
+STL_INNER = 2           # inner loop passes
+X11_EXTEND = 96         # months added to each end; covers the reach of the whole x11 filter cascade
+ADJUST_TAG = "gt-adjust-v2"  # bump when the filters change
+# =========================
+
+OUTPUTS = ["y", "seasonal", "sa", "trend", "cycle"]
+
+
+# ---------- smoothers ----------
+
+@lru_cache(maxsize=None)
+def _loess_matrix(n, q, lo=0, hi=None):
+    """
+    Local-linear loess with tricube weights on x = 0..n-1, evaluated at lo..hi-1
+    (lo = -1 / hi = n + 1 extrapolates one step each side, as in STL's cycle-subseries).
+    Returns the (n_out x n) smoother matrix.
+    """
+    hi = n if hi is None else hi
+    x = np.arange(n, dtype="float64")
+    x0 = np.arange(lo, hi, dtype="float64")[:, None]
+    d = np.abs(x[None, :] - x0)
+    if q <= n:
+        h = np.sort(d, axis=1)[:, q - 1]
+    else:
+        h = d.max(axis=1) + (q - n) // 2
+    h = np.maximum(h, 1.0) * 1.000001   # the q-th neighbour keeps a tiny weight instead of 0
+    u = d / h[:, None]
+    w = np.where(u < 1, (1 - u ** 3) ** 3, 0.0)
+    dx = x[None, :] - x0
+    s0, s1, s2 = w.sum(1), (w * dx).sum(1), (w * dx ** 2).sum(1)
+    det = s0 * s2 - s1 ** 2
+    lin = det > 1e-9 * np.maximum(s0 * s2, 1e-300)
+    L = np.where(lin[:, None], w * (s2[:, None] - dx * s1[:, None]) / np.where(lin, det, 1)[:, None],
+                 w / s0[:, None])
+    L.flags.writeable = False
+    return L
+
+
+def _ma(Y, weights, valid=False):
+    """Moving average along rows; valid=True shortens, else truncated and renormalised at the ends."""
+    w = np.asarray(weights, dtype="float64")
+    k = len(w)
+    if valid:
+        return sliding_window_view(Y, k, axis=1) @ w
+    pad = k // 2
+    Yp = np.pad(Y, ((0, 0), (pad, pad)))
+    ones = np.pad(np.ones(Y.shape[1]), pad)
+    return (sliding_window_view(Yp, k, axis=1) @ w) / (sliding_window_view(ones, k) @ w)
+
+
+def _by_month(Y, fn, period=PERIOD):
+    """Apply fn to each calendar-month subseries (all rows at once)."""
+    out = np.empty_like(Y)
+    for j in range(period):
+        out[:, j::period] = fn(Y[:, j::period])
+    return out
+
+
+def _henderson(k):
+    m = (k - 1) // 2
+    j = np.arange(-m, m + 1, dtype="float64")
+    n = m + 2
+    return (315 * ((n - 1) ** 2 - j ** 2) * (n ** 2 - j ** 2) * ((n + 1) ** 2 - j ** 2)
+            * (3 * n ** 2 - 16 - 11 * j ** 2)
+            / (8 * n * (n ** 2 - 1) * (4 * n ** 2 - 1) * (4 * n ** 2 - 9) * (4 * n ** 2 - 25)))
+
+
+_MA2x12 = np.r_[0.5, np.ones(11), 0.5] / 12
+_MA3x3 = np.array([1, 2, 3, 2, 1]) / 9
+_MA3x5 = np.array([1, 2, 3, 3, 3, 2, 1]) / 15
+
+
+# ---------- seasonal decomposition (rows = series, equal length, no NaN) ----------
+
+def stl(Y, period=PERIOD, seasonal=STL_SEASONAL, inner=STL_INNER):
+    """-> (seasonal, trend). Non-robust STL; every loess step is a matrix product."""
+    m, n = Y.shape
+    nt = int(np.ceil(1.5 * period / (1 - 1.5 / seasonal)))
+    nt += nt % 2 == 0
+    nl = period + (period % 2 == 0)
+    T = np.zeros_like(Y)
+    for _ in range(inner):
+        D = Y - T
+        C = np.empty((m, n + 2 * period))
+        for j in range(period):
+            k = D[:, j::period].shape[1]
+            C[:, j::period] = D[:, j::period] @ _loess_matrix(k, seasonal, -1, k + 1).T
+        Lp = _ma(_ma(_ma(C, np.ones(period) / period, True), np.ones(period) / period, True),
+                 np.ones(3) / 3, True)
+        S = C[:, period:period + n] - Lp @ _loess_matrix(n, nl).T
+        T = (Y - S) @ _loess_matrix(n, nt).T
+    return S, T
+
+
+def _forecast(Y, k, period=PERIOD):
+    """
+    k periods after each row: the seasonal pattern averaged over the last (up to) three
+    seasons, on a level extrapolated from those seasons' means. Exact for a linear
+    trend plus a fixed seasonal pattern. Needs 2 * period columns.
+    """
+    m, n = Y.shape
+    L = min(3, n // period)
+    block = Y[:, n - L * period:].reshape(m, L, period)
+    means = block.mean(2)
+    pattern = (block - means[:, :, None]).mean(1)
+    drift = (means[:, -1] - means[:, 0]) / (L - 1)
+    steps = np.arange(k)
+    return pattern[:, steps % period] + means[:, -1:] + (steps // period + 1)[None, :] * drift[:, None]
+
+
+def _extend(Y, k, period=PERIOD):
+    """Rows with k periods of backcast before and forecast after."""
+    before = _forecast(Y[:, ::-1], k, period)[:, ::-1]
+    return np.concatenate([before, Y, _forecast(Y, k, period)], axis=1)
+
+
+def x11(Y, period=PERIOD, extend=X11_EXTEND):
+    """-> (seasonal, trend). Two X-11 passes on the forecast-extended rows, trimmed back."""
+    n = Y.shape[1]
+    Y = _extend(Y, extend, period)
+    ma_c = _MA2x12 if period == 12 else np.ones(period) / period
+
+    def seasonal(SI, ma):
+        S = _by_month(SI, lambda s: _ma(s, ma), period)
+        return S - _ma(S, ma_c)
+
+    T1 = _ma(Y, ma_c)
+    S1 = seasonal(Y - T1, _MA3x3)
+    T2 = _ma(Y - S1, _henderson(13))
+    S2 = seasonal(Y - T2, _MA3x5)
+    T3 = _ma(Y - S2, _henderson(13))
+    keep = slice(extend, extend + n)
+    return S2[:, keep], T3[:, keep]
+
+
+# ---------- detrending ----------
+
+def linear_trend(Y):
+    n = Y.shape[1]
+    X = np.c_[np.ones(n), np.arange(n)]
+    beta = np.linalg.solve(X.T @ X, X.T @ Y.T)          # (2 x m)
+    return (X @ beta).T, {"slope": beta[1], "intercept": beta[0]}
+
+
+@lru_cache(maxsize=None)
+def _hp_lu(n, lam):
+    D = sp.diags([1.0, -2.0, 1.0], [0, 1, 2], shape=(n - 2, n))
+    return splu((sp.identity(n) + lam * (D.T @ D)).tocsc())
+
+
+def hp_trend(Y, lam=HP_LAMBDA):
+    if Y.shape[1] < 3:
+        return Y.copy(), {}
+    return _hp_lu(Y.shape[1], lam).solve(np.ascontiguousarray(Y.T)).T, {}
+
+
+def hamilton_trend(Y, h=HAMILTON_H, p=HAMILTON_P):
+    """Batched OLS of y[t+h] on (1, y[t], ..., y[t-p+1]); trend = fitted value, NaN for the first h+p-1 months."""
+    m, n = Y.shape
+    T = np.full_like(Y, np.nan)
+    if n < h + p + 2:
+        return T, {"r2": np.full(m, np.nan)}
+    lags = sliding_window_view(Y[:, :n - h], p, axis=1)[:, :, ::-1]   # (m, N, p): y[t], y[t-1], ...
+    X = np.concatenate([np.ones(lags.shape[:2] + (1,)), lags], axis=2)
+    y = Y[:, h + p - 1:]
+    XtX = np.einsum("mni,mnj->mij", X, X)
+    Xty = np.einsum("mni,mn->mi", X, y)
+    beta = np.linalg.solve(XtX + 1e-10 * np.eye(p + 1), Xty[..., None])[..., 0]
+    fit = np.einsum("mni,mi->mn", X, beta)
+    T[:, h + p - 1:] = fit
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r2 = 1 - ((y - fit) ** 2).sum(1) / ((y - y.mean(1, keepdims=True)) ** 2).sum(1)
+    return T, {"r2": r2}
+
+
+SEASONAL = {"stl": stl, "x11": x11}
+DETREND = {"linear": linear_trend, "hp": hp_trend, "hamilton": hamilton_trend}
+
+
+# ---------- panel ----------
+
+def to_matrix(df, keys, time, value):
+    """Long frame -> (keys frame, sorted periods, values matrix series x period, NaN where missing)."""
+    g = df.groupby(list(keys), observed=True, sort=True)
+    sid = g.ngroup().to_numpy()
+    key_df = g.size().reset_index()[list(keys)]
+    tid, periods = pd.factorize(pd.to_datetime(df[time]).to_numpy(), sort=True)
+    Y = np.full((len(key_df), len(periods)), np.nan)
+    Y[sid, tid] = df[value].to_numpy(dtype="float64")
+    return key_df, pd.DatetimeIndex(periods), Y
+
+
+def _digests(Y, periods):
+    """Per row: hash of its own observed span (its periods and values, first to last observation)."""
+    stamps = np.asarray(periods.asi8)
+    ok = ~np.isnan(Y)
+    first = ok.argmax(1)
+    last = Y.shape[1] - 1 - ok[:, ::-1].argmax(1)
+    out = []
+    for row, has, a, b in zip(Y, ok.any(1), first, last):
+        span = stamps[a:b + 1].tobytes() + row[a:b + 1].tobytes() if has else b"empty"
+        out.append(hashlib.sha1(span).hexdigest()[:20])
+    return out
+
+
+def _fill(Y):
+    """Interpolate interior gaps of each row (rows share a span, so only interior NaN remain)."""
+    miss = np.isnan(Y)
+    if not miss.any():
+        return Y, np.zeros(len(Y), dtype=int)
+    out = Y.copy()
+    x = np.arange(Y.shape[1])
+    for i in np.flatnonzero(miss.any(1)):   # only the rows that have gaps
+        ok = ~miss[i]
+        out[i, ~ok] = np.interp(x[~ok], x[ok], Y[i, ok])
+    return out, miss.sum(1)
+
+
+def _strength(part, remainder):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.clip(1 - np.nanvar(remainder, 1) / np.nanvar(part + remainder, 1), 0, 1)
+
+
+def _process(Y, log, seasonal, detrend, period):
+    """Equal-span block -> dict of output matrices and per-row diagnostics."""
+    Y, filled = _fill(Y)
+    y = np.log(Y + LOG_OFFSET) if log else Y
+    diag = {"n_filled": filled}
+    if seasonal and y.shape[1] >= 2 * period:
+        S, T = SEASONAL[seasonal](y, period)
+        R = y - S - T
+        diag["seasonal_strength"] = _strength(S, R)
+        diag["trend_strength"] = _strength(T, R)
+    else:
+        S = np.zeros_like(y) if not seasonal else np.full_like(y, np.nan)
+    sa = y - S
+    if detrend:
+        trend, params = DETREND[detrend](sa)
+        diag.update(params)
+    else:
+        trend = np.full_like(y, np.nan)
+    return {"y": y, "seasonal": S, "sa": sa, "trend": trend, "cycle": sa - trend}, diag
+
+
+def _compute(Y, log, seasonal, detrend, period):
+    """All rows -> output cube (5 x m x n) and diagnostics; rows grouped by observed span."""
+    m, n = Y.shape
+    cube = np.full((len(OUTPUTS), m, n), np.nan)
+    ok = ~np.isnan(Y)
+    first = np.where(ok.any(1), ok.argmax(1), -1)
+    last = np.where(ok.any(1), n - 1 - ok[:, ::-1].argmax(1), -1)
+    diag = pd.DataFrame({"start": first, "end": last, "n_obs": ok.sum(1)})
+    for (a, b), rows in pd.Series(np.arange(m)).groupby([first, last]).groups.items():
+        if a < 0:
+            continue
+        rows = np.asarray(rows)
+        res, d = _process(Y[rows, a:b + 1], log, seasonal, detrend, period)
+        for k, name in enumerate(OUTPUTS):
+            cube[k, rows, a:b + 1] = res[name]
+        for col, v in d.items():
+            if col not in diag:
+                diag[col] = np.nan
+            diag.loc[rows, col] = v
+    return cube, diag
+
+
+def adjust(df, keys=("keyword", "geo"), time="period", value="value",
+           log=True, seasonal="stl", detrend="hp", period=PERIOD, cache=True, verbose=False):
+    """
+    Long monthly panel -> (out, diag).
+    out:  keys, time, value, y, seasonal, sa, trend, cycle (one row per input row's series x period)
+    diag: keys, start, end, n_obs, n_filled, seasonal_strength, trend_strength, detrend params
+    verbose: print how many series were computed vs taken from the cache
+    """
+    if seasonal not in (None, *SEASONAL):
+        raise ValueError(f"seasonal must be one of {list(SEASONAL)} or None")
+    if detrend not in (None, *DETREND):
+        raise ValueError(f"detrend must be one of {list(DETREND)} or None")
+    keys = [keys] if isinstance(keys, str) else list(keys)
+    key_df, periods, Y = to_matrix(df, keys, time, value)
+    digests = _digests(Y, periods)
+
+    params = dict(log=log, seasonal=seasonal, detrend=detrend, period=period, offset=LOG_OFFSET,
+                  hp=HP_LAMBDA, h=HAMILTON_H, p=HAMILTON_P, ns=STL_SEASONAL, ni=STL_INNER)
+    sig = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+    cached_out = load(sig, ADJUST_TAG) if cache else None
+    cached_diag = load(sig, ADJUST_TAG + "-diag") if cache else None
+    if cached_out is None or cached_diag is None:
+        cached_out = cached_diag = None
+        hit = np.zeros(len(digests), dtype=bool)
+    else:
+        hit = np.isin(digests, cached_diag["digest"].to_numpy())
+
+    miss = np.flatnonzero(~hit)
+    cube, diag = _compute(Y[miss], log, seasonal, detrend, period)
+    t_idx = np.broadcast_to(np.arange(len(periods)), (len(miss), len(periods)))
+    keep = ~np.isnan(cube[0])
+    new_out = pd.DataFrame({"digest": np.repeat(np.array(digests, dtype=object)[miss], len(periods))[keep.ravel()],
+                            "period": periods[t_idx[keep]]})
+    for k, name in enumerate(OUTPUTS):
+        new_out[name] = cube[k][keep]
+    diag.insert(0, "digest", np.array(digests, dtype=object)[miss])
+    diag["start"] = periods[diag["start"].clip(lower=0)].where(diag["start"] >= 0)
+    diag["end"] = periods[diag["end"].clip(lower=0)].where(diag["end"] >= 0)
+
+    if cached_out is not None:
+        current = set(digests)
+        new_out = pd.concat([cached_out[cached_out["digest"].isin(current)], new_out], ignore_index=True)
+        diag = pd.concat([cached_diag[cached_diag["digest"].isin(current)], diag], ignore_index=True)
+    if cache and len(miss):
+        save(new_out, sig, ADJUST_TAG)
+        save(diag, sig, ADJUST_TAG + "-diag")
+
+    new_out = new_out.drop_duplicates(["digest", "period"])
+    diag = diag.drop_duplicates("digest")
+    key_df = key_df.assign(digest=digests)
+    out = (df[keys + [time, value]].assign(**{time: pd.to_datetime(df[time])})
+           .merge(key_df, on=keys, how="left")
+           .merge(new_out.rename(columns={"period": time}), on=["digest", time], how="left")
+           .drop(columns="digest"))
+    diag = key_df.merge(diag, on="digest", how="left").drop(columns="digest")
+    if verbose:
+        print(f"🧮 {len(digests)} series: {len(miss)} computed, {len(digests) - len(miss)} from cache")
+    return out.sort_values(keys + [time], kind="stable").reset_index(drop=True), diag
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Seasonal adjustment + detrending for a long monthly GT panel")
+    ap.add_argument("input", help=".parquet / .csv (gt_resample.py or anchor_rescaling.py output)")
+    ap.add_argument("-o", "--out", required=True, help=".parquet or .csv; diagnostics go next to it (*_diag)")
+    ap.add_argument("--keys", nargs="+", default=["keyword", "geo"])
+    ap.add_argument("--time", default="period")
+    ap.add_argument("--value", default="value")
+    ap.add_argument("--seasonal", choices=[*SEASONAL, "none"], default="stl")
+    ap.add_argument("--detrend", choices=[*DETREND, "none"], default="hp")
+    ap.add_argument("--no-log", action="store_true")
+    ap.add_argument("--no-cache", action="store_true")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    df = pd.read_parquet(args.input) if args.input.endswith(".parquet") else pd.read_csv(args.input)
+    if "freq" in df and args.time == "period":
+        df = df[df["freq"] == "month"]
+    out, diag = adjust(df, args.keys, args.time, args.value, log=not args.no_log,
+                       seasonal=None if args.seasonal == "none" else args.seasonal,
+                       detrend=None if args.detrend == "none" else args.detrend,
+                       cache=not args.no_cache, verbose=True)
+    stem, ext = os.path.splitext(args.out)
+    for frame, path in ((out, args.out), (diag, f"{stem}_diag{ext}")):
+        frame.to_parquet(path, index=False) if ext == ".parquet" else frame.to_csv(path, index=False)
+    print(f"✅ {len(out):,} rows -> {args.out}, diagnostics -> {stem}_diag{ext} "
+          f"({time.perf_counter() - t0:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
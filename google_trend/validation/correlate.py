@@ -0,0 +1,148 @@
+"""
+Grouped Pearson correlations with permutation and bootstrap inference, in one pass.
+
+Rows are sorted by group once; every per-group sum is a product with a sparse
+(row x group) indicator matrix, so all groups are computed together:
+
+    r, n, p (t test, as scipy.stats.pearsonr), Fisher-z 95% CI
+    perm_p:          share of within-group permutations of y with |r*| >= |r|
+    boot_lo/boot_hi: percentile CI from resampling rows within each group
+
+Permutations and bootstrap draws are generated as (draws x rows) random index
+matrices, in chunks of CHUNK draws spread over a process pool (util/seeded_pool.py).
+
+Usage:
+    from correlate import grouped_corr, correlate_levels
+
+    grouped_corr(merged, "gt_index", "cdc_rate", by=["disease", "FIPS"], n_perm=9999, n_boot=2000)
+    correlate_levels(merged, "gt_index", "cdc_rate", {"state": ["FIPS"], "year": ["Year"], "pooled": []},
+                     split=["disease"])
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.stats import norm, t as t_dist
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "util"))
+from seeded_pool import SEED, WORKERS, draw_chunks, run_jobs
+
+# ========= Config =========
+CHUNK = 500             # draws per task
+MIN_N = 3               # groups with fewer complete pairs get NaN
+# =========================
+
+
+def _prepare(df, x, y, by):
+    """Drop incomplete pairs, sort by group -> (keys, gid, x, y)."""
+    d = df[list(by) + [x, y]].copy()
+    d[x] = pd.to_numeric(d[x], errors="coerce")
+    d[y] = pd.to_numeric(d[y], errors="coerce")
+    d = d.dropna(subset=[x, y])
+    if by:
+        g = d.groupby(list(by), sort=True, observed=True)
+        gid, keys = g.ngroup().to_numpy(), g.size().reset_index()[list(by)]
+    else:
+        gid, keys = np.zeros(len(d), dtype=np.int64), pd.DataFrame(index=[0])
+    order = np.argsort(gid, kind="stable")
+    return keys, gid[order], d[x].to_numpy("float64")[order], d[y].to_numpy("float64")[order]
+
+
+def _indicator(gid, n_groups):
+    return sp.csr_matrix((np.ones(len(gid)), (np.arange(len(gid)), gid)), shape=(len(gid), n_groups))
+
+
+def _corr_from_sums(G, xs, ys):
+    """xs, ys: (draws x rows) -> r per (draw, group)."""
+    n = np.asarray(G.sum(0)).ravel()
+    sx, sy = xs @ G, ys @ G
+    sxx, syy, sxy = (xs * xs) @ G, (ys * ys) @ G, (xs * ys) @ G
+    cov = sxy - sx * sy / n
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return cov / np.sqrt((sxx - sx ** 2 / n) * (syy - sy ** 2 / n))
+
+
+def _perm_chunk(job):
+    """Count |r*| >= |r| over one chunk of within-group permutations."""
+    seed, draws, gid, xc, yc, r_abs, n_groups = job
+    rng = np.random.default_rng(seed)
+    order = np.argsort(gid[None, :] + rng.random((draws, len(gid))), axis=1)
+    G = _indicator(gid, n_groups)
+    # x, y are centred within group, so r* is just the cross product over the fixed denominator
+    num = (xc[None, :] * yc[order]) @ G
+    den = np.sqrt(np.asarray((xc * xc) @ G) * np.asarray((yc * yc) @ G))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = num / den
+    return (np.abs(r) >= r_abs - 1e-12).sum(0)
+
+
+def _boot_chunk(job):
+    """r for one chunk of within-group bootstrap resamples -> (draws x groups)."""
+    seed, draws, start, size, gid, x, y, n_groups = job
+    rng = np.random.default_rng(seed)
+    idx = start[gid][None, :] + (rng.random((draws, len(gid))) * size[gid][None, :]).astype(np.int64)
+    return _corr_from_sums(_indicator(gid, n_groups), x[idx], y[idx])
+
+
+def grouped_corr(df, x, y, by=(), n_perm=0, n_boot=0, seed=SEED, workers=WORKERS, alpha=0.05):
+    """
+    Pearson r of x and y within every group of `by` (empty = pooled).
+    Returns by..., n, r, p, ci_lo, ci_hi [, perm_p] [, boot_lo, boot_hi].
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    keys, gid, xv, yv = _prepare(df, x, y, by)
+    n_groups = len(keys)
+    G = _indicator(gid, n_groups)
+    n = np.asarray(G.sum(0)).ravel()
+    r = _corr_from_sums(G, xv[None, :], yv[None, :])[0]
+    r[n < MIN_N] = np.nan
+
+    dof = n - 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        tt = r * np.sqrt(dof / np.clip(1 - r ** 2, 1e-300, None))
+        p = np.where(np.abs(r) >= 1, 0.0, 2 * t_dist.sf(np.abs(tt), dof))
+        z, se = np.arctanh(np.clip(r, -1 + 1e-15, 1 - 1e-15)), 1 / np.sqrt(n - 3)
+    q = norm.ppf(1 - alpha / 2)
+    out = keys.assign(n=n.astype(np.int64), r=r, p=np.where(np.isnan(r), np.nan, p),
+                      ci_lo=np.tanh(z - q * se), ci_hi=np.tanh(z + q * se))
+    out.loc[n <= 3, ["ci_lo", "ci_hi"]] = np.nan
+
+    if n_perm:
+        mx = (xv @ G) / n
+        my = (yv @ G) / n
+        xc, yc = xv - mx[gid], yv - my[gid]
+        jobs = [(s, k, gid, xc, yc, np.abs(r), n_groups) for s, k in draw_chunks(n_perm, seed, 1, CHUNK)]
+        hits = np.sum(run_jobs(_perm_chunk, jobs, workers), axis=0)
+        out["perm_p"] = np.where(np.isnan(r), np.nan, (1 + hits) / (1 + n_perm))
+
+    if n_boot:
+        start = np.r_[0, np.cumsum(n)[:-1]].astype(np.int64)
+        jobs = [(s, k, start, n.astype(np.int64), gid, xv, yv, n_groups) for s, k in draw_chunks(n_boot, seed, 2, CHUNK)]
+        R = np.vstack(run_jobs(_boot_chunk, jobs, workers))
+        lo, hi = np.nanquantile(R, [alpha / 2, 1 - alpha / 2], axis=0)
+        out["boot_lo"] = np.where(np.isnan(r), np.nan, lo)
+        out["boot_hi"] = np.where(np.isnan(r), np.nan, hi)
+    return out.reset_index(drop=True)
+
+
+def correlate_levels(df, x, y, levels, split=(), **kw):
+    """
+    Several groupings in one call, e.g. levels={"state": ["FIPS"], "year": ["Year"], "pooled": []}.
+    `split` columns (disease, keyword) are added to every grouping. Returns one long frame with a
+    `level` column; grouping columns a level does not use are NaN.
+    """
+    split = [split] if isinstance(split, str) else list(split)
+    frames = []
+    for name, cols in levels.items():
+        res = grouped_corr(df, x, y, by=split + list(cols), **kw)
+        frames.append(res.assign(level=name))
+    out = pd.concat(frames, ignore_index=True)
+    front = ["level"] + split + [c for cols in levels.values() for c in cols if c not in split]
+    front = list(dict.fromkeys(front))
+    for c in front[1:]:
+        if pd.api.types.is_integer_dtype(df[c]):
+            out[c] = out[c].astype("Int64")   # levels without this column leave NaN
+    return out[front + [c for c in out.columns if c not in front]]
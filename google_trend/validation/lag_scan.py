@@ -0,0 +1,219 @@
+"""
+Lead/lag scan between GT indices and CDC rates, every state and disease at once.
+
+Sign convention: lag k > 0 means GT leads, i.e. GT at t - k is paired with CDC at t.
+
+- xcorr(X, Y, max_lag): same-frequency series (rows = series). The six sufficient
+  statistics per lag (n, sums, squares, cross products over the overlapping,
+  non-missing pairs) are FFT cross-correlations of the masked rows, so Pearson r
+  for every row and lag comes out of a handful of rfft calls.
+- annual_stats(G, months, C, years): monthly GT against annual CDC rates (the CDC files
+  here are annual). GT shifted by k months is averaged over each calendar year
+  (a 12-month window ending in December - k), then correlated with that year's
+  rate, so leads/lags are resolved in months although CDC reports once a year.
+- rolling_corr(X, Y, window): windowed correlations from cumulative sums, to see
+  whether the proxy quality drifts.
+
+Results also pool the sufficient statistics across states ("pooled" rows,
+FIPS = NA), which is the pooled correlation at each lag.
+
+Usage:
+    python lag_scan.py                                 # every disease in validate_pearsonr.DISEASES
+    python lag_scan.py --max-lag 24 --window 4 -o lag_scan.csv
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from gt_ingest import ingest
+from gt_resample import resample
+from validate_pearsonr import DISEASES, THESIS_ROOT, load_cdc
+
+# ========= Config =========
+MAX_LAG = 24            # months (annual_scan) or periods (xcorr)
+MIN_PAIRS = 4           # fewer overlapping pairs -> r = NaN
+ROLL_WINDOW = 4         # years per rolling window (annual CDC)
+# =========================
+
+
+def _r(n, sx, sy, sxx, syy, sxy):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sxy - sx * sy / n
+        r = cov / np.sqrt((sxx - sx ** 2 / n) * (syy - sy ** 2 / n))
+    return np.where(n >= MIN_PAIRS, np.clip(r, -1, 1), np.nan)
+
+
+def _stats_sum(stats, axis=0):
+    return tuple(s.sum(axis) for s in stats)
+
+
+# ---------- same-frequency cross-correlation ----------
+
+def _xc(a, b, nfft, max_lag):
+    """sum_t a[t - k] * b[t] for k = -max_lag..max_lag, every row."""
+    c = np.fft.irfft(np.conj(np.fft.rfft(a, nfft)) * np.fft.rfft(b, nfft), nfft)
+    return np.concatenate([c[:, nfft - max_lag:], c[:, :max_lag + 1]], axis=1)
+
+
+def xcorr_stats(X, Y, max_lag=MAX_LAG):
+    """Rows of X, Y (series x time, NaN allowed) -> six (series x lags) sufficient statistics."""
+    T = X.shape[1]
+    max_lag = min(max_lag, T - 1)
+    mx, my = (~np.isnan(X)).astype("float64"), (~np.isnan(Y)).astype("float64")
+    x, y = np.nan_to_num(X), np.nan_to_num(Y)
+    nfft = 1 << int(np.ceil(np.log2(2 * T)))
+    stats = (_xc(mx, my, nfft, max_lag), _xc(x, my, nfft, max_lag), _xc(mx, y, nfft, max_lag),
+             _xc(x * x, my, nfft, max_lag), _xc(mx, y * y, nfft, max_lag), _xc(x, y, nfft, max_lag))
+    return (np.rint(stats[0]),) + stats[1:], np.arange(-max_lag, max_lag + 1)
+
+
+def xcorr(X, Y, max_lag=MAX_LAG):
+    """-> (r: series x lags, n: series x lags, lags)."""
+    stats, lags = xcorr_stats(X, Y, max_lag)
+    return _r(*stats), stats[0], lags
+
+
+# ---------- monthly GT vs annual CDC ----------
+
+def annual_means(G, months, years, lags):
+    """
+    G: monthly GT (series x months) -> (series x years x lags): mean of the 12 months
+    ending in December of each year minus k months; NaN unless all 12 are observed.
+    """
+    months = pd.DatetimeIndex(months)
+    m_idx = (months.year * 12 + months.month - 1).to_numpy()
+    first = m_idx[0]
+    full = np.full((G.shape[0], m_idx[-1] - first + 1), np.nan)
+    full[:, m_idx - first] = G
+
+    ok = ~np.isnan(full)
+    cs = np.concatenate([np.zeros((len(full), 1)), np.cumsum(np.nan_to_num(full), 1)], 1)
+    cn = np.concatenate([np.zeros((len(full), 1)), np.cumsum(ok, 1)], 1)
+
+    end = (np.asarray(years) * 12 + 11 - first)[:, None] - np.asarray(lags)[None, :]
+    valid = (end - 11 >= 0) & (end < full.shape[1])
+    e = np.clip(end, 11, full.shape[1] - 1)
+    win_n = cn[:, e + 1] - cn[:, e - 11]
+    return np.where(valid[None] & (win_n == 12), (cs[:, e + 1] - cs[:, e - 11]) / 12, np.nan)
+
+
+def annual_stats(G, months, C, years, max_lag=MAX_LAG):
+    """
+    G: monthly GT (series x months), C: annual rates (series x years), rows aligned.
+    Returns the six sufficient statistics (series x lags) over years, and the lags.
+    """
+    lags = np.arange(-max_lag, max_lag + 1)
+    A = annual_means(G, months, years, lags)
+    Cb = np.broadcast_to(C[:, :, None], A.shape)
+    pair = ~np.isnan(A) & ~np.isnan(Cb)
+    a, c = np.where(pair, A, 0.0), np.where(pair, Cb, 0.0)
+    stats = (pair.sum(1).astype("float64"), a.sum(1), c.sum(1), (a * a).sum(1), (c * c).sum(1), (a * c).sum(1))
+    return stats, lags
+
+
+# ---------- rolling ----------
+
+def rolling_corr(X, Y, window, min_pairs=None):
+    """Correlation over the `window` periods ending at each t (series x time); NaN-aware."""
+    min_pairs = window if min_pairs is None else min_pairs
+    pair = ~np.isnan(X) & ~np.isnan(Y)
+    x, y = np.where(pair, X, 0.0), np.where(pair, Y, 0.0)
+
+    def roll(v):
+        c = np.concatenate([np.zeros((len(v), 1)), np.cumsum(v, 1)], 1)
+        out = np.full(v.shape, np.nan)
+        out[:, window - 1:] = c[:, window:] - c[:, :-window]
+        return out
+
+    n = roll(pair.astype("float64"))
+    r = _r(n, roll(x), roll(y), roll(x * x), roll(y * y), roll(x * y))
+    return np.where(n >= min_pairs, r, np.nan), n
+
+
+# ---------- panel driver ----------
+
+def _matrix(df, key, time, value, index):
+    """(index x time) matrix; rows follow `index`, NaN for keys with no values."""
+    wide = df.pivot_table(index=key, columns=time, values=value, aggfunc="mean").reindex(index)
+    return wide.columns, wide.to_numpy("float64")
+
+
+def scan_disease(gt, cdc, max_lag=MAX_LAG, window=ROLL_WINDOW):
+    """
+    gt: monthly long frame (FIPS, Month, gt_index); cdc: annual (FIPS, Year, cdc_rate).
+    -> (scan: FIPS, lag, r, n incl. pooled rows; rolling: FIPS, Year, r, n over `window` years).
+    """
+    states = np.intersect1d(gt["FIPS"].unique(), cdc["FIPS"].unique())
+    gt, cdc = gt[gt["FIPS"].isin(states)], cdc[cdc["FIPS"].isin(states)]
+    fips = states    # one row order for both matrices
+    months, G = _matrix(gt, "FIPS", "Month", "gt_index", fips)
+    years, C = _matrix(cdc, "FIPS", "Year", "cdc_rate", fips)
+
+    stats, lags = annual_stats(G, months, C, years.to_numpy(), max_lag)
+    r, n = _r(*stats), stats[0]
+    pooled = _stats_sum(stats)
+    scan = pd.DataFrame({"FIPS": pd.array(np.repeat(fips, len(lags)), dtype="Int16"),
+                         "lag": np.tile(lags, len(fips)), "r": r.ravel(), "n": n.ravel().astype(int)})
+    scan = pd.concat([scan, pd.DataFrame({"FIPS": pd.array([pd.NA] * len(lags), dtype="Int16"),
+                                          "lag": lags, "r": _r(*pooled), "n": pooled[0].astype(int)})],
+                     ignore_index=True)
+
+    # drift: same-year annual GT means against the rates, over `window`-year windows
+    A = annual_means(G, months, years.to_numpy(), [0])[:, :, 0]
+    rr, rn = rolling_corr(A, C, window, min_pairs=max(3, window - 1))
+    rolling = pd.DataFrame({"FIPS": pd.array(np.repeat(fips, len(years)), dtype="Int16"),
+                            "Year": np.tile(years.to_numpy(), len(fips)), "r": rr.ravel(),
+                            "n": rn.ravel()}).dropna(subset=["r"]).astype({"n": int})
+    return scan, rolling
+
+
+def load_monthly_gt(pattern):
+    gt = ingest(pattern)
+    if gt.empty:
+        raise FileNotFoundError(f"no GT files matched {pattern}")
+    gt = resample(gt, "month").dropna(subset=["state"])
+    return pd.DataFrame({"FIPS": gt["state"].astype(int), "Month": gt["period"], "gt_index": gt["value"]})
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Lead/lag and rolling correlations, GT vs CDC")
+    ap.add_argument("--disease", nargs="+", default=list(DISEASES), choices=list(DISEASES))
+    ap.add_argument("--max-lag", type=int, default=MAX_LAG, help="months")
+    ap.add_argument("--window", type=int, default=ROLL_WINDOW, help="years per rolling window")
+    ap.add_argument("-o", "--out", help="scan CSV; rolling correlations go to *_rolling.csv")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    scans, rolls = [], []
+    for disease in args.disease:
+        pattern, cdc_file = DISEASES[disease]
+        gt = load_monthly_gt(os.path.join(THESIS_ROOT, "google_trend", pattern))
+        cdc = load_cdc(os.path.join(THESIS_ROOT, cdc_file))
+        scan, rolling = scan_disease(gt, cdc, args.max_lag, args.window)
+        scans.append(scan.assign(disease=disease))
+        rolls.append(rolling.assign(disease=disease))
+
+        pooled = scan[scan["FIPS"].isna()].dropna(subset=["r"])
+        best = pooled.loc[pooled["r"].abs().idxmax()] if len(pooled) else None
+        per_state = scan.dropna(subset=["FIPS", "r"])
+        peak = per_state.loc[per_state.groupby("FIPS")["r"].idxmax(), "lag"]
+        print(f"\n{disease}: pooled r at lag 0 = {pooled.loc[pooled['lag'] == 0, 'r'].squeeze():.3f}"
+              + (f", strongest at lag {int(best['lag']):+d} months (r = {best['r']:.3f})" if best is not None else ""))
+        print(f"   per-state peak lag: median {peak.median():+.0f}, IQR {peak.quantile(0.25):+.0f}..{peak.quantile(0.75):+.0f} months")
+
+    if args.out:
+        stem, ext = os.path.splitext(args.out)
+        pd.concat(scans, ignore_index=True).to_csv(args.out, index=False)
+        pd.concat(rolls, ignore_index=True).to_csv(f"{stem}_rolling{ext}", index=False)
+        print(f"\n✅ scan -> {args.out}, rolling -> {stem}_rolling{ext}")
+    print(f"⏱️ {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
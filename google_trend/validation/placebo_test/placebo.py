@@ -0,0 +1,242 @@
+"""
+Placebo randomization test for the GT-CDC validation.
+
+Instead of one hand-picked placebo (coffee), thousands of placebo series are
+generated on the validation panel (state x year rows of one disease) and scored
+against the CDC rates together:
+
+    noise      iid N(0, 1) per state-year
+    bootstrap  GT series of unrelated keywords (e.g. the Coffee downloads): for every
+               draw a random keyword, a random source state per state and a moving-
+               block bootstrap over years (blocks of BLOCK years)
+    shift      the CDC series itself, each state shifted in time by its own random
+               non-zero number of years (circular), which keeps the cross-state levels
+
+Every draw is one row of a (draws x rows) matrix. The scores are matrix products:
+pooled r, within r and the two-way FE coefficient of the standardized series
+(state and year fixed effects removed from all draws at once by alternating
+demeaning), with its t statistic. The observed GT series is scored the same way.
+The empirical p-value is the share of placebo draws at least as extreme.
+
+Usage:
+    python placebo.py                                   # every disease, 5000 draws per type
+    python placebo.py --disease Syphilis --draws 20000 --types noise shift -o placebo_null.parquet
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(_HERE, ".."))
+sys.path.insert(0, os.path.join(_HERE, "..", ".."))
+sys.path.insert(0, os.path.join(_HERE, "..", "..", "..", "util"))
+from correlate import CHUNK
+from gt_ingest import ingest
+from gt_resample import resample
+from seeded_pool import SEED, WORKERS, draw_chunks, run_jobs
+from validate_pearsonr import DISEASES, MIN_COVERAGE, THESIS_ROOT, load_merged
+
+# ========= Config =========
+DRAWS = 5000            # per placebo type
+TYPES = ["noise", "bootstrap", "shift"]
+UNRELATED = [os.path.join(THESIS_ROOT, "google_trend", "placebo_test", "Coffee_*.csv")]
+BLOCK = 2               # years per bootstrap block
+FE_TOL = 1e-10
+FE_MAX_ITER = 100
+# =========================
+
+STATS = ["pooled_r", "within_r", "fe_beta", "fe_t"]
+
+
+class Panel:
+    """Row layout of one disease's validation panel: state / year codes and the FE operators."""
+
+    def __init__(self, merged):
+        self.df = merged.reset_index(drop=True)
+        self.s, self.states = pd.factorize(self.df["FIPS"], sort=True)
+        self.t, self.years = pd.factorize(self.df["Year"], sort=True)
+        self.n = len(self.df)
+        self.Gs = sp.csr_matrix((np.ones(self.n), (np.arange(self.n), self.s)))
+        self.Gt = sp.csr_matrix((np.ones(self.n), (np.arange(self.n), self.t)))
+        self.ns = np.asarray(self.Gs.sum(0)).ravel()
+        self.nt = np.asarray(self.Gt.sum(0)).ravel()
+        self.dof = self.n - len(self.states) - len(self.years)   # n - (S + T - 1) - 1 slope
+
+    def within(self, X):
+        """Remove state and year means from every row of X (draws x rows)."""
+        X = X - X.mean(1, keepdims=True)
+        for _ in range(FE_MAX_ITER):
+            X = X - ((X @ self.Gs) / self.ns)[:, self.s]
+            step = ((X @ self.Gt) / self.nt)[:, self.t]
+            X = X - step
+            if np.abs(step).max() < FE_TOL:
+                break
+        return X
+
+    def state_year(self, values):
+        """Row values -> (states x years) matrix, NaN where the panel has no row."""
+        M = np.full((len(self.states), len(self.years)), np.nan)
+        M[self.s, self.t] = values
+        return M
+
+
+def _standardize(X):
+    X = np.where(np.isnan(X), np.nanmean(X, 1, keepdims=True), X)
+    sd = X.std(1, keepdims=True)
+    return (X - X.mean(1, keepdims=True)) / np.where(sd > 0, sd, 1)
+
+
+def score(panel, X, y):
+    """Placebo rows X (draws x rows) against y -> frame of STATS, one row per draw."""
+    X = _standardize(np.atleast_2d(X))
+    yc = y - y.mean()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pooled = (X @ yc) / (np.sqrt((X * X).sum(1)) * np.sqrt(yc @ yc))
+        Xw, yw = panel.within(X), panel.within(y[None, :])[0]
+        sxx = (Xw * Xw).sum(1)
+        sxy = Xw @ yw
+        beta = sxy / sxx
+        rss = yw @ yw - beta * sxy
+        t = beta / np.sqrt(rss / max(panel.dof, 1) / sxx)
+        within = sxy / np.sqrt(sxx * (yw @ yw))
+    return pd.DataFrame({"pooled_r": pooled, "within_r": within, "fe_beta": beta, "fe_t": t})
+
+
+# ---------- generators: (rng, draws, panel, ...) -> (draws x rows) ----------
+
+def gen_noise(rng, draws, panel):
+    return rng.standard_normal((draws, panel.n))
+
+
+def gen_shift(rng, draws, panel, y):
+    C = panel.state_year(y)
+    T = C.shape[1]
+    if T < 2:
+        raise ValueError("shift placebos need at least two years")
+    delta = rng.integers(1, T, size=(draws, C.shape[0]))
+    return C[panel.s[None, :], (panel.t[None, :] + delta[:, panel.s]) % T]
+
+
+def gen_bootstrap(rng, draws, panel, U):
+    """U: (keywords x source states x years) annual GT values of unrelated keywords."""
+    K, S_src, T_src = U.shape
+    L = min(BLOCK, T_src)
+    S, T = len(panel.states), len(panel.years)
+    n_blocks = -(-T // L)
+    kw = rng.integers(0, K, size=draws)
+    src = rng.integers(0, S_src, size=(draws, S))
+    start = rng.integers(0, T_src - L + 1, size=(draws, S, n_blocks))
+    pos = start[:, panel.s, panel.t // L] + panel.t % L          # (draws x rows)
+    return U[kw[:, None], src[:, panel.s], pos]
+
+
+def unrelated_panel(patterns):
+    """Unrelated GT downloads -> (keywords x states x years) annual means."""
+    annual = resample(ingest(patterns), "year", min_coverage=MIN_COVERAGE).dropna(subset=["state"])
+    if annual.empty:
+        return None
+    cube = annual.pivot_table(index=["keyword", "state"], columns=annual["period"].dt.year,
+                              values="value", observed=True)
+    kws = cube.index.get_level_values(0).unique()
+    states = cube.index.get_level_values(1).unique()
+    full = cube.reindex(pd.MultiIndex.from_product([kws, states]))
+    U = full.to_numpy().reshape(len(kws), len(states), cube.shape[1])
+    U = np.where(np.isnan(U), np.nanmean(U, axis=2, keepdims=True), U)
+    return U[:, ~np.isnan(U).all(axis=(0, 2))]
+
+
+def _draw_chunk(job):
+    seed, draws, kind, panel, y, U = job
+    rng = np.random.default_rng(seed)
+    if kind == "noise":
+        X = gen_noise(rng, draws, panel)
+    elif kind == "shift":
+        X = gen_shift(rng, draws, panel, y)
+    else:
+        X = gen_bootstrap(rng, draws, panel, U)
+    return score(panel, X, y)
+
+
+def placebo_test(merged, draws=DRAWS, types=TYPES, unrelated=None, seed=SEED, workers=WORKERS):
+    """
+    merged: one disease's validation panel (FIPS, Year, gt_index, cdc_rate).
+    Returns (null, summary): every placebo draw's STATS, and per (type, stat) the
+    observed value, the null mean / 2.5% / 97.5% quantiles and the two-sided empirical p.
+    """
+    if "bootstrap" in types and unrelated is None:
+        warnings.warn("no unrelated GT panel (unrelated=None), skipping bootstrap placebos")
+        types = [t for t in types if t != "bootstrap"]
+    if not types:
+        raise ValueError("no placebo types to run: bootstrap placebos need unrelated GT downloads")
+    merged = merged.dropna(subset=["gt_index", "cdc_rate"])
+    panel = Panel(merged)
+    y = panel.df["cdc_rate"].to_numpy("float64")
+    observed = score(panel, panel.df["gt_index"].to_numpy("float64"), y).iloc[0]
+
+    nulls = []
+    for salt, kind in enumerate(types, start=10):
+        jobs = [(s, k, kind, panel, y, unrelated) for s, k in draw_chunks(draws, seed, salt, CHUNK)]
+        nulls.append(pd.concat(run_jobs(_draw_chunk, jobs, workers), ignore_index=True).assign(type=kind))
+    null = pd.concat(nulls, ignore_index=True)
+
+    rows = []
+    for kind, g in null.groupby("type", sort=False):
+        for stat in STATS:
+            v = g[stat].dropna().to_numpy()
+            obs = observed[stat]
+            rows.append({
+                "type": kind, "stat": stat, "observed": obs, "draws": len(v),
+                "null_mean": v.mean(), "null_q025": np.quantile(v, 0.025), "null_q975": np.quantile(v, 0.975),
+                "p_emp": (1 + (np.abs(v - v.mean()) >= abs(obs - v.mean())).sum()) / (1 + len(v)),
+            })
+    return null, pd.DataFrame(rows)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Randomization test: GT-CDC validation against placebo series")
+    ap.add_argument("--disease", nargs="+", default=list(DISEASES), choices=list(DISEASES))
+    ap.add_argument("--draws", type=int, default=DRAWS, help="draws per placebo type")
+    ap.add_argument("--types", nargs="+", default=TYPES, choices=TYPES)
+    ap.add_argument("--unrelated", nargs="+", default=UNRELATED, help="GT downloads of unrelated keywords")
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    ap.add_argument("-o", "--out", help="write every null draw (.parquet / .csv)")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    U = unrelated_panel(args.unrelated) if "bootstrap" in args.types else None
+    types = list(args.types)
+    if "bootstrap" in types and U is None:
+        types.remove("bootstrap")
+        missing = ", ".join(args.unrelated)
+        if not types:
+            raise SystemExit(f"❌ bootstrap placebos need unrelated GT downloads, none found for: {missing}")
+        print(f"⚠️ no unrelated GT downloads found for {missing}, skipping bootstrap placebos")
+    merged = load_merged({d: DISEASES[d] for d in args.disease})
+
+    nulls, summaries = [], []
+    for disease, sub in merged.groupby("disease", sort=False):
+        null, summary = placebo_test(sub, args.draws, types, U, args.seed, args.workers)
+        nulls.append(null.assign(disease=disease))
+        summaries.append(summary.assign(disease=disease))
+        print(f"\n{disease} placebo test ({len(null):,} draws)")
+        print(summary.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+
+    if args.out:
+        null = pd.concat(nulls, ignore_index=True)
+        null.to_parquet(args.out, index=False) if args.out.endswith(".parquet") else null.to_csv(args.out, index=False)
+        stem, ext = os.path.splitext(args.out)
+        pd.concat(summaries, ignore_index=True).to_csv(f"{stem}_summary.csv", index=False)
+        print(f"\n✅ null draws -> {args.out}, summary -> {stem}_summary.csv")
+    print(f"⏱️ {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,60 @@
-import pandas as pd
-import glob
+"""
+GT vs CDC validation: annual GT means against CDC rates, per state, per year and pooled,
+for every disease in one grouped pass (correlate.py), with permutation p-values and
+bootstrap CIs.
+
+Annual GT means keep every year with any observed data (MIN_COVERAGE = 0), as the
+old per-year mean did; gt_resample's default would drop years under half covered,
+e.g. a download ending mid-year. Months are day-weighted within a year, so means
+differ slightly from the old plain average of monthly values.
+
+Usage:
+    python validate_pearsonr.py
+    python validate_pearsonr.py --perm 9999 --boot 2000 --seed 1 -o validation_results.csv
+"""
+import argparse
 import os
-from scipy.stats import pearsonr
-
-state_fips = {
-    "CA": 6,
-    "TX": 48,
-    "FL": 12,
-    "IL": 17,
-    "WA": 53,
-    "WY": 56,
-    "NY": 36
-}
-
-def process_gt_file(file_path):
-    with open(file_path, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-    
-    data_lines = [line.strip() for line in lines if "," in line and not line.startswith("Month")]
-
-    data = [line.split(",") for line in data_lines]
-
-    df = pd.DataFrame(data, columns=["Month", "gt_index"])
+import sys
 
-    df["Month"] = pd.to_datetime(df["Month"], format="%Y-%m")
-    df["gt_index"] = pd.to_numeric(df["gt_index"], errors="coerce")
-
-    df["Year"] = df["Month"].dt.year
-    annual = df.groupby("Year")["gt_index"].mean().reset_index()
+import pandas as pd
 
-    state_abbr = os.path.basename(file_path).split("_")[-1].split(".")[0]
-    annual["state_abbr"] = state_abbr
-    annual["FIPS"] = state_fips[state_abbr]
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "util"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from geo_registry import abbr_of
+from gt_ingest import ingest
+from gt_resample import resample
+from correlate import SEED, WORKERS, correlate_levels, grouped_corr
+
+# ========= Config =========
+# disease -> (GT download pattern under google_trend/, CDC file relative to THESIS_ROOT)
+DISEASES = {
+    "Syphilis": ("val_Syphilis_*.csv", "google_trend/CDC/Syphilis_state_2018_2023.csv"),
+    "Gonorrhea": ("val_Gonorrhea_*.csv", "google_trend/CDC/Gonorrhea_state_2018_2023.csv"),
+    "Chlamydia": ("val_Chlamydia_*.csv", "google_trend/CDC/Chlamydia_state_2018_2023.csv"),
+    "All STDs": ("val_STD_Testing_*.csv", "google_trend/CDC/All_STDs_state_2018_2023_with_total.csv"),
+}
+LEVELS = {"state": ["FIPS"], "year": ["Year"], "pooled": []}
+MIN_COVERAGE = 0.0      # share of a year's days observed to keep it (gt_resample default: 0.5)
+THESIS_ROOT = os.getenv("THESIS_ROOT", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+# =========================
+
+def load_gt(pattern):
+    """val_<Keyword>_<ST>.csv downloads -> annual mean index per state (Year, gt_index, state_abbr, FIPS)."""
+    gt = ingest(pattern)
+    if gt.empty:
+        raise FileNotFoundError(f"no GT files matched {pattern}")
+    annual = resample(gt, "year", min_coverage=MIN_COVERAGE)
+    annual = annual.dropna(subset=["state"])
+    annual = pd.DataFrame({
+        "Year": annual["period"].dt.year,
+        "gt_index": annual["value"],
+        "state_abbr": abbr_of(annual["state"]).to_numpy(),
+        "FIPS": annual["state"].astype(int),
+    })
+    return annual.sort_values(["FIPS", "Year"]).reset_index(drop=True)
 
-    return annual
+def process_gt_file(file_path):
+    return load_gt(file_path)
 
 def load_cdc(file_path):
     df = pd.read_csv(file_path)
@@ -43,76 +64,61 @@ def load_cdc(file_path):
 
 def merge_and_test(gt_data, cdc_data):
     merged = pd.merge(
-        gt_data, 
-        cdc_data, 
+        gt_data,
+        cdc_data,
         on=["Year", "FIPS"], how="inner" # inner join to keep only matching records
     )
 
     merged["gt_index"] = pd.to_numeric(merged["gt_index"], errors="coerce")
     merged["cdc_rate"] = pd.to_numeric(merged["cdc_rate"], errors="coerce")
 
-    # correlation by FIPS
-    results = []
-    for f in merged["FIPS"].unique():
-        sub = merged[merged["FIPS"] == f]
-        if len(sub) > 2:
-            from scipy.stats import pearsonr
-            r, p = pearsonr(sub["gt_index"], sub["cdc_rate"])
-            results.append({"FIPS": f, "r": r, "p": p})
-    results = pd.DataFrame(results)
+    # correlation by FIPS, all states in one grouped pass
+    results = grouped_corr(merged, "gt_index", "cdc_rate", by="FIPS")
+    results = results.loc[results["n"] > 2, ["FIPS", "r", "p"]].reset_index(drop=True)
 
     # correlation overall
-    r_all, p_all = pearsonr(merged["gt_index"], merged["cdc_rate"])
-
-    return merged, results, (r_all, p_all)
+    overall = grouped_corr(merged, "gt_index", "cdc_rate").iloc[0]
+
+    return merged, results, (overall["r"], overall["p"])
+
+def load_merged(diseases=DISEASES, root=THESIS_ROOT):
+    """Every disease's annual GT means joined to its CDC rates, stacked with a `disease` column."""
+    frames = []
+    for disease, (pattern, cdc_file) in diseases.items():
+        gt = load_gt(os.path.join(root, "google_trend", pattern))
+        cdc = load_cdc(os.path.join(root, cdc_file))
+        frames.append(gt.merge(cdc, on=["Year", "FIPS"], how="inner").assign(disease=disease))
+    return pd.concat(frames, ignore_index=True)
+
+def main():
+    ap = argparse.ArgumentParser(description="GT vs CDC correlations per state, per year and pooled")
+    ap.add_argument("--perm", type=int, default=9999, help="within-group permutations (0 = off)")
+    ap.add_argument("--boot", type=int, default=2000, help="bootstrap resamples (0 = off)")
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    ap.add_argument("-o", "--out", help="write every result row to this CSV")
+    args = ap.parse_args()
+
+    merged = load_merged()
+    res = correlate_levels(merged, "gt_index", "cdc_rate", LEVELS, split="disease",
+                           n_perm=args.perm, n_boot=args.boot, seed=args.seed, workers=args.workers)
+
+    for disease in DISEASES:
+        sub = res[res["disease"] == disease]
+        print(f"\n{disease} Validation Results")
+        print("Correlation by State:")
+        print(sub.loc[sub["level"] == "state"].dropna(axis=1, how="all").drop(columns=["level", "disease"])
+              .to_string(index=False))
+        print("\nCorrelation by Year:")
+        print(sub.loc[sub["level"] == "year"].dropna(axis=1, how="all").drop(columns=["level", "disease"])
+              .to_string(index=False))
+        overall = sub.loc[sub["level"] == "pooled"].iloc[0]
+        print("\nOverall Correlation:")
+        print("r =", overall["r"], "p =", overall["p"], "n =", overall["n"])
+
+    if args.out:
+        res.to_csv(args.out, index=False)
+        print(f"\n✅ {len(res)} result rows -> {args.out}")
 
 if __name__ == "__main__":
-    folder = "/Users/okuran/Desktop/thesis/google_trend"
-    files_sy = glob.glob(os.path.join(folder, "val_Syphilis_*.csv"))
-    files_go = glob.glob(os.path.join(folder, "val_Gonorrhea_*.csv"))
-    files_ch = glob.glob(os.path.join(folder, "val_Chlamydia_*.csv"))
-    file_all = glob.glob(os.path.join(folder, "val_STD_Testing_*.csv"))
-
-    gt_data_sy = pd.concat([process_gt_file(f) for f in files_sy], ignore_index=True)
-    gt_data_go = pd.concat([process_gt_file(f) for f in files_go], ignore_index=True)
-    gt_data_ch = pd.concat([process_gt_file(f) for f in files_ch], ignore_index=True)
-    gt_data_all = pd.concat([process_gt_file(f) for f in file_all], ignore_index=True)
-
-
-    cdc_data_sy = load_cdc("google_trend/CDC/Syphilis_state_2018_2023.csv")
-    cdc_data_go = load_cdc("google_trend/CDC/Gonorrhea_state_2018_2023.csv")
-    cdc_data_ch = load_cdc("google_trend/CDC/Chlamydia_state_2018_2023.csv")
-    cdc_data_all = load_cdc("google_trend/CDC/All_STDs_state_2018_2023_with_total.csv")
-
-
-    merged_sy, state_corr_sy, overall_corr_sy = merge_and_test(gt_data_sy, cdc_data_sy)
-
-    print("Syphilis Validation Results")
-    print("Correlation by State:")
-    print(state_corr_sy)
-    print("\nOverall Correlation:")
-    print("r =", overall_corr_sy[0], "p =", overall_corr_sy[1])
-
-    merged_go, state_corr_go, overall_corr_go = merge_and_test(gt_data_go, cdc_data_go)
-
-    print("\nGonorrhea Validation Results")
-    print("\nCorrelation by State:")
-    print(state_corr_go)
-    print("\nOverall Correlation:")
-    print("r =", overall_corr_go[0], "p =", overall_corr_go[1])
-
-    merged_ch, state_corr_ch, overall_corr_ch = merge_and_test(gt_data_ch, cdc_data_ch)
-
-    print("\nChlamydia Validation Results")
-    print("\nCorrelation by State:")
-    print(state_corr_ch)
-    print("\nOverall Correlation:")
-    print("r =", overall_corr_ch[0], "p =", overall_corr_ch[1])
-
-    merged_all, state_corr_all, overall_corr_all = merge_and_test(gt_data_all, cdc_data_all)
-    
-    print("\nAll STDs Validation Results")
-    print("\nCorrelation by State:")
-    print(state_corr_all)
-    print("\nOverall Correlation:")
-    print("r =", overall_corr_all[0], "p =", overall_corr_all[1])
+    main()
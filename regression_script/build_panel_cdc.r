@@ -219,7 +219,7 @@ pdim(pdata)
 
 colSums(is.na(panel))
 
-write.csv(panel, "/Users/okuran/Desktop/thesis/master_data/state_panel_2010_2023.csv")
+write.csv(panel, file.path(data_dir, "state_panel_2010_2023.csv"))
 
 #================================
 desc_vars <- panel |>
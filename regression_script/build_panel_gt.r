@@ -18,6 +18,19 @@ norm_fips <- function(x) {
 to_int <- function(x) suppressWarnings(as.integer(as.character(x)))
 NA_STR <- c("Data not available","Data suppressed","Suppressed","NA","")
 
+# master_data Parquet store (data_process_script/master_store.py): typed columns,
+# fixed-width fips, only `cols` are read. Falls back to the CSV when arrow or the source is missing.
+store_dir <- file.path(data_dir, "store")
+read_source <- function(source, csv, cols = NULL) {
+  path <- file.path(store_dir, source)
+  if (dir.exists(path) && requireNamespace("arrow", quietly = TRUE)) {
+    ds <- arrow::open_dataset(path, partitioning = arrow::hive_partition(year = arrow::int16()))
+    if (!is.null(cols)) ds <- select(ds, all_of(cols))
+    return(as.data.table(collect(ds)))
+  }
+  fread(csv, na.strings = NA_STR)
+}
+
 #==========Load Data=========
 #----------
 # data type
@@ -99,7 +112,8 @@ demo <- demo |>
   )
 
 ### insurance
-uninsured <- fread(file.path(ctrlVar_dir, "state_insurance_2010_2023.csv"))
+uninsured <- read_source("sahie_state", file.path(ctrlVar_dir, "state_insurance_2010_2023.csv"),
+                         c("state", "year", "uninsured_pct"))
 uninsured <- uninsured |>
   transmute(
     fips = norm_fips(state),
@@ -165,7 +179,8 @@ temperture <- temperture |>
   )
 
 ### unemployment
-unemp <- fread(file.path(ctrlVar_dir, "state_unemployment_2010_2024.csv"))
+unemp <- read_source("laus_state_unemployment", file.path(ctrlVar_dir, "state_unemployment_2010_2024.csv"),
+                     c("state_fips", "year", "month", "urate"))
 unemp <- unemp |>
   transmute(
     fips = norm_fips(state_fips),
@@ -175,7 +190,8 @@ unemp <- unemp |>
   )
 
 ### internet use
-internet <- fread(file.path(ctrlVar_dir, "state_internet_2018_2024.csv"))
+internet <- read_source("acs1_state_internet", file.path(ctrlVar_dir, "state_internet_2018_2024.csv"),
+                        c("state", "year", "internet_use_pct"))
 internet <- internet |> 
   transmute(
     fips = norm_fips(state),
@@ -234,6 +250,6 @@ panel_gt[, treat_time := ifelse(
   (as.numeric(treat_year) - base_year) * 12 + (as.numeric(treat_month) - base_month)
 )]
 
-write.csv(panel_gt, "/Users/okuran/Desktop/thesis/master_data/state_panel_2018_2024.csv")
+write.csv(panel_gt, file.path(data_dir, "state_panel_2018_2024.csv"))
 
 
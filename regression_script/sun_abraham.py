@@ -0,0 +1,252 @@
+"""
+Sun & Abraham (2021) interaction-weighted event study, in Python (fixest's sunab()).
+
+    y_it = a_i + l_t + sum_{e, r} b_{e,r} 1{cohort_i = e, t - e = r} + X_it g + u_it
+
+The cohort x relative-period dummies D are kept as a sparse (rows x cells)
+matrix and are never demeaned row by row. The unit and time effects of every D
+column are solved in coefficient space, by alternating projections on the
+sparse unit x time incidence matrix, which gives (N x cells) and (T x cells)
+effects A and B. Then
+
+    D'M D = D'D - Du'A - Dt'B                 (Du, Dt: unit / time sums of D)
+    cluster scores of M D = Gm (D * e) - H A - E B
+
+(H, E: cluster x unit and cluster x time sums of the residuals). So the within
+design is never formed, and a county x month panel with thousands of units and
+hundreds of cells needs only (N x cells) memory. y and the controls are demeaned
+with fe_ols.Absorber.
+
+Never-treated units (cohort NEVER_TREATED / NA, or treated after the last period)
+are the controls; without any, the last cohort is. REF relative periods are
+omitted, and cohorts never observed in one (treated before the panel starts) are
+dropped; any remaining collinear cells are removed by a pivoted QR. The event window is trimmed ("drop" removes treated observations
+outside it, as sunabDiD.r does; "bin" pools them into the end points).
+
+Aggregation: b_r = sum_e w_{e,r} b_{e,r}, w = each cohort's share of the
+observations at r, and the ATT averages the post-period cells by observations.
+Both have delta-method SEs from the clustered vcov of the cells (weights fixed).
+
+Usage:
+    python sun_abraham.py                                      # OUTCOMES on PANEL, window [-24, 24]
+    python sun_abraham.py --outcomes sy_index --window -12 12 --trim bin -o sunab.csv
+
+    from sun_abraham import sunab
+    event, cells = sunab(panel, "sy_index", unit="fips", time="time_id", cohort="treat_time",
+                         controls=CONTROLS, cluster="fips", window=(-24, 24))
+"""
+
+import argparse
+import os
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+import scipy.linalg as la
+import scipy.sparse as sp
+from scipy.stats import t as t_dist
+
+from fe_ols import CLUSTER, COLLINEAR_TOL, FE_MAX_ITER, FE_TOL, OUTCOMES, PANEL, Absorber
+
+# ========= Config =========
+UNIT, TIME, COHORT = "fips", "time_id", "treat_time"
+NEVER_TREATED = 0           # cohort code of never-treated units (build_panel_gt.r); NA also counts
+WINDOW = (-24, 24)
+REF = (-1,)
+CONTROLS = ["income_log", "unrate", "temp", "covid_cases_per_100k",
+            "share_age_15_44", "share_male", "share_black",
+            "share_married_15p", "share_ba_plus_25p",
+            "share_hs_plus_25p", "poverty_rate", "uninsured_rate",
+            "internet_use_pct"]
+# =========================
+
+
+def _cells(d, window, trim, ref):
+    """Cohort x relative-period cell of every row (-1 = control / reference) and the cell table."""
+    rel = (d["_t"] - d["_e"]).to_numpy()
+    treated = d["_treated"].to_numpy()
+    if window is not None:
+        lo, hi = window
+        if trim == "bin":
+            rel = np.clip(rel, lo, hi)
+        elif trim != "drop":
+            raise ValueError(f"trim must be 'drop' or 'bin', not {trim!r}")
+    in_cell = treated & ~np.isin(rel, ref)
+    key = pd.MultiIndex.from_arrays([d["_e"].to_numpy()[in_cell], rel[in_cell]])
+    codes, cells = pd.factorize(key, sort=True)
+    col = np.full(len(d), -1)
+    col[in_cell] = codes
+    return col, pd.DataFrame({"cohort": cells.get_level_values(0), "rel": cells.get_level_values(1)}).astype("int64")
+
+
+def _fe_effects(Su, St, W, nu, nt):
+    """
+    Unit / time effects (A: N x L, B: T x L) of columns with unit sums Su and time sums St,
+    by alternating projections in coefficient space; W: sparse (N x T) observation counts.
+    """
+    W = W.toarray()                             # (units x periods): small and nearly full
+    Wt = W.T.copy()
+    B = np.zeros((W.shape[1], Su.shape[1]))
+    scale = np.maximum(np.abs(Su).max(0) / np.maximum(nu.max(), 1), 1e-300)
+    for _ in range(FE_MAX_ITER):
+        A = (Su - W @ B) / nu[:, None]
+        B_new = (St - Wt @ A) / nt[:, None]
+        step = np.abs(B_new - B).max(0) / scale
+        B = B_new
+        if step.max() < FE_TOL:
+            break
+    return (Su - W @ B) / nu[:, None], B
+
+
+def sunab(df, y, unit=UNIT, time=TIME, cohort=COHORT, controls=(), cluster=None, window=WINDOW,
+          trim="drop", ref=REF, never=NEVER_TREATED, alpha=0.05):
+    """
+    Interaction-weighted event study. Returns (event, cells):
+    event: term ("rel::r" per relative period, then "ATT"), rel, estimate, std_error, t, p_value,
+           conf_low, conf_high, n_cohorts, n_obs;  cells: cohort, rel, estimate, std_error, n_obs.
+    """
+    controls = list(controls)
+    cluster = cluster or unit
+    cols = [y, unit, time, cohort] + controls + ([cluster] if cluster not in (unit, time, cohort) else [])
+    d = df[list(dict.fromkeys(cols))].copy()
+    d[[y] + controls] = d[[y] + controls].apply(pd.to_numeric, errors="coerce")
+    d = d.dropna(subset=[y, unit, time] + controls).reset_index(drop=True)
+
+    d["_t"] = pd.to_numeric(d[time])
+    e = pd.to_numeric(d[cohort], errors="coerce")
+    never_mask = e.isna() | (e == never) | (e > d["_t"].max())
+    if not never_mask.any():                    # no never-treated: the last cohort is the control
+        never_mask = e == e.max()
+        warnings.warn(f"no never-treated units, cohort {e.max()} is the control group", stacklevel=2)
+    d["_e"], d["_treated"] = e.where(~never_mask, np.nan), ~never_mask
+    if window is not None and trim == "drop":
+        rel = d["_t"] - d["_e"]
+        d = d[~d["_treated"] | rel.between(*window)].reset_index(drop=True)
+
+    # cohorts never observed in a reference period (e.g. treated before the first period) are
+    # collinear with their unit effects: drop them instead of letting an arbitrary cell absorb it
+    has_ref = (d["_t"] - d["_e"]).isin(ref).groupby(d["_e"]).any()
+    no_ref = has_ref.index[~has_ref]
+    if len(no_ref):
+        warnings.warn(f"{y}: dropping cohorts {list(no_ref)} without a reference period {list(ref)}", stacklevel=2)
+        d = d[~d["_e"].isin(no_ref)].reset_index(drop=True)
+
+    col, cells = _cells(d, window, trim, ref)
+    n, L = len(d), len(cells)
+    u_codes, units = pd.factorize(d[unit], sort=True)
+    t_codes, times = pd.factorize(d[time], sort=True)
+    N, T = len(units), len(times)
+    rows = np.flatnonzero(col >= 0)
+    D = sp.csr_matrix((np.ones(len(rows)), (rows, col[rows])), shape=(n, L))
+    U = sp.csr_matrix((np.ones(n), (u_codes, np.arange(n))), shape=(N, n))
+    Tm = sp.csr_matrix((np.ones(n), (t_codes, np.arange(n))), shape=(T, n))
+    W = (U @ Tm.T).tocsr()
+    nu, nt = np.asarray(W.sum(1)).ravel(), np.asarray(W.sum(0)).ravel()
+
+    # within Gram of the sparse dummies, from their FE effects
+    Du, Dt = (U @ D).toarray(), (Tm @ D).toarray()
+    A, B = _fe_effects(Du, Dt, W, nu, nt)
+    DD = np.asarray(D.sum(0)).ravel()
+    DMD = np.diag(DD) - Du.T @ A - Dt.T @ B
+
+    # dense part: y and controls
+    ab = Absorber(d.assign(_u=u_codes, _tt=t_codes), ["_u", "_tt"], np.ones(n))
+    raw = d[[y] + controls].to_numpy("float64")
+    Md = ab.demean(raw)
+    My, MX = Md[:, 0], Md[:, 1:]
+
+    ZtZ = np.block([[DMD, D.T @ MX], [MX.T @ D, MX.T @ MX]])
+    Zty = np.r_[D.T @ My, MX.T @ My]
+    # rank-revealing pivoted QR on the scaled Gram matrix, as fe_ols.fit does on the design
+    keep = np.diag(ZtZ) > 1e-10 * np.r_[DD, (raw[:, 1:] ** 2).sum(0)]
+    idx = np.flatnonzero(keep)
+    sd = np.sqrt(np.diag(ZtZ)[idx])
+    _, R, piv = la.qr(ZtZ[np.ix_(idx, idx)] / np.outer(sd, sd), pivoting=True)
+    diag = np.abs(np.diag(R))
+    rank = int((diag > COLLINEAR_TOL * diag[0]).sum()) if len(diag) else 0
+    keep[:] = False
+    keep[idx[np.sort(piv[:rank])]] = True
+    if not keep.all():
+        warnings.warn(f"{y}: dropping {int((~keep).sum())} cells / controls collinear with the fixed effects", stacklevel=2)
+    idx = np.flatnonzero(keep)
+    bread = np.linalg.inv(ZtZ[np.ix_(idx, idx)])
+    coef = np.zeros(L + len(controls))
+    coef[idx] = bread @ Zty[idx]
+    beta, gamma = coef[:L], coef[L:]
+
+    resid = My - ab.demean((D @ beta)[:, None])[:, 0] - MX @ gamma
+    cl_codes = pd.factorize(d[cluster], sort=True)[0]
+    G = cl_codes.max() + 1
+    H = sp.csr_matrix((resid, (cl_codes, u_codes)), shape=(G, N))
+    E = sp.csr_matrix((resid, (cl_codes, t_codes)), shape=(G, T))
+    Gm = sp.csr_matrix((np.ones(n), (cl_codes, np.arange(n))), shape=(G, n))
+    score_D = Gm @ D.multiply(resid[:, None]).tocsr() - H @ A - E @ B
+    score_X = Gm @ (MX * resid[:, None])
+    Ug = np.hstack([np.asarray(score_D), score_X])[:, idx]
+
+    K = len(idx) + ab.k_fe(cl_codes)
+    ssc = G / (G - 1) * (n - 1) / (n - K)
+    V = np.zeros((L + len(controls),) * 2)
+    V[np.ix_(idx, idx)] = ssc * bread @ Ug.T @ Ug @ bread
+    V_cells = V[:L, :L]
+    dof = G - 1
+    q = t_dist.ppf(1 - alpha / 2, dof)
+
+    cells = cells.assign(estimate=np.where(keep[:L], beta, np.nan),
+                         std_error=np.where(keep[:L], np.sqrt(np.diag(V_cells)), np.nan),
+                         n_obs=DD.astype(int))
+    ok = keep[:L]
+
+    # interaction weights: cohort shares of the observations at each relative period
+    aggs, rels = [], np.sort(cells.loc[ok, "rel"].unique())
+    for r in rels:
+        w = np.where(ok & (cells["rel"].to_numpy() == r), DD, 0.0)
+        aggs.append((f"rel::{r}", r, w / w.sum()))
+    w = np.where(ok & (cells["rel"].to_numpy() >= 0), DD, 0.0)
+    if w.sum():
+        aggs.append(("ATT", pd.NA, w / w.sum()))
+
+    out = []
+    for term, r, w in aggs:
+        est = w @ beta
+        se = np.sqrt(w @ V_cells @ w)
+        out.append({"term": term, "rel": r, "estimate": est, "std_error": se, "t": est / se,
+                    "p_value": 2 * t_dist.sf(abs(est / se), dof), "conf_low": est - q * se,
+                    "conf_high": est + q * se, "n_cohorts": cells.loc[w > 0, "cohort"].nunique(), "n_obs": int(DD[w > 0].sum())})
+    event = pd.DataFrame(out).astype({"rel": "Int64"})
+    return event, cells
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Sun & Abraham event study on the state x month panel")
+    ap.add_argument("--panel", default=PANEL)
+    ap.add_argument("--outcomes", nargs="+", default=OUTCOMES)
+    ap.add_argument("--window", nargs=2, type=int, default=list(WINDOW))
+    ap.add_argument("--trim", choices=["drop", "bin"], default="drop")
+    ap.add_argument("--no-controls", action="store_true")
+    ap.add_argument("-o", "--out", help="event-study CSV; cohort cells go to *_cells.csv")
+    args = ap.parse_args()
+
+    panel = pd.read_csv(args.panel)
+    controls = [] if args.no_controls else CONTROLS
+    events, cells = [], []
+    t0 = time.perf_counter()
+    for y in args.outcomes:
+        event, cell = sunab(panel, y, controls=controls, cluster=CLUSTER, window=tuple(args.window), trim=args.trim)
+        events.append(event.assign(outcome=y))
+        cells.append(cell.assign(outcome=y))
+        att = event[event["term"] == "ATT"].squeeze()
+        print(f"{y}: ATT = {att['estimate']:.4f} (SE {att['std_error']:.4f}, p = {att['p_value']:.3f}), "
+              f"{len(cell)} cohort x period cells")
+
+    if args.out:
+        stem, ext = os.path.splitext(args.out)
+        pd.concat(events, ignore_index=True).to_csv(args.out, index=False)
+        pd.concat(cells, ignore_index=True).to_csv(f"{stem}_cells{ext}", index=False)
+        print(f"\n✅ event study -> {args.out}, cells -> {stem}_cells{ext}")
+    print(f"⏱️ {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sun_abraham import sunab
+
+
+def _panel(cohorts, T=40, N=90, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame([(i, t) for i in range(N) for t in range(1, T + 1)], columns=["unit", "time_id"])
+    df["treat_time"] = np.asarray(cohorts)[df["unit"] % len(cohorts)]
+    treated = (df["treat_time"] > 0) & (df["time_id"] >= df["treat_time"])
+    df["y"] = 0.1 * df["unit"] + np.sin(df["time_id"]) + 2.0 * treated + rng.normal(size=len(df))
+    return df
+
+
+def test_cohort_without_reference_period_is_dropped():
+    # cohort 1 is treated in the first period, so it never has a rel = -1 observation
+    df = _panel([0, 1, 12, 20])
+    with pytest.warns(UserWarning, match="without a reference period"):
+        event, cells = sunab(df, "y", unit="unit", window=(-10, 10))
+    assert 1 not in set(cells["cohort"])
+    att = event.loc[event["term"] == "ATT"].iloc[0]
+    assert abs(att["estimate"] - 2.0) < 0.3
+    assert np.isfinite(event["std_error"]).all()
+    assert event["estimate"].abs().max() < 10
+
+
+def test_matches_panel_without_the_unidentified_cohort():
+    df = _panel([0, 1, 12, 20])
+    ev_all, _ = sunab(df, "y", unit="unit", window=(-10, 10))
+    ev_sub, _ = sunab(df[df["treat_time"] != 1], "y", unit="unit", window=(-10, 10))
+    np.testing.assert_allclose(ev_all["estimate"], ev_sub["estimate"], atol=1e-8)
@@ -1,152 +1,138 @@
-import os
-import pandas as pd
-import numpy as np
+"""
+Human-readable CSV summaries on top of the streaming profiler (csv_profiler.py).
+
+Files are profiled chunk by chunk, so very large files work too; statistics for
+numeric columns are exact except the median (t-digest), and unique counts are
+HyperLogLog estimates.
+
+Usage:
+    python analyze_csv_files.py ../raw_data
+    python analyze_csv_files.py ../raw_data --detailed --recursive
+"""
+
+import argparse
 from pathlib import Path
 
+from csv_profiler import WORKERS, find_files, profile_files
+
 
-def analyze_csv_files(folder_path):
+def _profile_folder(folder_path, recursive=False, workers=WORKERS):
     folder = Path(folder_path)
-    
     if not folder.exists():
         print(f"Error: Folder '{folder_path}' does not exist")
-        return
-    
-    csv_files = list(folder.glob('*.csv'))
-    
-    if not csv_files:
+        return None
+    files = find_files([str(folder)], recursive)
+    if not files:
         print(f"No CSV files found in '{folder_path}'")
+        return None
+    print(f"Found {len(files)} CSV files\n")
+    return profile_files(files, workers)
+
+
+def _fmt(v):
+    return "n/a" if v is None else f"{v:.4f}"
+
+
+def analyze_csv_files(folder_path, recursive=False, workers=WORKERS):
+    reports = _profile_folder(folder_path, recursive, workers)
+    if reports is None:
         return
-    
-    print(f"Found {len(csv_files)} CSV files\n")
     print("=" * 80)
-    
-    for csv_file in csv_files:
-        print(f"\nFile: {csv_file.name}")
+
+    for r in reports:
+        print(f"\nFile: {Path(r['file']).name}")
         print("-" * 80)
-        
-        try:
-            df = pd.read_csv(csv_file)
-            
-            print(f"Headers: {list(df.columns)}")
-            print(f"Rows: {len(df)}")
-            print(f"Columns: {len(df.columns)}")
-            print()
-            
-            print("Column Analysis:")
-            print(f"{'Column Name':<30} {'Data Type':<15} {'Mean/Info':<30}")
-            print("-" * 80)
-            
-            for column in df.columns:
-                col_type = str(df[column].dtype)
-                
-                if pd.api.types.is_numeric_dtype(df[column]):
-                    mean_value = df[column].mean()
-                    if pd.notna(mean_value):
-                        info = f"Mean: {mean_value:.4f}"
-                    else:
-                        info = "No valid data"
-                else:
-                    unique_count = df[column].nunique()
-                    info = f"Unique values: {unique_count}"
-                
-                print(f"{column:<30} {col_type:<15} {info:<30}")
-            
-            print("\n" + "=" * 80)
-            
-        except Exception as e:
-            print(f"Error reading file: {str(e)}")
+        if "error" in r:
+            print(f"Error reading file: {r['error']}")
             print("=" * 80)
+            continue
 
+        print(f"Headers: {[c['name'] for c in r['columns']]}")
+        print(f"Rows: {r['rows']}")
+        print(f"Columns: {len(r['columns'])}")
+        print()
 
-def analyze_csv_detailed(folder_path):
-    folder = Path(folder_path)
-    
-    if not folder.exists():
-        print(f"Error: Folder '{folder_path}' does not exist")
-        return
-    
-    csv_files = list(folder.glob('*.csv'))
-    
-    if not csv_files:
-        print(f"No CSV files found in '{folder_path}'")
+        print("Column Analysis:")
+        print(f"{'Column Name':<30} {'Data Type':<15} {'Mean/Info':<30}")
+        print("-" * 80)
+        for c in r["columns"]:
+            if c["type"] in ("integer", "float"):
+                info = f"Mean: {c['mean']:.4f}"
+            elif c["type"] == "empty":
+                info = "No valid data"
+            else:
+                info = f"Unique values: ~{c['distinct']}"
+            print(f"{c['name']:<30} {c['type']:<15} {info:<30}")
+
+        print("\n" + "=" * 80)
+
+
+def analyze_csv_detailed(folder_path, recursive=False, workers=WORKERS):
+    reports = _profile_folder(folder_path, recursive, workers)
+    if reports is None:
         return
-    
-    print(f"Found {len(csv_files)} CSV files\n")
-    
-    for csv_file in csv_files:
+
+    for r in reports:
         print(f"\n{'='*80}")
-        print(f"File: {csv_file.name}")
+        print(f"File: {Path(r['file']).name}")
         print(f"{'='*80}\n")
-        
-        try:
-            df = pd.read_csv(csv_file)
-            
-            print("Basic Information")
-            print(f"  Rows: {len(df)}")
-            print(f"  Columns: {len(df.columns)}")
-            print(f"  Headers: {list(df.columns)}")
-            print()
-            
-            print("Data Type Summary")
-            dtype_counts = df.dtypes.value_counts()
-            for dtype, count in dtype_counts.items():
-                print(f"  {dtype}: {count} columns")
-            print()
-            
-            numeric_columns = df.select_dtypes(include=[np.number]).columns
-            if len(numeric_columns) > 0:
-                print("Numeric Columns Statistics")
-                for col in numeric_columns:
-                    print(f"\n  Column: {col}")
-                    print(f"    Data type: {df[col].dtype}")
-                    print(f"    Mean: {df[col].mean():.4f}")
-                    print(f"    Median: {df[col].median():.4f}")
-                    print(f"    Std dev: {df[col].std():.4f}")
-                    print(f"    Min: {df[col].min():.4f}")
-                    print(f"    Max: {df[col].max():.4f}")
-                    print(f"    Missing: {df[col].isna().sum()}")
-            
-            non_numeric_columns = df.select_dtypes(exclude=[np.number]).columns
-            if len(non_numeric_columns) > 0:
-                print("\nNon-Numeric Columns Statistics")
-                for col in non_numeric_columns:
-                    print(f"\n  Column: {col}")
-                    print(f"    Data type: {df[col].dtype}")
-                    print(f"    Unique values: {df[col].nunique()}")
-                    print(f"    Missing: {df[col].isna().sum()}")
-                    top_values = df[col].value_counts().head(5)
-                    if len(top_values) > 0:
-                        print(f"    Top values:")
-                        for val, count in top_values.items():
-                            print(f"      '{val}': {count}")
-            
-            print("\n")
-            
-        except Exception as e:
-            print(f"Error reading file: {str(e)}\n")
+        if "error" in r:
+            print(f"Error reading file: {r['error']}\n")
+            continue
+
+        cols = r["columns"]
+        print("Basic Information")
+        print(f"  Rows: {r['rows']}")
+        print(f"  Columns: {len(cols)}")
+        print(f"  Headers: {[c['name'] for c in cols]}")
+        print()
+
+        print("Data Type Summary")
+        for kind in ("integer", "float", "mixed", "string", "empty"):
+            n = sum(c["type"] == kind for c in cols)
+            if n:
+                print(f"  {kind}: {n} columns")
+        print()
+
+        numeric = [c for c in cols if c["type"] in ("integer", "float")]
+        if numeric:
+            print("Numeric Columns Statistics")
+            for c in numeric:
+                print(f"\n  Column: {c['name']}")
+                print(f"    Data type: {c['type']}")
+                print(f"    Mean: {_fmt(c['mean'])}")
+                print(f"    Median: {_fmt(c['quantiles']['p50'])}")
+                print(f"    Std dev: {_fmt(c['std'])}")
+                print(f"    Min: {_fmt(c['min'])}")
+                print(f"    Max: {_fmt(c['max'])}")
+                print(f"    Missing: {c['nulls']}")
+
+        other = [c for c in cols if c["type"] not in ("integer", "float")]
+        if other:
+            print("\nNon-Numeric Columns Statistics")
+            for c in other:
+                print(f"\n  Column: {c['name']}")
+                print(f"    Data type: {c['type']}")
+                print(f"    Unique values: ~{c['distinct']}")
+                print(f"    Missing: {c['nulls']}")
+                if c["top"]:
+                    print(f"    Top values:")
+                    for val, count in c["top"][:5]:
+                        print(f"      '{val}': {count}")
+
+        print("\n")
 
 
 if __name__ == "__main__":
-    print("CSV File Analysis Tool")
-    print("=" * 80)
-    
-    print("\nEnter the folder path containing CSV files:")
-    print("(e.g., /home/user/data or ./data)")
-    folder_path = input("Path: ").strip()
-    
-    if not folder_path:
-        folder_path = "."
-    
-    print("\nSelect analysis mode:")
-    print("1. Simple mode - headers, data types, and means")
-    print("2. Detailed mode - complete statistical information")
-    mode = input("Choose (1 or 2, default 1): ").strip()
-    
-    print("\nStarting analysis...\n")
-    
-    if mode == "2":
-        analyze_csv_detailed(folder_path)
+    ap = argparse.ArgumentParser(description="CSV File Analysis Tool")
+    ap.add_argument("folder", nargs="?", default=".")
+    ap.add_argument("--detailed", action="store_true", help="complete statistical information")
+    ap.add_argument("-r", "--recursive", action="store_true")
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    args = ap.parse_args()
+
+    if args.detailed:
+        analyze_csv_detailed(args.folder, args.recursive, args.workers)
     else:
-        analyze_csv_files(folder_path)
-    
-    print("\nAnalysis complete!")
\ No newline at end of file
+        analyze_csv_files(args.folder, args.recursive, args.workers)
+    print("\nAnalysis complete!")
@@ -0,0 +1,342 @@
+"""
+Streaming CSV profiler: one pass, bounded memory, many files in parallel.
+
+Files are read in chunks of CHUNK_ROWS rows as text, so a multi-GB CDC / COVID /
+NHGIS extract never has to fit in memory. Every column keeps mergeable one-pass
+summaries, updated with whole-chunk numpy operations:
+
+    Moments       count, mean, variance, min, max (Welford / Chan et al. merge)
+    TDigest       quantiles (merging t-digest, arcsine scale, COMPRESSION centroids)
+    HyperLogLog   distinct count (2^HLL_P registers, ~0.8% relative error)
+    MisraGries    heavy hitters (TOPK_COUNTERS counters, count error <= n / counters)
+
+A column is numeric when every non-empty cell parses as a number; the numeric
+summaries cover the cells that parse either way. Files are profiled in a process
+pool. The report is JSON (one entry per file, one per column); --csv adds a flat
+table with one row per (file, column).
+
+Usage:
+    python csv_profiler.py ../raw_data/*.csv -o profile.json
+    python csv_profiler.py ../raw_data --recursive --workers 8 -o profile.json --csv profile.csv
+
+    from csv_profiler import profile_file
+    report = profile_file("big.csv")
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from glob import glob
+
+import numpy as np
+import pandas as pd
+
+# ========= Config =========
+CHUNK_ROWS = 200_000
+WORKERS = os.cpu_count() or 1
+COMPRESSION = 200        # t-digest size parameter (≈ number of centroids kept)
+HLL_P = 14               # 16,384 registers
+TOPK_COUNTERS = 64       # Misra-Gries counters per column
+TOPK_REPORT = 10
+QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+NA_VALUES = ["", "NA", "N/A", "NaN", "nan", "null", "NULL", "None", "."]
+# =========================
+
+
+class Moments:
+    """Count, mean, M2, min, max; chunks are folded in with Chan's pairwise update."""
+
+    def __init__(self):
+        self.n, self.mean, self.m2 = 0, 0.0, 0.0
+        self.min, self.max = np.inf, -np.inf
+
+    def update(self, x):
+        if len(x):
+            self.merge_stats(len(x), float(x.mean()), float(((x - x.mean()) ** 2).sum()),
+                             float(x.min()), float(x.max()))
+
+    def merge_stats(self, n, mean, m2, lo, hi):
+        if n == 0:
+            return
+        tot = self.n + n
+        d = mean - self.mean
+        self.mean += d * n / tot
+        self.m2 += m2 + d * d * self.n * n / tot
+        self.n = tot
+        self.min, self.max = min(self.min, lo), max(self.max, hi)
+
+    def merge(self, other):
+        self.merge_stats(other.n, other.mean, other.m2, other.min, other.max)
+
+    def result(self):
+        if not self.n:
+            return {"mean": None, "std": None, "min": None, "max": None}
+        return {"mean": self.mean, "std": (self.m2 / (self.n - 1)) ** 0.5 if self.n > 1 else 0.0,
+                "min": self.min, "max": self.max}
+
+
+class TDigest:
+    """Merging t-digest: each chunk is sorted together with the centroids and re-clustered at once."""
+
+    def __init__(self, compression=COMPRESSION):
+        self.delta = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min, self.max = np.inf, -np.inf
+
+    def _k(self, q):
+        return self.delta / (2 * np.pi) * np.arcsin(2 * np.clip(q, 0, 1) - 1)
+
+    def _compress(self, means, weights):
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        cum = np.cumsum(weights)
+        # cluster = integer bin of the scale function at the item's centre; bins have k-size 1
+        cid = np.floor(self._k((cum - weights / 2) / total)).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, cid[1:] != cid[:-1]])
+        w = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / w
+        self.weights = w
+
+    def update(self, x):
+        if len(x):
+            self.min, self.max = min(self.min, float(x.min())), max(self.max, float(x.max()))
+            self._compress(np.r_[self.means, x], np.r_[self.weights, np.ones(len(x))])
+
+    def merge(self, other):
+        if len(other.weights):
+            self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+            self._compress(np.r_[self.means, other.means], np.r_[self.weights, other.weights])
+
+    def quantile(self, qs):
+        if not len(self.weights):
+            return [None] * len(qs)
+        total = self.weights.sum()
+        mid = (np.cumsum(self.weights) - self.weights / 2) / total
+        xs = np.r_[self.min, self.means, self.max]
+        ps = np.r_[0.0, mid, 1.0]
+        return [float(v) for v in np.interp(qs, ps, xs)]
+
+
+class HyperLogLog:
+    """Distinct count from 64-bit hashes of the cell text; merge = register-wise max."""
+
+    def __init__(self, p=HLL_P):
+        self.p = p
+        self.reg = np.zeros(1 << p, dtype=np.uint8)
+
+    def update(self, values):
+        if not len(values):
+            return
+        h = pd.util.hash_array(np.asarray(values, dtype=object), categorize=True).astype(np.uint64)
+        idx = (h >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = h & np.uint64((1 << (64 - self.p)) - 1)
+        # position of the first 1-bit in the remaining 64 - p bits (exact: rest < 2^53)
+        bitlen = np.frexp(rest.astype(np.float64))[1]
+        rho = (64 - self.p - bitlen + 1).astype(np.uint8)
+        np.maximum.at(self.reg, idx, rho)
+
+    def merge(self, other):
+        np.maximum(self.reg, other.reg, out=self.reg)
+
+    def count(self):
+        m = len(self.reg)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        est = alpha * m * m / np.sum(np.ldexp(1.0, -self.reg.astype(np.int64)))
+        zeros = int((self.reg == 0).sum())
+        if est <= 2.5 * m and zeros:
+            est = m * np.log(m / zeros)      # linear counting for small cardinalities
+        return int(round(est))
+
+
+class MisraGries:
+    """Mergeable heavy-hitter summary: counts are lower bounds, off by at most `error`."""
+
+    def __init__(self, k=TOPK_COUNTERS):
+        self.k = k
+        self.counts = pd.Series(dtype="int64")
+        self.error = 0
+
+    def _shrink(self, counts):
+        if len(counts) > self.k:
+            cut = int(counts.nlargest(self.k + 1).iloc[-1])
+            counts = counts - cut
+            counts = counts[counts > 0]
+            self.error += cut
+        self.counts = counts
+
+    def update(self, values):
+        if len(values):
+            chunk = pd.Series(values).value_counts(sort=False)
+            self._shrink(self.counts.add(chunk, fill_value=0).astype("int64"))
+
+    def merge(self, other):
+        self.error += other.error
+        self._shrink(self.counts.add(other.counts, fill_value=0).astype("int64"))
+
+    def top(self, n=TOPK_REPORT):
+        return [[str(v), int(c)] for v, c in self.counts.nlargest(n).items()]
+
+
+class ColumnProfile:
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.nulls = 0
+        self.numeric = 0
+        self.integer = 0
+        self.len_min, self.len_max = np.inf, 0
+        self.moments = Moments()
+        self.digest = TDigest()
+        self.hll = HyperLogLog()
+        self.top = MisraGries()
+
+    def update(self, col):
+        self.rows += len(col)
+        s = col.dropna()
+        self.nulls += len(col) - len(s)
+        if not len(s):
+            return
+        text = s.to_numpy(dtype=object)
+        lens = s.str.len()
+        self.len_min, self.len_max = min(self.len_min, int(lens.min())), max(self.len_max, int(lens.max()))
+        self.hll.update(text)
+        self.top.update(text)
+
+        x = pd.to_numeric(s, errors="coerce").to_numpy(dtype="float64")
+        x = x[np.isfinite(x)]
+        self.numeric += len(x)
+        self.integer += int((x == np.floor(x)).sum())
+        self.moments.update(x)
+        self.digest.update(x)
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.nulls += other.nulls
+        self.numeric += other.numeric
+        self.integer += other.integer
+        self.len_min, self.len_max = min(self.len_min, other.len_min), max(self.len_max, other.len_max)
+        for part in ("moments", "digest", "hll", "top"):
+            getattr(self, part).merge(getattr(other, part))
+
+    def kind(self):
+        filled = self.rows - self.nulls
+        if not filled:
+            return "empty"
+        if self.numeric == filled:
+            return "integer" if self.integer == filled else "float"
+        return "mixed" if self.numeric else "string"
+
+    def result(self):
+        out = {"name": self.name, "type": self.kind(), "rows": self.rows, "nulls": self.nulls,
+               "distinct": self.hll.count() if self.rows > self.nulls else 0,
+               "numeric": self.numeric,
+               "len_min": None if self.len_min == np.inf else int(self.len_min),
+               "len_max": int(self.len_max)}
+        out.update(self.moments.result())
+        out["quantiles"] = dict(zip([f"p{int(q * 100):02d}" for q in QUANTILES], self.digest.quantile(QUANTILES)))
+        out["top"] = self.top.top()
+        out["top_error"] = self.top.error
+        return out
+
+
+def profile_file(path, chunk_rows=CHUNK_ROWS, sep=None):
+    """One CSV (plain or compressed) -> report dict; memory is bounded by chunk_rows."""
+    t0 = time.perf_counter()
+    sep = sep or ("\t" if path.endswith((".tsv", ".tsv.gz", ".txt")) else ",")
+    cols, rows = None, 0
+    reader = pd.read_csv(path, sep=sep, dtype=str, chunksize=chunk_rows, na_values=NA_VALUES,
+                         keep_default_na=False, encoding_errors="replace", low_memory=True)
+    for chunk in reader:
+        if cols is None:
+            cols = [ColumnProfile(str(c)) for c in chunk.columns]
+        rows += len(chunk)
+        for prof, c in zip(cols, chunk.columns):
+            prof.update(chunk[c])
+    return {"file": os.path.abspath(path), "bytes": os.path.getsize(path), "rows": rows,
+            "columns": [c.result() for c in cols or []],
+            "seconds": round(time.perf_counter() - t0, 3)}
+
+
+def _safe_profile(job):
+    path, chunk_rows = job
+    try:
+        return profile_file(path, chunk_rows)
+    except Exception as e:   # one bad file must not sink the whole run
+        return {"file": os.path.abspath(path), "error": f"{type(e).__name__}: {e}"}
+
+
+def find_files(paths, recursive=False):
+    exts = (".csv", ".csv.gz", ".csv.zip", ".tsv", ".tsv.gz")
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            pattern = os.path.join(p, "**", "*") if recursive else os.path.join(p, "*")
+            files += [f for f in sorted(glob(pattern, recursive=recursive)) if f.lower().endswith(exts)]
+        else:
+            files += sorted(glob(p, recursive=recursive)) or [p]
+    return list(dict.fromkeys(f for f in files if os.path.isfile(f)))
+
+
+def profile_files(files, workers=WORKERS, chunk_rows=CHUNK_ROWS):
+    """Profile files in a process pool, largest first so the long ones start early."""
+    files = sorted(files, key=lambda f: -os.path.getsize(f))
+    if workers <= 1 or len(files) <= 1:
+        return [_safe_profile((f, chunk_rows)) for f in files]
+    out = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(files))) as pool:
+        futs = [pool.submit(_safe_profile, (f, chunk_rows)) for f in files]
+        for fut in as_completed(futs):
+            out.append(fut.result())
+    return sorted(out, key=lambda r: r["file"])
+
+
+def flatten(reports):
+    """Report list -> one row per (file, column)."""
+    rows = []
+    for r in reports:
+        for c in r.get("columns", []):
+            row = {"file": r["file"], "file_rows": r["rows"], **{k: v for k, v in c.items()
+                                                                  if k not in ("quantiles", "top")}}
+            row.update(c["quantiles"])
+            row["top"] = "; ".join(f"{v} ({n})" for v, n in c["top"][:5])
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Streaming one-pass CSV profiler")
+    ap.add_argument("paths", nargs="+", help="files, globs or folders")
+    ap.add_argument("-r", "--recursive", action="store_true", help="descend into sub-folders")
+    ap.add_argument("-o", "--out", default="csv_profile.json", help="JSON report")
+    ap.add_argument("--csv", help="also write a flat per-column table")
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    ap.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = ap.parse_args()
+
+    files = find_files(args.paths, args.recursive)
+    if not files:
+        sys.exit(f"❌ no CSV files under {args.paths}")
+    t0 = time.perf_counter()
+    reports = profile_files(files, args.workers, args.chunk_rows)
+    with open(args.out, "w") as f:
+        json.dump({"generated": time.strftime("%Y-%m-%dT%H:%M:%S"), "files": reports}, f, indent=1)
+    if args.csv:
+        flatten(reports).to_csv(args.csv, index=False)
+
+    for r in reports:
+        if "error" in r:
+            print(f"❌ {os.path.basename(r['file'])}: {r['error']}")
+        else:
+            print(f"📄 {os.path.basename(r['file'])}: {r['rows']:,} rows x {len(r['columns'])} cols "
+                  f"({r['bytes'] / 1e6:,.1f} MB, {r['seconds']:.1f}s)")
+    print(f"✅ {len(reports)} files -> {args.out}" + (f", {args.csv}" if args.csv else "")
+          + f" ({time.perf_counter() - t0:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
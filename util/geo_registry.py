@@ -0,0 +1,224 @@
+"""
+Canonical geography registry: states, counties, DMAs and Google Trends geo codes.
+
+Every script used to carry its own `state_fips` dict (name -> "06", name -> (abbr, 6),
+abbr -> 6, ...) and joined on zero-padded strings. Here a geography is a compact
+integer code and every lookup is an array operation:
+
+- state:  FIPS 1..56, territories 60..78      ("06", 6, "CA", "California", "US-CA" -> 6)
+- county: state * 1000 + county (FIPS 5)      ("06037", 6037, (6, 37) -> 6037)
+- DMA:    Nielsen code 500..881               ("US-CA-807" -> state 6, dma 807)
+
+    import sys, os
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+    from geo_registry import state_code, as_state, abbr_of, fips_str
+
+    df["fips"] = as_state(df["state"])      # categorical over the 51 integer codes
+    df["abbr"] = abbr_of(df["fips"])
+
+STATES / STATE_CODES are the 50 states + DC; territories resolve only with
+territories=True. Frames that carry `as_state()` columns share one categorical dtype (STATE_DTYPE),
+so merges between sources compare integer codes, not strings. fips_str() pads
+codes back to "06" / "06037" only when writing text outputs.
+
+DMA names are not bundled; load_dmas() reads data_reference/dma.csv
+(columns: dma, name, state) when it exists.
+"""
+
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# ========= Config =========
+DMA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data_reference", "dma.csv")
+
+# (fips, abbr, name): 50 states + DC
+_STATES = [
+    (1, "AL", "Alabama"), (2, "AK", "Alaska"), (4, "AZ", "Arizona"), (5, "AR", "Arkansas"),
+    (6, "CA", "California"), (8, "CO", "Colorado"), (9, "CT", "Connecticut"), (10, "DE", "Delaware"),
+    (11, "DC", "District of Columbia"), (12, "FL", "Florida"), (13, "GA", "Georgia"), (15, "HI", "Hawaii"),
+    (16, "ID", "Idaho"), (17, "IL", "Illinois"), (18, "IN", "Indiana"), (19, "IA", "Iowa"),
+    (20, "KS", "Kansas"), (21, "KY", "Kentucky"), (22, "LA", "Louisiana"), (23, "ME", "Maine"),
+    (24, "MD", "Maryland"), (25, "MA", "Massachusetts"), (26, "MI", "Michigan"), (27, "MN", "Minnesota"),
+    (28, "MS", "Mississippi"), (29, "MO", "Missouri"), (30, "MT", "Montana"), (31, "NE", "Nebraska"),
+    (32, "NV", "Nevada"), (33, "NH", "New Hampshire"), (34, "NJ", "New Jersey"), (35, "NM", "New Mexico"),
+    (36, "NY", "New York"), (37, "NC", "North Carolina"), (38, "ND", "North Dakota"), (39, "OH", "Ohio"),
+    (40, "OK", "Oklahoma"), (41, "OR", "Oregon"), (42, "PA", "Pennsylvania"), (44, "RI", "Rhode Island"),
+    (45, "SC", "South Carolina"), (46, "SD", "South Dakota"), (47, "TN", "Tennessee"), (48, "TX", "Texas"),
+    (49, "UT", "Utah"), (50, "VT", "Vermont"), (51, "VA", "Virginia"), (53, "WA", "Washington"),
+    (54, "WV", "West Virginia"), (55, "WI", "Wisconsin"), (56, "WY", "Wyoming"),
+]
+# only resolved with territories=True (Census `for=state:*` returns 72)
+_TERRITORIES = [
+    (60, "AS", "American Samoa"), (66, "GU", "Guam"), (69, "MP", "Northern Mariana Islands"),
+    (72, "PR", "Puerto Rico"), (78, "VI", "U.S. Virgin Islands"),
+]
+# =========================
+
+_GEOS = pd.DataFrame(_STATES + _TERRITORIES, columns=["fips", "abbr", "name"])
+_GEOS["fips"] = _GEOS["fips"].astype("int16")
+_GEOS["gt"] = "US-" + _GEOS["abbr"]
+_TERRITORY = np.arange(len(_GEOS)) >= len(_STATES)
+
+STATES = _GEOS[~_TERRITORY].reset_index(drop=True)
+STATE_CODES = STATES["fips"].to_numpy()
+STATE_DTYPE = pd.CategoricalDtype(_GEOS["fips"].to_numpy(), ordered=True)
+
+# code -> row position, for O(1) array lookups by FIPS
+_POS = np.full(100, -1, dtype=np.int16)
+_POS[_GEOS["fips"].to_numpy()] = np.arange(len(_GEOS))
+
+# every spelling -> row position (upper-cased keys)
+_KEYS = {}
+for i, r in _GEOS.iterrows():
+    for k in (r["abbr"], r["name"], r["gt"], str(r["fips"]), f"{r['fips']:02d}"):
+        _KEYS[k.upper()] = i
+_KEYS["WASHINGTON DC"] = _KEYS["WASHINGTON, DC"] = _KEYS["DISTRICT OF COLUMBIA"]
+_KEY_INDEX = pd.Index(list(_KEYS))
+_KEY_POS = np.array(list(_KEYS.values()), dtype=np.int16)
+
+
+def _as_series(values):
+    return values if isinstance(values, pd.Series) else pd.Series(values)
+
+
+def _positions(values, territories=False):
+    """Row positions for any spelling (-1 when unknown)."""
+    pos = _lookup(_as_series(values))
+    if not territories:
+        pos = np.where(_TERRITORY[pos] & (pos >= 0), -1, pos).astype(np.int16)
+    return pos
+
+
+def _lookup(s):
+    if pd.api.types.is_numeric_dtype(s.dtype) and not pd.api.types.is_bool_dtype(s.dtype):
+        codes = s.to_numpy(dtype="float64", na_value=np.nan)
+        ok = np.isfinite(codes) & (codes >= 0) & (codes < 100)
+        pos = np.full(len(codes), -1, dtype=np.int16)
+        pos[ok] = _POS[codes[ok].astype(np.int64)]
+        return pos
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        cats = _lookup(pd.Series(s.cat.categories))
+        pos = np.where(s.cat.codes.to_numpy() >= 0, cats[s.cat.codes.to_numpy()], -1)
+        return pos.astype(np.int16)
+    # normalise each distinct spelling once, then broadcast back
+    codes, uniq = pd.factorize(s, use_na_sentinel=True)
+    keys = pd.Series(uniq, dtype="string").str.strip().str.upper().str.replace(r"\.0$", "", regex=True)
+    hit = _KEY_INDEX.get_indexer(keys.fillna(""))
+    upos = np.append(np.where(hit >= 0, _KEY_POS[hit], -1), -1).astype(np.int16)
+    return upos[codes]
+
+
+def _take(col, pos, index=None, dtype=None):
+    arr = _GEOS[col].to_numpy()
+    out = pd.Series(arr[np.maximum(pos, 0)], index=index, dtype=dtype or _GEOS[col].dtype)
+    if (pos < 0).any():
+        out = out.astype("Int16" if col == "fips" else "string").mask(pos < 0)
+    return out
+
+
+def _index(values):
+    return values.index if isinstance(values, pd.Series) else None
+
+
+# ---------- states ----------
+
+def state_code(values, strict=False, territories=False):
+    """
+    Any state spelling (FIPS int/str, abbr, name, GT geo) -> integer FIPS (Int16, NA if unknown).
+    Territories (PR, GU, ...) count as unknown unless territories=True.
+    """
+    pos = _positions(values, territories)
+    if strict and (pos < 0).any():
+        bad = _as_series(values)[pos < 0].unique()[:5]
+        raise KeyError(f"unknown state(s): {list(bad)}")
+    return _take("fips", pos, _index(values)).astype("Int16")
+
+
+def as_state(values, strict=False, territories=False):
+    """Categorical state column with the shared STATE_DTYPE (integer codes underneath)."""
+    return state_code(values, strict=strict, territories=territories).astype(STATE_DTYPE)
+
+
+def abbr_of(values, territories=False):
+    return _take("abbr", _positions(values, territories), _index(values))
+
+
+def name_of(values, territories=False):
+    return _take("name", _positions(values, territories), _index(values))
+
+
+def gt_geo_of(values, territories=False):
+    """State -> Google Trends geo code ("US-CA")."""
+    return _take("gt", _positions(values, territories), _index(values))
+
+
+def fips_str(codes, width=2):
+    """Integer codes -> zero-padded text ("06", "06037") for CSV outputs; NA stays NA."""
+    s = _as_series(codes)
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        s = s.astype("Int64")
+    return s.astype("Int64").astype("string").str.zfill(width)
+
+
+# ---------- counties ----------
+
+def county_code(state, county=None):
+    """
+    County FIPS as integers (Int32 Series): county_code(["06037"]) / county_code([6037]) /
+    county_code(states, counties) with any state spelling.
+    """
+    if county is not None:
+        return pd.Series(state_code(state).to_numpy(dtype="float64", na_value=np.nan) * 1000
+                         + pd.to_numeric(_as_series(county), errors="coerce").to_numpy(dtype="float64"),
+                         index=_index(state)).astype("Int32")
+    s = _as_series(state)
+    if not pd.api.types.is_numeric_dtype(s.dtype):
+        s = pd.to_numeric(s.astype("string").str.replace(r"\D", "", regex=True), errors="coerce")
+    return s.astype("Int32")
+
+
+def county_state(codes):
+    """County code -> state code."""
+    return (_as_series(codes).astype("Int32") // 1000).astype("Int16")
+
+
+_COUNTY_NAME = re.compile(r"^(.*?),\s*([A-Za-z .]+)$")
+
+
+def split_county_name(values):
+    """'Autauga County, AL' / 'Autauga County, Alabama' -> frame(county_name, state)."""
+    parts = _as_series(values).astype("string").str.strip().str.extract(_COUNTY_NAME)
+    return pd.DataFrame({"county_name": parts[0], "state": state_code(parts[1]).array},
+                        index=_index(values))
+
+
+# ---------- Google Trends geo codes / DMAs ----------
+
+_GT = re.compile(r"^US(?:-([A-Z]{2}))?(?:-(\d{3}))?$")
+
+
+def parse_gt_geo(values):
+    """'US' / 'US-CA' / 'US-CA-807' -> frame(state, dma) of integer codes (NA where absent)."""
+    parts = _as_series(values).astype("string").str.strip().str.upper().str.extract(_GT)
+    return pd.DataFrame({"state": state_code(parts[0]).array,
+                         "dma": pd.to_numeric(parts[1]).astype("Int16").array},
+                        index=_index(values))
+
+
+def gt_dma_geo(state, dma):
+    """(state, DMA code) -> 'US-CA-807'."""
+    return gt_geo_of(state) + "-" + _as_series(dma).astype("Int16").astype("string").to_numpy()
+
+
+def load_dmas(path=DMA_FILE):
+    """DMA reference table (dma, name, state) with integer codes, or None if the file is absent."""
+    if not os.path.exists(path):
+        return None
+    d = pd.read_csv(path, dtype={"name": "string"})
+    d["dma"] = d["dma"].astype("int16")
+    if "state" in d:
+        d["state"] = state_code(d["state"])
+    return d
@@ -0,0 +1,524 @@
+"""
+Local stand-in for the external data APIs (Census, BLS, BEA, FBI CDE, Google Trends),
+so the fetch paths can be run, benchmarked and regression-tested without network.
+
+The upstream host is the first path segment:
+
+    https://api.census.gov/data/timeseries/poverty/saipe?get=...
+ -> http://127.0.0.1:8765/api.census.gov/data/timeseries/poverty/saipe?get=...
+
+Builders go through it by setting API_BASE_OVERRIDE (api_client.route(), and the
+pytrends URLs in google_trend/discard_GTScaper.py):
+
+    python util/replay_server.py --latency 80 --jitter 40 --error-rate 0.05 --rate-429 0.02
+    API_BASE_OVERRIDE=http://127.0.0.1:8765 API_CACHE=0 python data_process_script/build_saipe_state_poverty_rate.py
+
+Responses come from, in order:
+1. recorded fixtures: fixtures/<host>/<key>.json, key = method + path + sorted query
+   + canonical JSON body, with API keys stripped (so fixtures are safe to commit)
+2. synthetic responders that reproduce each API's payload format (row layout,
+   sentinels, status envelopes, XSSI prefixes) with deterministic values;
+   --strict turns a fixture miss into a 404 instead
+
+--record proxies fixture misses to the real API and saves the 200s as fixtures.
+
+Fault injection is seeded per (request, attempt number), so a given retry sequence
+plays out the same way on every run regardless of thread scheduling:
+--latency/--jitter (ms), --error-rate (500/502/503), --rate-429 (with Retry-After),
+--quota N per --quota-window seconds per host (api.data.gov style hard limit).
+
+GET /__stats returns request / fault counters as JSON, GET /__reset clears them.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.parse import parse_qsl
+from urllib.request import Request, urlopen
+
+from geo_registry import STATES as _REGISTRY
+
+# ========= Config =========
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SECRET_PARAMS = {"key", "api_key", "userid", "registrationkey"}
+LATEST_YEAR = 2024          # synthetic data ends here unless a request asks for later
+# =========================
+
+# "06" -> ("CA", "California"): 50 states + DC, from the shared registry
+STATES = {f"{f:02d}": (a, n) for f, a, n in _REGISTRY[["fips", "abbr", "name"]].itertuples(index=False)}
+
+
+def _u(*parts):
+    """Deterministic uniform [0, 1) from any labels."""
+    h = hashlib.blake2b(repr(parts).encode(), digest_size=8).digest()
+    return int.from_bytes(h, "big") / 2 ** 64
+
+
+def _strip_secrets(d):
+    if not isinstance(d, dict):
+        return d
+    return {k: v for k, v in d.items() if str(k).lower() not in SECRET_PARAMS}
+
+
+def request_key(method, host, path, query, body):
+    """Fixture key; API keys never take part in it (or in the saved fixture)."""
+    q = sorted((k, v) for k, v in query if k.lower() not in SECRET_PARAMS)
+    try:
+        b = _strip_secrets(json.loads(body)) if body else None
+    except ValueError:
+        b = body.decode("utf-8", "replace")
+    raw = json.dumps([method.upper(), host, path.rstrip("/"), q, b], sort_keys=True,
+                     separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()[:24], q, b
+
+
+# ---------- synthetic responders ----------
+
+def _json(obj, prefix=""):
+    return 200, "application/json; charset=utf-8", (prefix + json.dumps(obj)).encode(), {}
+
+
+def _not_found(msg):
+    return 404, "text/plain; charset=utf-8", msg.encode(), {}
+
+
+def _census_years(spec):
+    """'from 2010 to 2023' / 'from 2018' / '2018' -> list of years."""
+    spec = spec.strip()
+    m = re.fullmatch(r"from\s+(\d{4})(?:\s+to\s+(\d{4}))?", spec)
+    if m:
+        return list(range(int(m.group(1)), int(m.group(2) or LATEST_YEAR) + 1))
+    return [int(y) for y in re.findall(r"\d{4}", spec)]
+
+
+def _counties(st):
+    # ~3,100 counties overall, a stable count per state
+    n = 1 if st == "11" else 3 + int(_u("ncounty", st) * 115)
+    return [f"{2 * i + 1:03d}" for i in range(n)]
+
+
+def _geo_codes(spec, parent=None):
+    kind, _, codes = spec.partition(":")
+    pick = None if codes in ("", "*") else set(codes.split(","))
+    if kind == "us":
+        return "us", [("1",)]
+    if kind == "state":
+        return "state", [(s,) for s in STATES if pick is None or s in pick]
+    if kind == "county":
+        states = [s for s in STATES if parent is None or s in parent]
+        return "county", [(s, c) for s in states for c in _counties(s)
+                          if pick is None or c in pick]
+    return None, []
+
+
+def _census_value(var, year, geo):
+    u = _u(var, year, geo)
+    if _u("na", var, year, geo) < 0.002:
+        return "-666666666"  # annotation sentinel, exercises the decoders
+    v = var.upper()
+    if "MHI" in v:
+        return str(int(35000 + 60000 * u))
+    if v.endswith("_MOE"):
+        return f"{0.2 + 4 * u:.1f}"
+    if v.endswith("POVALL_PT") or (v.endswith("E") and not v.endswith("PE")):
+        return str(int(1000 + 2_000_000 * u ** 3))
+    return f"{100 * u:.1f}"
+
+
+def census(method, path, query, body):
+    q = dict(query)
+    if "get" not in q or "for" not in q:
+        return 400, "text/plain; charset=utf-8", b"error: missing 'get' or 'for' clause", {}
+    get = [v for v in q["get"].split(",") if v]
+    # predicate variables come back as extra columns after the `get` list (duplicates included)
+    preds = [k for k, _ in query if k not in ("get", "for", "in") and k.lower() not in SECRET_PARAMS]
+    m = re.search(r"/data/(\d{4})/", path)
+    spec = q.get("time") or q.get("YEAR")
+    years = _census_years(spec) if spec else [int(m.group(1)) if m else LATEST_YEAR]
+
+    parent = None
+    if "in" in q:
+        _, _, codes = q["in"].partition(":")
+        parent = None if codes in ("", "*") else set(codes.split(","))
+    kind, geos = _geo_codes(q["for"], parent)
+    if kind is None:
+        return 400, "text/plain; charset=utf-8", b"error: unknown/unsupported geography hierarchy", {}
+    geo_cols = ["state", "county"] if kind == "county" else [kind]
+
+    header = get + preds + geo_cols
+    rows = [json.dumps(header, separators=(",", ":"))]
+    for y in years:
+        for g in geos:
+            st = g[0] if kind != "us" else None
+            row = []
+            for c in get + preds:
+                cu = c.upper()
+                if cu == "NAME":
+                    name = "United States" if st is None else STATES[st][1]
+                    row.append(f"County {g[1]}, {name}" if kind == "county" else name)
+                elif cu in ("TIME", "YEAR"):
+                    row.append(str(y))
+                elif cu == "STATE":
+                    row.append(st or "00")
+                elif cu == "COUNTY":
+                    row.append(g[1] if kind == "county" else "000")
+                elif c in q and c in preds:
+                    row.append(q[c])
+                else:
+                    row.append(_census_value(c, y, g))
+            row += list(g)
+            rows.append(json.dumps(row, separators=(",", ":")))
+    # the API's own layout: one row per line, "],\n[" between rows
+    return 200, "application/json;charset=utf-8", ("[" + ",\n".join(rows) + "]").encode(), {}
+
+
+_MONTHS = ["January", "February", "March", "April", "May", "June", "July",
+           "August", "September", "October", "November", "December"]
+
+
+def bls(method, path, query, body):
+    try:
+        req = json.loads(body or b"{}")
+    except ValueError:
+        req = {}
+    series = req.get("seriesid", [])
+    if len(series) > 50:
+        return _json({"status": "REQUEST_NOT_PROCESSED", "responseTime": 1,
+                      "message": ["Maximum of 50 series allowed per request."], "Results": {}})
+    y0 = int(req.get("startyear", LATEST_YEAR - 2))
+    y1 = int(req.get("endyear", LATEST_YEAR))
+    today = date.today()
+    out = []
+    for sid in series:
+        data = []
+        for y in range(y1, y0 - 1, -1):
+            for m in range(12, 0, -1):
+                if (y, m) >= (today.year, today.month):
+                    continue
+                v = 2.5 + 6 * _u(sid, y) + 0.6 * _u(sid, y, m)
+                data.append({"year": str(y), "period": f"M{m:02d}", "periodName": _MONTHS[m - 1],
+                             "value": f"{v:.1f}", "footnotes": [{}]})
+        if data:
+            data[0]["latest"] = "true"
+        out.append({"seriesID": sid, "data": data})
+    return _json({"status": "REQUEST_SUCCEEDED", "responseTime": 12, "message": [],
+                  "Results": {"series": out}})
+
+
+def bea(method, path, query, body):
+    q = {k.lower(): v for k, v in query}
+    if q.get("method", "").lower() != "getdata":
+        return _json({"BEAAPI": {"Results": {"Error": {"APIErrorCode": "3",
+                                                        "APIErrorDescription": "Unknown method"}}}})
+    years = [int(y) for y in re.findall(r"\d{4}", q.get("year", str(LATEST_YEAR)))]
+    freq = q.get("frequency", "A").upper()
+    periods = [f"{y}Q{k}" for y in years for k in range(1, 5)] if freq == "Q" else [str(y) for y in years]
+    today = date.today()
+    periods = [p for p in periods if int(p[:4]) < today.year
+               or (len(p) > 4 and int(p[-1]) < (today.month - 1) // 3)]
+    line = q.get("linecode", "1")
+    table = q.get("tablename", "SQINC1")
+    data = []
+    for st, (_, name) in STATES.items():
+        for p in periods:
+            v = 30000 + 40000 * _u(table, line, st) + 300 * (int(p[:4]) - 2010) + 200 * _u(table, st, p)
+            data.append({"Code": f"{table}-{line}", "GeoFips": f"{st}000", "GeoName": name,
+                         "TimePeriod": p, "CL_UNIT": "Dollars", "UNIT_MULT": "0",
+                         "DataValue": f"{int(v):,}"})
+    return _json({"BEAAPI": {"Request": {"RequestParam": [{"ParameterName": k.upper(), "ParameterValue": v}
+                                                          for k, v in query if k.lower() not in SECRET_PARAMS]},
+                             "Results": {"Statistic": "Personal income", "UnitOfMeasure": "Dollars",
+                                         "Data": data}}})
+
+
+_FBI_RATE = re.compile(r"/crime/fbi/sapi/api/data/nibrs/([^/]+)/offense/states/(\d{2})/rate/?$")
+
+
+def fbi(method, path, query, body):
+    m = _FBI_RATE.search(path)
+    if not m:
+        return _not_found(f"no synthetic responder for {path}")
+    off, st = m.groups()
+    q = dict(query)
+    y0, y1 = int(q.get("from", 2018)), int(q.get("to", LATEST_YEAR))
+    scale = 5 if off in ("homicide", "arson") else 400
+    res = [{"data_year": y, "rate": round(scale * (0.3 + _u(off, st)) * (0.9 + 0.2 * _u(off, st, y)), 1)}
+           for y in range(y0, y1 + 1)]
+    return _json({"results": res, "pagination": {"count": len(res), "page": 0, "pages": 1}})
+
+
+def _gt_span(spec):
+    now = datetime.now(timezone.utc).date()
+    m = re.fullmatch(r"(\d{4}-\d{2}-\d{2}) (\d{4}-\d{2}-\d{2})", spec or "")
+    if m:
+        return date.fromisoformat(m.group(1)), date.fromisoformat(m.group(2))
+    m = re.fullmatch(r"today (\d+)-([my])", spec or "")
+    if m:
+        days = int(m.group(1)) * (30 if m.group(2) == "m" else 365)
+        return now - timedelta(days=days), now
+    if spec == "all":
+        return date(2004, 1, 1), now
+    return now - timedelta(days=5 * 365), now
+
+
+def _gt_points(start, end):
+    # Google picks the resolution from the span: daily <= ~9 months, weekly <= ~5 years, else monthly
+    span = (end - start).days
+    if span <= 270:
+        return [start + timedelta(days=i) for i in range(span + 1)], "DAY"
+    if span <= 1900:
+        d = start - timedelta(days=(start.weekday() + 1) % 7)  # weeks start on Sunday
+        out = []
+        while d <= end:
+            out.append(d)
+            d += timedelta(days=7)
+        return out, "WEEK"
+    out = []
+    y, m = start.year, start.month
+    while date(y, m, 1) <= end:
+        out.append(date(y, m, 1))
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return out, "MONTH"
+
+
+def gtrends(method, path, query, body):
+    q = dict(query)
+    if path.rstrip("/").endswith("/trends/explore"):
+        # pytrends only wants the NID cookie from this page
+        return 200, "text/html; charset=utf-8", b"<html></html>", {"Set-Cookie": "NID=replay; Path=/"}
+    if path.endswith("/api/explore"):
+        req = json.loads(q.get("req", "{}"))
+        items = req.get("comparisonItem", [])
+        widgets = [{"id": "TIMESERIES", "title": "Interest over time",
+                    "request": {"time": items[0]["time"] if items else "today 5-y",
+                                "comparisonItem": items, "category": req.get("category", 0),
+                                "property": req.get("property", "")},
+                    "token": hashlib.md5(q.get("req", "").encode()).hexdigest()},
+                   {"id": "GEO_MAP", "title": "Interest by subregion", "request": {}, "token": "geo"}]
+        return _json({"widgets": widgets}, prefix=")]}'")
+    if path.endswith("/widgetdata/multiline"):
+        req = json.loads(q.get("req", "{}"))
+        items = req.get("comparisonItem", [])
+        start, end = _gt_span(req.get("time"))
+        days, res = _gt_points(start, end)
+        today = datetime.now(timezone.utc).date()
+        raw = []
+        for it in items:
+            kw, geo = it.get("keyword", ""), it.get("geo", "")
+            base, amp = 10 + 40 * _u(kw, geo), 5 + 15 * _u("amp", kw, geo)
+            rng = random.Random(f"{kw}|{geo}|{start}|{end}")
+            raw.append([max(0.0, base + amp * ((d.month - 6.5) / 6.5) ** 2 + (d.year - 2004) * 0.8
+                            + rng.gauss(0, 4)) for d in days])
+        # values are scaled jointly so that the peak across all terms is 100
+        peak = max((max(r) for r in raw if r), default=0) or 1
+        timeline = []
+        for i, d in enumerate(days):
+            vals = [int(round(100 * r[i] / peak)) for r in raw]
+            t = datetime(d.year, d.month, d.day, tzinfo=timezone.utc)
+            label = f"{d:%b} {d.day}, {d.year}"
+            p = {"time": str(int(t.timestamp())), "formattedTime": label,
+                 "formattedAxisTime": label, "value": vals,
+                 "hasData": [v > 0 for v in vals], "formattedValue": [str(v) for v in vals]}
+            nxt = {"DAY": 1, "WEEK": 7, "MONTH": 28}[res]
+            if d + timedelta(days=nxt) > today:
+                p["isPartial"] = True
+            timeline.append(p)
+        return _json({"default": {"timelineData": timeline, "averages": []}}, prefix=")]}',\n")
+    return _not_found(f"no synthetic responder for {path}")
+
+
+RESPONDERS = {
+    "api.census.gov": census,
+    "api.bls.gov": bls,
+    "apps.bea.gov": bea,
+    "api.usa.gov": fbi,
+    "trends.google.com": gtrends,
+}
+
+
+# ---------- server ----------
+
+class Replay:
+    def __init__(self, args):
+        self.args = args
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.stats = Counter()
+            self.attempts = Counter()
+            self.windows = {}
+
+    def bump(self, *names):
+        with self.lock:
+            for n in names:
+                self.stats[n] += 1
+
+    def fault(self, key, host):
+        """Latency, then maybe an injected failure: (status, headers) or None."""
+        a = self.args
+        with self.lock:
+            self.attempts[key] += 1
+            n = self.attempts[key]
+        rng = random.Random(f"{a.seed}:{key}:{n}")
+        delay = (a.latency + rng.uniform(0, a.jitter)) / 1000.0
+        if delay > 0:
+            time.sleep(delay)
+        if a.quota:
+            now = time.monotonic()
+            with self.lock:
+                win = self.windows.setdefault(host, deque())
+                while win and win[0] <= now - a.quota_window:
+                    win.popleft()
+                if len(win) >= a.quota:
+                    wait = int(win[0] + a.quota_window - now) + 1
+                    self.stats["quota_429"] += 1
+                    return 429, {"Retry-After": str(wait)}
+                win.append(now)
+        if rng.random() < a.rate_429:
+            self.bump("injected_429")
+            return 429, {"Retry-After": str(a.retry_after)}
+        if rng.random() < a.error_rate:
+            self.bump("injected_5xx")
+            return rng.choice([500, 502, 503]), {}
+        return None
+
+    def fixture_path(self, host, key):
+        return os.path.join(self.args.fixtures, host, key + ".json")
+
+    def load(self, host, key):
+        try:
+            with open(self.fixture_path(host, key), encoding="utf-8") as f:
+                fx = json.load(f)
+        except (OSError, ValueError):
+            return None
+        headers = {"Set-Cookie": fx["set_cookie"]} if fx.get("set_cookie") else {}
+        return fx["status"], fx["content_type"], fx["body"].encode("utf-8"), headers
+
+    def record(self, method, host, path, raw_query, body, key, q, b):
+        req = Request(f"https://{host}{path}" + (f"?{raw_query}" if raw_query else ""),
+                      data=body or None, method=method,
+                      headers={"Content-Type": "application/json", "User-Agent": "Mozilla/5.0"})
+        try:
+            with urlopen(req, timeout=120) as r:
+                status, ctype, data = r.status, r.headers.get("Content-Type", ""), r.read()
+                cookie = r.headers.get("Set-Cookie")
+        except HTTPError as e:
+            return e.code, e.headers.get("Content-Type", "text/plain"), e.read(), {}
+        if status == 200:
+            p = self.fixture_path(host, key)
+            os.makedirs(os.path.dirname(p), exist_ok=True)
+            tmp = p + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"request": {"method": method, "path": path, "query": q, "body": b},
+                           "status": status, "content_type": ctype,
+                           "set_cookie": cookie.split(";")[0] + "; Path=/" if cookie else None,
+                           "body": data.decode("utf-8")}, f)
+            os.replace(tmp, p)
+            self.bump("recorded")
+        return status, ctype, data, {}
+
+
+def make_handler(replay):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            if replay.args.verbose:
+                super().log_message(fmt, *args)
+
+        def send(self, status, ctype, data, headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(data)
+
+        def handle_any(self):
+            raw_path, _, raw_query = self.path.partition("?")
+            if raw_path == "/__stats":
+                with replay.lock:
+                    return self.send(200, "application/json", json.dumps(dict(replay.stats)).encode())
+            if raw_path == "/__reset":
+                replay.reset()
+                return self.send(200, "application/json", b"{}")
+
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            host, _, rest = raw_path.lstrip("/").partition("/")
+            path = "/" + rest
+            if "." not in host:
+                return self.send(*_not_found("path must start with the upstream host, "
+                                             "e.g. /api.census.gov/data/..."))
+            query = parse_qsl(raw_query, keep_blank_values=True)
+            key, q, b = request_key(self.command, host, path, query, body)
+            replay.bump("requests", f"host:{host}")
+
+            injected = replay.fault(key, host)
+            if injected:
+                status, headers = injected
+                return self.send(status, "text/plain; charset=utf-8",
+                                 f"injected {status}".encode(), headers)
+
+            resp = replay.load(host, key)
+            if resp is not None:
+                replay.bump("fixture")
+            elif replay.args.record:
+                resp = replay.record(self.command, host, path, raw_query, body, key, q, b)
+            elif replay.args.strict or host not in RESPONDERS:
+                resp = _not_found(f"no fixture {host}/{key}.json")
+            else:
+                replay.bump("synthetic")
+                resp = RESPONDERS[host](self.command, path, query, body)
+            replay.bump(f"status:{resp[0]}")
+            self.send(*resp)
+
+        do_GET = do_POST = do_HEAD = handle_any
+
+    return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay server for the external data APIs")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--fixtures", default=FIXTURES, help="fixture directory (default util/fixtures)")
+    ap.add_argument("--record", action="store_true", help="proxy fixture misses upstream and save them")
+    ap.add_argument("--strict", action="store_true", help="404 on fixture miss instead of synthesising")
+    ap.add_argument("--latency", type=float, default=0, help="base latency per request, ms")
+    ap.add_argument("--jitter", type=float, default=0, help="extra uniform latency, ms")
+    ap.add_argument("--error-rate", type=float, default=0, help="share of requests answered 500/502/503")
+    ap.add_argument("--rate-429", type=float, default=0, help="share of requests answered 429")
+    ap.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds on injected 429s")
+    ap.add_argument("--quota", type=int, default=0, help="max requests per host per --quota-window (0 = off)")
+    ap.add_argument("--quota-window", type=float, default=3600)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("-v", "--verbose", action="store_true")
+    args = ap.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(Replay(args)))
+    server.daemon_threads = True
+    print(f"🔁 Replay server on http://{args.host}:{args.port} "
+          f"({'record' if args.record else 'strict' if args.strict else 'fixtures + synthetic'})")
+    print(f"   export API_BASE_OVERRIDE=http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Reproducible random draws spread over a process pool.
+
+The resampling code (permutation / bootstrap correlations, placebo draws, wild
+cluster bootstrap, CS-DiD multiplier bootstrap) splits its draws into chunks of
+`chunk` draws. Chunk k always uses the k-th child of SeedSequence([seed, salt]),
+so results depend on the seed, salt and chunk size only, not on the number of
+workers. Each caller keeps its own salt, so two samplers sharing a seed do not
+reuse the same streams.
+
+Usage:
+    import sys, os
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+    from seeded_pool import SEED, WORKERS, draw_chunks, run_jobs
+
+    jobs = [(s, k, data) for s, k in draw_chunks(9999, SEED, salt=1, chunk=500)]
+    parts = run_jobs(one_chunk, jobs, WORKERS)   # one_chunk((seed, draws, data)) -> result
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# ========= Config =========
+SEED = 20251005
+CHUNK = 500             # draws per task
+WORKERS = os.cpu_count() or 1
+# =========================
+
+
+def draw_chunks(n_draws, seed, salt, chunk=CHUNK):
+    """-> [(SeedSequence, draws)] covering n_draws draws in chunks of `chunk`."""
+    seqs = np.random.SeedSequence([seed, salt]).spawn((n_draws + chunk - 1) // chunk)
+    return [(s, min(chunk, n_draws - k * chunk)) for k, s in enumerate(seqs)]
+
+
+def run_jobs(fn, jobs, workers=WORKERS):
+    """[fn(job) for job in jobs], in a process pool when workers > 1."""
+    if workers <= 1 or len(jobs) == 1:
+        return [fn(j) for j in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        return list(pool.map(fn, jobs))